@@ -81,6 +81,38 @@ struct TokenContextAndListing:
     signed_listing: SignedListing
     duration: uint256
 
+struct Permit:
+    value: uint256
+    deadline: uint256 # 0 for no permit
+    signature: Signature
+
+struct TokenContextAndRootListing:
+    token_context: TokenContext
+    listing: Listing
+    proof: DynArray[bytes32, 10] # siblings from the listing leaf up to the root, empty for a listing signed by itself
+    signature_index: uint256 # index of the owner signature of the root
+    duration: uint256
+
+struct CompactRental:
+    id: bytes32
+    owner_amount: uint256 # owner (160 bits) | amount (96 bits)
+    renter_times: uint256 # renter (160 bits) | start (40 bits) | min_expiration (40 bits) | protocol_fee (16 bits)
+    delegate_expiration: uint256 # delegate (160 bits) | expiration (40 bits)
+
+struct CompactTokenContextAndListing:
+    token_id: uint256
+    owner_price: uint256 # nft_owner (160 bits) | listing price (96 bits)
+    # bits 224-255 min_duration | 192-223 max_duration | 152-191 listing timestamp | 56-151 unused, ignored |
+    # 24-55 duration | 16-23 owner v | 8-15 admin v | 0-7 active rental flag, non zero if the token context has one
+    terms: uint256
+    owner_signature: uint256[2] # r, s
+    admin_signature: uint256[2] # r, s
+
+struct Accrual:
+    owner: address # owner of the pending rewards
+    rewards: uint256
+    protocol_fees: uint256
+
 struct TokenContextAndAmount:
     token_context: TokenContext
     amount: uint256
@@ -129,6 +161,12 @@ struct TokenAndWallet:
     token_id: uint256
     wallet: address
 
+struct TokenState:
+    state: bytes32
+    listing_revocation: uint256
+    vault: address
+    vault_deployed: bool
+
 # Events
 
 event NftsDeposited:
@@ -248,6 +286,7 @@ ZHARTA_DOMAIN_VERSION: constant(String[1]) = "1"
 
 DOMAIN_TYPE_HASH: constant(bytes32) = keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
 LISTING_TYPE_HASH: constant(bytes32) = keccak256("Listing(uint256 token_id,uint256 price,uint256 min_duration,uint256 max_duration,uint256 timestamp)")
+LISTINGS_ROOT_TYPE_HASH: constant(bytes32) = keccak256("ListingsRoot(bytes32 root)")
 
 _COLLISION_OFFSET: constant(bytes1) = 0xFF
 _DEPLOYMENT_CODE: constant(bytes9) = 0x602D3D8160093D39F3
@@ -257,8 +296,13 @@ _POST: constant(bytes15) = 0x5af43d82803e903d91602b57fd5bf3
 SUPPORTED_INTERFACES: constant(bytes4[2]) = [0x01ffc9a7, 0x80ac58cd] # ERC165, ERC721
 
 LISTINGS_SIGNATURE_VALID_PERIOD: constant(uint256) = 120
+_REVOCATION_MASK: constant(uint256) = 2**64 - 1
+_UINT32_MASK: constant(uint256) = 2**32 - 1
+_UINT40_MASK: constant(uint256) = 2**40 - 1
+_UINT96_MASK: constant(uint256) = 2**96 - 1
 
 listing_sig_domain_separator: immutable(bytes32)
+vault_init_code_hash: immutable(bytes32)
 vault_impl_addr: public(immutable(address))
 payment_token: public(immutable(IERC20))
 nft_contract_addr: public(immutable(address))
@@ -272,8 +316,11 @@ protocol_fee: public(uint256)
 protocol_admin: public(address)
 proposed_admin: public(address)
 
-rental_states: public(HashMap[uint256, bytes32]) # token_id -> hash(token_context)
-listing_revocations: public(HashMap[uint256, uint256]) # token_id -> timestamp
+# token_id -> state commitment (upper 192 bits of hash(token_context)) | listing revocation timestamp (lower 64 bits)
+# A forged context must match a stored commitment on 192 bits (second preimage, 2**192 work), and even a collision of
+# two attacker-chosen contexts takes 2**96 hashes, above the 2**80 already accepted for address collisions.
+token_slots: HashMap[uint256, uint256]
+root_signers: transient(HashMap[bytes32, address]) # hash(root, owner signature) -> owner
 
 unclaimed_rewards: public(HashMap[address, uint256]) # wallet -> amount
 protocol_fees_amount: public(uint256)
@@ -299,10 +346,11 @@ def __init__(
     @notice Initialize the renting contract with necessary parameters and addresses.
     @dev Sets up the contract by initializing various addresses and fees.
     @param _vault_impl_addr The address of the vault implementation.
-    @param _payment_token_addr The address of the payment token.
+    @param _payment_token_addr The address of the payment token, or the zero address to pay in the native currency.
     @param _nft_contract_addr The address of the NFT contract.
     @param _delegation_registry_addr The address of the delegation registry.
     @param _renting_erc721 The address of the renting ERC721 contract.
+    @param _staking_addr The address of the staking pool, must be the zero address when paying in the native currency.
     @param _max_protocol_fee The maximum protocol fee that can be set.
     @param _protocol_fee The initial protocol fee.
     @param _protocol_wallet The wallet to receive protocol fees.
@@ -310,7 +358,6 @@ def __init__(
     """
 
     assert _vault_impl_addr != empty(address), "vault impl is the zero addr"
-    assert _payment_token_addr != empty(address), "payment token is the zero addr"
     assert _nft_contract_addr != empty(address), "nft contract is the zero addr"
     assert _delegation_registry_addr != empty(address), "deleg registry is the zero addr"
     assert _renting_erc721 != empty(address), "renting_erc721 is the zero addr"
@@ -318,8 +365,10 @@ def __init__(
     assert _protocol_fee <= _max_protocol_fee, "protocol fee > max fee"
     assert _protocol_wallet != empty(address), "protocol wallet not set"
     assert _protocol_admin != empty(address), "admin wallet not set"
+    assert _payment_token_addr != empty(address) or _staking_addr == empty(address), "staking not supported"
 
     vault_impl_addr = _vault_impl_addr
+    vault_init_code_hash = keccak256(concat(_DEPLOYMENT_CODE, _PRE, convert(_vault_impl_addr, bytes20), _POST))
     payment_token = IERC20(_payment_token_addr)
     nft_contract_addr = _nft_contract_addr
     delegation_registry_addr = _delegation_registry_addr
@@ -358,10 +407,9 @@ def delegate_to_wallet(token_contexts: DynArray[TokenContext, 32], delegate: add
     vault_logs: DynArray[VaultLog, 32] = empty(DynArray[VaultLog, 32])
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_owner_context(token_context)
         assert not self._is_rental_active(token_context.active_rental), "active rental"
-        assert msg.sender == token_context.nft_owner, "not owner"
-        vault: IVault = self._get_vault(token_context.token_id)
+        vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
 
         extcall vault.delegate_to_wallet(delegate, max_value(uint256))
 
@@ -384,11 +432,11 @@ def renter_delegate_to_wallet(token_contexts: DynArray[TokenContext, 32], delega
     vault_logs: DynArray[VaultLog, 32] = empty(DynArray[VaultLog, 32])
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_context(token_context)
         assert self._is_rental_active(token_context.active_rental), "no active rental"
         assert msg.sender == token_context.active_rental.renter, "not renter"
 
-        vault: IVault = self._get_vault(token_context.token_id)
+        vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
         extcall vault.delegate_to_wallet(delegate, token_context.active_rental.expiration)
 
         self._store_token_state(
@@ -418,18 +466,24 @@ def deposit(token_ids: DynArray[uint256, 32], delegate: address):
 
     """
     @notice Deposits a set of NFTs in vaults (creating them if needed) and sets up delegations
-    @dev Iterates over a list of token ids, creating vaults if not needed, transfering the NFTs to the vaults and setting the delegations
+    @dev Iterates over a list of token ids, creating vaults if not needed, transfering the NFTs to the vaults and setting the delegations. If the caller approved this contract for all its NFTs (`setApprovalForAll`) the NFTs are transferred by this contract, otherwise each vault must be approved for its NFT.
     @param token_ids An array of NFT token ids to deposit.
     @param delegate Address to delegate the NFT to while listed.
     """
 
     self._check_not_paused()
     vault_logs: DynArray[VaultLog, 32] = empty(DynArray[VaultLog, 32])
+    # with an approval for all of the owner's NFTs, this contract moves them to the vaults instead of each vault
+    approved_for_all: bool = staticcall IERC721(nft_contract_addr).isApprovedForAll(msg.sender, self)
 
     for token_id: uint256 in token_ids:
-        assert self.rental_states[token_id] == empty(bytes32), "invalid state"
+        assert self.token_slots[token_id] & ~_REVOCATION_MASK == 0, "invalid state"
         vault: IVault = self._create_vault(token_id)
-        extcall vault.deposit(token_id, msg.sender, delegate)
+        nft_owner: address = msg.sender
+        if approved_for_all:
+            extcall IERC721(nft_contract_addr).transferFrom(msg.sender, vault.address, token_id)
+            nft_owner = vault.address
+        extcall vault.deposit(token_id, nft_owner, delegate)
 
         self._store_token_state(token_id, msg.sender, empty(Rental))
 
@@ -453,7 +507,7 @@ def mint(token_contexts: DynArray[TokenContext, 32]):
     tokens: DynArray[TokenAndWallet, 32] = empty(DynArray[TokenAndWallet, 32])
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_context(token_context)
 
         tokens.append(TokenAndWallet({
             token_id: token_context.token_id,
@@ -474,14 +528,15 @@ def revoke_listing(token_contexts: DynArray[TokenContext, 32]):
 
     token_ids: DynArray[uint256, 32] = empty(DynArray[uint256, 32])
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
-        assert token_context.nft_owner == msg.sender, "not owner"
-        self.listing_revocations[token_context.token_id] = block.timestamp
+        self._check_owner_context(token_context)
+        self.token_slots[token_context.token_id] = self.token_slots[token_context.token_id] & ~_REVOCATION_MASK | block.timestamp
         token_ids.append(token_context.token_id)
     log ListingsRevoked(msg.sender, block.timestamp, token_ids)
 
 
 @external
+@payable
+@nonreentrant
 def start_rentals(token_contexts: DynArray[TokenContextAndListing, 32], delegate: address, signature_timestamp: uint256):
 
     """
@@ -495,6 +550,8 @@ def start_rentals(token_contexts: DynArray[TokenContextAndListing, 32], delegate
     self._check_not_paused()
 
     rental_logs: DynArray[RentalLog, 32] = []
+    rental_log: RentalLog = empty(RentalLog)
+    accrual: Accrual = empty(Accrual)
     rental_amounts: uint256 = 0
 
     for context: TokenContextAndListing in token_contexts:
@@ -503,53 +560,104 @@ def start_rentals(token_contexts: DynArray[TokenContextAndListing, 32], delegate
     self._receive_payment_token(msg.sender, rental_amounts)
 
     for context: TokenContextAndListing in token_contexts:
-        vault: IVault = self._get_vault(context.token_context.token_id)
-        assert self._is_context_valid(context.token_context), "invalid context"
-        assert not self._is_rental_active(context.token_context.active_rental), "active rental"
-        assert self._is_within_duration_range(context.signed_listing.listing, context.duration), "duration not respected"
-        assert context.signed_listing.listing.price > 0, "listing not active"
-        self._check_valid_listing(context.token_context.token_id, context.signed_listing, signature_timestamp, context.token_context.nft_owner)
+        rental_log, accrual = self._start_rental(context.token_context, context.signed_listing, context.duration, delegate, signature_timestamp, True, accrual)
+        rental_logs.append(rental_log)
 
-        expiration: uint256 = block.timestamp + context.duration * 3600
-        extcall vault.delegate_to_wallet(delegate if delegate != empty(address) else msg.sender, expiration)
+    self._write_accrual(accrual)
 
-        # store unclaimed rewards
-        self._consolidate_claims(context.token_context.token_id, context.token_context.nft_owner, context.token_context.active_rental)
+    log RentalStarted(msg.sender, delegate, nft_contract_addr, rental_logs)
 
-        # create rental
-        rental_id: bytes32 = self._compute_rental_id(msg.sender, context.token_context.token_id, block.timestamp, expiration)
 
-        new_rental: Rental = Rental({
-            id: rental_id,
-            owner: context.token_context.nft_owner,
-            renter: msg.sender,
-            delegate: delegate,
-            token_id: context.token_context.token_id,
-            start: block.timestamp,
-            min_expiration: block.timestamp + context.signed_listing.listing.min_duration * 3600,
-            expiration: expiration,
-            amount: self._compute_rental_amount(block.timestamp, expiration, context.signed_listing.listing.price),
-            protocol_fee: self.protocol_fee,
-        })
+@external
+@payable
+@nonreentrant
+def start_rentals_compact(token_contexts: DynArray[CompactTokenContextAndListing, 32], rentals: DynArray[CompactRental, 32], delegate: address, signature_timestamp: uint256):
 
-        self._store_token_state(context.token_context.token_id, context.token_context.nft_owner, new_rental)
+    """
+    @notice Start rentals for multiple NFTs, with the token contexts and listings in a compact encoding
+    @dev Same as `start_rentals`, with each token context and signed listing packed in 7 words instead of 24. The active rentals are passed separately, in the order of the token contexts flagging one, so an empty rental takes no calldata.
+    @param token_contexts An array of compact token contexts and signed listings.
+    @param rentals The compact active rentals of the flagged token contexts.
+    @param delegate The address to delegate the NFT to during the rental period.
+    @param signature_timestamp The timestamp of the protocol admin signature.
+    """
 
-        rental_logs.append(RentalLog({
-            id: rental_id,
-            vault: vault.address,
-            owner: context.token_context.nft_owner,
-            token_id: context.token_context.token_id,
-            start: block.timestamp,
-            min_expiration: new_rental.min_expiration,
-            expiration: expiration,
-            amount: new_rental.amount,
-            protocol_fee: new_rental.protocol_fee,
-        }))
+    self._check_not_paused()
+
+    rental_logs: DynArray[RentalLog, 32] = []
+    rental_log: RentalLog = empty(RentalLog)
+    accrual: Accrual = empty(Accrual)
+    rental_amounts: uint256 = 0
+
+    for context: CompactTokenContextAndListing in token_contexts:
+        rental_amounts += self._compute_rental_amount(block.timestamp, block.timestamp + (context.terms >> 24 & _UINT32_MASK) * 3600, context.owner_price & _UINT96_MASK)
+
+    self._receive_payment_token(msg.sender, rental_amounts)
+
+    rental_index: uint256 = 0
+    for compact: CompactTokenContextAndListing in token_contexts:
+        rental: CompactRental = empty(CompactRental)
+        if compact.terms & 255 != 0:
+            rental = rentals[rental_index]
+            rental_index += 1
+        context: TokenContextAndListing = self._unpack_context(compact, rental)
+        rental_log, accrual = self._start_rental(context.token_context, context.signed_listing, context.duration, delegate, signature_timestamp, True, accrual)
+        rental_logs.append(rental_log)
+
+    self._write_accrual(accrual)
+
+    log RentalStarted(msg.sender, delegate, nft_contract_addr, rental_logs)
+
+
+@external
+@payable
+@nonreentrant
+def start_rentals_from_roots(
+    token_contexts: DynArray[TokenContextAndRootListing, 32],
+    owner_signatures: DynArray[Signature, 32],
+    admin_signature: Signature,
+    delegate: address,
+    signature_timestamp: uint256,
+    permit: Permit
+):
+
+    """
+    @notice Start rentals for multiple NFTs, with the listings signed in batches as merkle trees
+    @dev Same as `start_rentals`, but each listing is a leaf of a merkle tree whose root is signed by the owner, a listing with an empty proof being signed by itself, and the protocol admin signs once over all the owner signatures. The signatures are checked before the other conditions and the signer of each root is recovered once per transaction.
+    @param token_contexts An array of token contexts, each containing the rental state, the listing, its merkle proof and the index of the owner signature of its root.
+    @param owner_signatures The owner signatures of the merkle roots.
+    @param admin_signature The protocol admin signature over the owner signatures.
+    @param delegate The address to delegate the NFT to during the rental period.
+    @param signature_timestamp The timestamp of the protocol admin signature.
+    @param permit An optional EIP-2612 permit of the payment token, approving the rental amounts in the same transaction. Unused with native payments.
+    """
+
+    self._check_not_paused()
+    self._check_owner_signatures(owner_signatures, admin_signature, signature_timestamp)
+
+    rental_logs: DynArray[RentalLog, 32] = []
+    rental_log: RentalLog = empty(RentalLog)
+    accrual: Accrual = empty(Accrual)
+    rental_amounts: uint256 = 0
+
+    for context: TokenContextAndRootListing in token_contexts:
+        rental_amounts += self._compute_rental_amount(block.timestamp, block.timestamp + context.duration * 3600, context.listing.price)
+
+    self._permit_payment_token(permit)
+    self._receive_payment_token(msg.sender, rental_amounts)
+
+    for context: TokenContextAndRootListing in token_contexts:
+        self._check_root_listing(context, owner_signatures[context.signature_index])
+        rental_log, accrual = self._start_rental(context.token_context, self._root_signed_listing(context.listing), context.duration, delegate, signature_timestamp, False, accrual)
+        rental_logs.append(rental_log)
+
+    self._write_accrual(accrual)
 
     log RentalStarted(msg.sender, delegate, nft_contract_addr, rental_logs)
 
 
 @external
+@nonreentrant
 def close_rentals(token_contexts: DynArray[TokenContext, 32]):
 
     """
@@ -559,12 +667,12 @@ def close_rentals(token_contexts: DynArray[TokenContext, 32]):
     """
 
     rental_logs: DynArray[RentalLog, 32] = []
-    protocol_fees_amount: uint256 = 0
+    accrual: Accrual = empty(Accrual)
     payback_amounts: uint256 = 0
 
     for token_context: TokenContext in token_contexts:
-        vault: IVault = self._get_vault(token_context.token_id)
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_context(token_context)
+        vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
         assert self._is_rental_active(token_context.active_rental), "active rental does not exist"
         assert msg.sender == token_context.active_rental.renter, "not renter of active rental"
 
@@ -580,15 +688,17 @@ def close_rentals(token_contexts: DynArray[TokenContext, 32]):
         payback_amount: uint256 = token_context.active_rental.amount - pro_rata_rental_amount
         payback_amounts += payback_amount
 
+        # accrue unclaimed rewards and protocol fee
+        if token_context.nft_owner != accrual.owner:
+            self._write_accrual(accrual)
+            accrual = Accrual({owner: token_context.nft_owner, rewards: 0, protocol_fees: 0})
         protocol_fee_amount: uint256 = pro_rata_rental_amount * token_context.active_rental.protocol_fee // 10000
-        protocol_fees_amount += protocol_fee_amount
+        accrual.rewards += pro_rata_rental_amount - protocol_fee_amount
+        accrual.protocol_fees += protocol_fee_amount
 
         # clear active rental
         self._store_token_state(token_context.token_id, token_context.nft_owner, empty(Rental))
 
-        # set unclaimed rewards
-        self.unclaimed_rewards[token_context.nft_owner] += pro_rata_rental_amount - protocol_fee_amount
-
         # revoke delegation
         extcall vault.delegate_to_wallet(empty(address), 0)
 
@@ -604,15 +714,16 @@ def close_rentals(token_contexts: DynArray[TokenContext, 32]):
             protocol_fee: token_context.active_rental.protocol_fee,
         }))
 
-    assert extcall payment_token.transfer(msg.sender, payback_amounts), "transfer failed"
+    self._write_accrual(accrual)
 
-    if protocol_fees_amount > 0:
-        self.protocol_fees_amount += protocol_fees_amount
+    self._transfer_payment_token(msg.sender, payback_amounts)
 
     log RentalClosed(msg.sender, nft_contract_addr, rental_logs)
 
 
 @external
+@payable
+@nonreentrant
 def extend_rentals(token_contexts: DynArray[TokenContextAndListing, 32], signature_timestamp: uint256):
 
     """
@@ -623,85 +734,102 @@ def extend_rentals(token_contexts: DynArray[TokenContextAndListing, 32], signatu
     """
 
     rental_logs: DynArray[RentalExtensionLog, 32] = []
-    protocol_fees_amount: uint256 = 0
+    rental_log: RentalExtensionLog = empty(RentalExtensionLog)
+    accrual: Accrual = empty(Accrual)
     payback_amounts: uint256 = 0
     extension_amounts: uint256 = 0
 
     for context: TokenContextAndListing in token_contexts:
-        vault: IVault = self._get_vault(context.token_context.token_id)
-        assert self._is_context_valid(context.token_context), "invalid context"
-        assert self._is_rental_active(context.token_context.active_rental), "no active rental"
-        assert msg.sender == context.token_context.active_rental.renter, "not renter of active rental"
+        rental_log, accrual = self._extend_rental(context.token_context, context.signed_listing, context.duration, signature_timestamp, True, accrual)
+        payback_amounts += context.token_context.active_rental.amount - rental_log.amount_settled
+        extension_amounts += rental_log.extension_amount
+        rental_logs.append(rental_log)
 
-        assert self._is_within_duration_range(context.signed_listing.listing, context.duration), "duration not respected"
-        assert context.signed_listing.listing.price > 0, "listing not active"
-        self._check_valid_listing(context.token_context.token_id, context.signed_listing, signature_timestamp, context.token_context.nft_owner)
+    self._settle_extensions(payback_amounts, extension_amounts, accrual)
 
-        expiration: uint256 = block.timestamp + context.duration * 3600
-        real_expiration_adjusted: uint256 = block.timestamp
-        if block.timestamp < context.token_context.active_rental.min_expiration:
-            real_expiration_adjusted = context.token_context.active_rental.min_expiration
+    log RentalExtended(msg.sender, nft_contract_addr, rental_logs)
 
-        pro_rata_rental_amount: uint256 = self._compute_real_rental_amount(
-            context.token_context.active_rental.expiration - context.token_context.active_rental.start,
-            real_expiration_adjusted - context.token_context.active_rental.start,
-            context.token_context.active_rental.amount
-        )
-        new_rental_amount: uint256 = self._compute_rental_amount(block.timestamp, expiration, context.signed_listing.listing.price)
-        extension_amounts += new_rental_amount
 
-        payback_amount: uint256 = context.token_context.active_rental.amount - pro_rata_rental_amount
-        payback_amounts += payback_amount
+@external
+@payable
+@nonreentrant
+def extend_rentals_compact(token_contexts: DynArray[CompactTokenContextAndListing, 32], rentals: DynArray[CompactRental, 32], signature_timestamp: uint256):
 
-        protocol_fee_amount: uint256 = pro_rata_rental_amount * context.token_context.active_rental.protocol_fee // 10000
-        protocol_fees_amount += protocol_fee_amount
+    """
+    @notice Extend rentals for multiple NFTs, with the token contexts and listings in a compact encoding
+    @dev Same as `extend_rentals`, with the encoding of `start_rentals_compact`. Every extended token has an active rental, so every token context sets the active rental flag (the low byte of `terms`) and `rentals` holds one rental per token context. A context without the flag is unpacked without a rental and fails validation.
+    @param token_contexts An array of compact token contexts and signed listings.
+    @param rentals The compact active rentals of the flagged token contexts.
+    @param signature_timestamp The timestamp of the protocol admin signature.
+    """
 
-        new_rental: Rental = Rental({
-            id: context.token_context.active_rental.id,
-            owner: context.token_context.nft_owner,
-            renter: msg.sender,
-            delegate: context.token_context.active_rental.delegate,
-            token_id: context.token_context.token_id,
-            start: block.timestamp,
-            min_expiration: block.timestamp + context.signed_listing.listing.min_duration * 3600,
-            expiration: expiration,
-            amount: new_rental_amount,
-            protocol_fee: self.protocol_fee,
-        })
-        # update active rental
-        self._store_token_state(context.token_context.token_id, context.token_context.nft_owner, new_rental)
+    rental_logs: DynArray[RentalExtensionLog, 32] = []
+    rental_log: RentalExtensionLog = empty(RentalExtensionLog)
+    accrual: Accrual = empty(Accrual)
+    payback_amounts: uint256 = 0
+    extension_amounts: uint256 = 0
 
-        # set unclaimed rewards
-        self.unclaimed_rewards[context.token_context.nft_owner] += pro_rata_rental_amount - protocol_fee_amount
+    rental_index: uint256 = 0
+    for compact: CompactTokenContextAndListing in token_contexts:
+        rental: CompactRental = empty(CompactRental)
+        if compact.terms & 255 != 0:
+            rental = rentals[rental_index]
+            rental_index += 1
+        context: TokenContextAndListing = self._unpack_context(compact, rental)
+        rental_log, accrual = self._extend_rental(context.token_context, context.signed_listing, context.duration, signature_timestamp, True, accrual)
+        payback_amounts += context.token_context.active_rental.amount - rental_log.amount_settled
+        extension_amounts += rental_log.extension_amount
+        rental_logs.append(rental_log)
 
-        # extend delegation
-        extcall vault.delegate_to_wallet(context.token_context.active_rental.delegate, expiration)
+    self._settle_extensions(payback_amounts, extension_amounts, accrual)
 
-        rental_logs.append(RentalExtensionLog({
-            id: context.token_context.active_rental.id,
-            vault: vault.address,
-            owner: context.token_context.active_rental.owner,
-            token_id: context.token_context.active_rental.token_id,
-            start: block.timestamp,
-            min_expiration: block.timestamp + context.signed_listing.listing.min_duration * 3600,
-            expiration: expiration,
-            amount_settled: pro_rata_rental_amount,
-            extension_amount: new_rental_amount,
-            protocol_fee: context.token_context.active_rental.protocol_fee,
-        }))
+    log RentalExtended(msg.sender, nft_contract_addr, rental_logs)
 
-    if payback_amounts > extension_amounts:
-        self._transfer_payment_token(msg.sender, payback_amounts - extension_amounts)
-    elif payback_amounts < extension_amounts:
-        self._receive_payment_token(msg.sender, extension_amounts - payback_amounts)
 
-    if protocol_fees_amount > 0:
-        self.protocol_fees_amount += protocol_fees_amount
+@external
+@payable
+@nonreentrant
+def extend_rentals_from_roots(
+    token_contexts: DynArray[TokenContextAndRootListing, 32],
+    owner_signatures: DynArray[Signature, 32],
+    admin_signature: Signature,
+    signature_timestamp: uint256,
+    permit: Permit
+):
+
+    """
+    @notice Extend rentals for multiple NFTs, with the listings signed in batches as merkle trees
+    @dev Same as `extend_rentals`, but each listing is a leaf of a merkle tree whose root is signed by the owner, a listing with an empty proof being signed by itself, and the protocol admin signs once over all the owner signatures. The signatures are checked before the other conditions and the signer of each root is recovered once per transaction.
+    @param token_contexts An array of token contexts, each containing the rental state, the listing, its merkle proof and the index of the owner signature of its root.
+    @param owner_signatures The owner signatures of the merkle roots.
+    @param admin_signature The protocol admin signature over the owner signatures.
+    @param signature_timestamp The timestamp of the protocol admin signature.
+    @param permit An optional EIP-2612 permit of the payment token, approving the extension amounts in the same transaction. Unused with native payments.
+    """
+
+    rental_logs: DynArray[RentalExtensionLog, 32] = []
+    rental_log: RentalExtensionLog = empty(RentalExtensionLog)
+    accrual: Accrual = empty(Accrual)
+    payback_amounts: uint256 = 0
+    extension_amounts: uint256 = 0
+
+    self._check_owner_signatures(owner_signatures, admin_signature, signature_timestamp)
+
+    for context: TokenContextAndRootListing in token_contexts:
+        self._check_root_listing(context, owner_signatures[context.signature_index])
+        rental_log, accrual = self._extend_rental(context.token_context, self._root_signed_listing(context.listing), context.duration, signature_timestamp, False, accrual)
+        payback_amounts += context.token_context.active_rental.amount - rental_log.amount_settled
+        extension_amounts += rental_log.extension_amount
+        rental_logs.append(rental_log)
+
+    self._permit_payment_token(permit)
+    self._settle_extensions(payback_amounts, extension_amounts, accrual)
 
     log RentalExtended(msg.sender, nft_contract_addr, rental_logs)
 
 
 @external
+@nonreentrant
 def withdraw(token_contexts: DynArray[TokenContext, 32]):
 
     """
@@ -716,7 +844,7 @@ def withdraw(token_contexts: DynArray[TokenContext, 32]):
     total_rewards: uint256 = 0
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_context(token_context)
         assert not self._is_rental_active(token_context.active_rental), "active rental"
         token_owner: address = staticcall renting_erc721.owner_of(token_context.token_id)
         if token_owner != empty(address):
@@ -724,11 +852,12 @@ def withdraw(token_contexts: DynArray[TokenContext, 32]):
         else:
             assert msg.sender == token_context.nft_owner, "not owner"
 
-        vault: IVault = self._get_vault(token_context.token_id)
+        vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
 
         self._consolidate_claims(token_context.token_id, token_context.nft_owner, token_context.active_rental, False)
 
-        self._clear_token_state(token_context.token_id)
+        # clears the state and revokes the listings in a single write
+        self.token_slots[token_context.token_id] = block.timestamp
 
         tokens.append(TokenAndWallet({
             token_id: token_context.token_id,
@@ -736,7 +865,6 @@ def withdraw(token_contexts: DynArray[TokenContext, 32]):
         }))
 
         extcall vault.withdraw(token_context.token_id, msg.sender)
-        self.listing_revocations[token_context.token_id] = block.timestamp
 
         withdrawal_log.append(WithdrawalLog({
             vault: vault.address,
@@ -771,16 +899,14 @@ def stake_deposit(token_contexts: DynArray[TokenContextAndAmount, 32], pool_meth
     """
 
     self._check_not_paused()
-    staking_addr: address = self.staking_addr
-    assert staking_addr != empty(address), "staking not supported"
+    staking_addr: address = self._staking_pool()
 
     staking_log: DynArray[StakingLog, 32] = empty(DynArray[StakingLog, 32])
 
     for context: TokenContextAndAmount in token_contexts:
-        assert msg.sender == context.token_context.nft_owner, "not owner"
-        assert self._is_context_valid(context.token_context), "invalid context"
+        self._check_staking_context(context.token_context)
 
-        vault: IVault = self._get_vault(context.token_context.token_id)
+        vault: IVault = IVault(self._tokenid_to_vault(context.token_context.token_id))
         assert extcall payment_token.transferFrom(msg.sender, vault.address, context.amount), "transferFrom failed"
         extcall vault.staking_deposit(msg.sender, context.amount, context.token_context.token_id, staking_addr, pool_method_id)
         staking_log.append(StakingLog({
@@ -802,16 +928,14 @@ def stake_withdraw(token_contexts: DynArray[TokenContextAndAmount, 32], recipien
     @param pool_method_id The method id to call on the staking pool to withdraw the given amounts.
     """
 
-    staking_addr: address = self.staking_addr
-    assert staking_addr != empty(address), "staking not supported"
+    staking_addr: address = self._staking_pool()
 
     staking_log: DynArray[StakingLog, 32] = empty(DynArray[StakingLog, 32])
 
     for context: TokenContextAndAmount in token_contexts:
-        assert msg.sender == context.token_context.nft_owner, "not owner"
-        assert self._is_context_valid(context.token_context), "invalid context"
+        self._check_staking_context(context.token_context)
 
-        extcall self._get_vault(context.token_context.token_id).staking_withdraw(recipient, context.amount, context.token_context.token_id, staking_addr, pool_method_id)
+        extcall IVault(self._tokenid_to_vault(context.token_context.token_id)).staking_withdraw(recipient, context.amount, context.token_context.token_id, staking_addr, pool_method_id)
         staking_log.append(StakingLog({
             token_id: context.token_context.token_id,
             amount: context.amount
@@ -831,14 +955,12 @@ def stake_claim(token_contexts: DynArray[TokenContextAndAmount, 32], recipient:
     @param pool_method_id The method id to call on the staking pool to claim the rewards.
     """
 
-    staking_addr: address = self.staking_addr
-    assert staking_addr != empty(address), "staking not supported"
+    staking_addr: address = self._staking_pool()
     tokens: DynArray[uint256, 32] = empty(DynArray[uint256, 32])
 
     for context: TokenContextAndAmount in token_contexts:
-        assert msg.sender == context.token_context.nft_owner, "not owner"
-        assert self._is_context_valid(context.token_context), "invalid context"
-        extcall self._get_vault(context.token_context.token_id).staking_claim(recipient, context.token_context.token_id, staking_addr, pool_method_id)
+        self._check_staking_context(context.token_context)
+        extcall IVault(self._tokenid_to_vault(context.token_context.token_id)).staking_claim(recipient, context.token_context.token_id, staking_addr, pool_method_id)
         tokens.append(context.token_context.token_id)
 
     log StakingClaim(msg.sender, nft_contract_addr, recipient, tokens)
@@ -856,21 +978,20 @@ def stake_compound(token_contexts: DynArray[TokenContextAndAmount, 32], pool_cla
     """
 
     self._check_not_paused()
-    staking_addr: address = self.staking_addr
-    assert staking_addr != empty(address), "staking not supported"
+    staking_addr: address = self._staking_pool()
     tokens: DynArray[uint256, 32] = empty(DynArray[uint256, 32])
 
     for context: TokenContextAndAmount in token_contexts:
-        assert msg.sender == context.token_context.nft_owner, "not owner"
-        assert self._is_context_valid(context.token_context), "invalid context"
+        self._check_staking_context(context.token_context)
 
-        extcall self._get_vault(context.token_context.token_id).staking_compound(context.token_context.token_id, staking_addr, pool_claim_method_id, pool_deposit_method_id)
+        extcall IVault(self._tokenid_to_vault(context.token_context.token_id)).staking_compound(context.token_context.token_id, staking_addr, pool_claim_method_id, pool_deposit_method_id)
         tokens.append(context.token_context.token_id)
 
     log StakingCompound(msg.sender, nft_contract_addr, tokens)
 
 
 @external
+@nonreentrant
 def claim(token_contexts: DynArray[TokenContext, 32]):
 
     """
@@ -882,8 +1003,7 @@ def claim(token_contexts: DynArray[TokenContext, 32]):
     reward_logs: DynArray[RewardLog, 32] = []
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
-        assert token_context.nft_owner == msg.sender, "not owner"
+        self._check_owner_context(token_context)
 
         result_active_rental: Rental = self._consolidate_claims(token_context.token_id, token_context.nft_owner, token_context.active_rental)
 
@@ -896,8 +1016,8 @@ def claim(token_contexts: DynArray[TokenContext, 32]):
 
     # transfer reward to nft owner
     assert rewards_to_claim > 0, "no rewards to claim"
-    assert extcall payment_token.transfer(msg.sender, rewards_to_claim), "transfer failed"
     self.unclaimed_rewards[msg.sender] = 0
+    self._transfer_payment_token(msg.sender, rewards_to_claim)
 
     log RewardsClaimed(msg.sender, nft_contract_addr, rewards_to_claim, self.protocol_fees_amount, reward_logs)
 
@@ -916,7 +1036,7 @@ def claimable_rewards(nft_owner: address, token_contexts: DynArray[TokenContext,
 
     rewards: uint256 = self.unclaimed_rewards[nft_owner]
     for context: TokenContext in token_contexts:
-        assert self._is_context_valid(context), "invalid context"
+        self._check_context(context)
         assert context.nft_owner == nft_owner, "not owner"
         if context.active_rental.expiration < block.timestamp:
             rewards += context.active_rental.amount * (10000 - context.active_rental.protocol_fee) // 10000
@@ -935,7 +1055,7 @@ def claim_token_ownership(token_contexts: DynArray[TokenContext, 32]):
     tokens: DynArray[uint256, 32] = empty(DynArray[uint256, 32])
 
     for token_context: TokenContext in token_contexts:
-        assert self._is_context_valid(token_context), "invalid context"
+        self._check_context(token_context)
         assert (staticcall renting_erc721.ownerOf(token_context.token_id)) == msg.sender, "not owner"
         self._store_token_state(token_context.token_id, msg.sender, token_context.active_rental)
         tokens.append(token_context.token_id)
@@ -944,6 +1064,7 @@ def claim_token_ownership(token_contexts: DynArray[TokenContext, 32]):
 
 
 @external
+@nonreentrant
 def claim_fees():
 
     """
@@ -1011,11 +1132,14 @@ def set_staking_addr(staking_addr: address):
 
     """
     @notice Set the staking pool address
-    @dev Sets the staking pool address to the given value and logs the event. Admin function.
+    @dev Sets the staking pool address to the given value and logs the event. Admin function. Staking needs an
+    ERC20 payment token, so the address can't be set when paying in the native currency.
     @param staking_addr The new staking pool address.
     """
 
     assert msg.sender == self.protocol_admin, "not protocol admin"
+    if staking_addr != empty(address):
+        assert payment_token.address != empty(address), "staking not supported"
     log StakingAddressSet(self.staking_addr, staking_addr)
     self.staking_addr = staking_addr
 
@@ -1065,25 +1189,67 @@ def tokenid_to_vault(token_id: uint256) -> address:
     return self._tokenid_to_vault(token_id)
 
 
+@view
+@external
+def rental_states(token_id: uint256) -> bytes32:
+
+    """
+    @notice Get the rental state of a token
+    @dev Returns the state commitment of the token, the state hash with its lower 64 bits cleared, or empty if the token is not deposited.
+    @param token_id The token id.
+    @return The state commitment of the token.
+    """
+
+    return convert(self.token_slots[token_id] & ~_REVOCATION_MASK, bytes32)
+
+
+@view
+@external
+def listing_revocations(token_id: uint256) -> uint256:
+
+    """
+    @notice Get the listing revocation timestamp of a token
+    @dev Listings of the token signed at or before this timestamp are invalid.
+    @param token_id The token id.
+    @return The listing revocation timestamp of the token.
+    """
+
+    return self.token_slots[token_id] & _REVOCATION_MASK
+
+
+@view
+@external
+def token_states(token_ids: DynArray[uint256, 256]) -> DynArray[TokenState, 256]:
+
+    """
+    @notice Get the state of multiple tokens in a single call
+    @dev Returns, for each token id, the rental state commitment, the listing revocation timestamp, the vault address and whether the vault is deployed, allowing to validate a batch of token contexts with a single call.
+    @param token_ids The token ids.
+    @return The state of each token, in the same order as the token ids.
+    """
+
+    states: DynArray[TokenState, 256] = empty(DynArray[TokenState, 256])
+    for token_id: uint256 in token_ids:
+        vault: address = self._tokenid_to_vault(token_id)
+        states.append(TokenState({
+            state: convert(self.token_slots[token_id] & ~_REVOCATION_MASK, bytes32),
+            listing_revocation: self.token_slots[token_id] & _REVOCATION_MASK,
+            vault: vault,
+            vault_deployed: vault.is_contract
+        }))
+    return states
+
+
 @view
 @internal
 def _tokenid_to_vault(token_id: uint256) -> address:
-    return self._compute_address(
-        convert(token_id, bytes32),
-        keccak256(concat(
-            _DEPLOYMENT_CODE,
-            _PRE,
-            convert(vault_impl_addr, bytes20),
-            _POST
-        )),
-        self
-    )
+    return self._compute_address(convert(token_id, bytes32), vault_init_code_hash, self)
 
 
 @pure
 @internal
-def _state_hash(token_id: uint256, nft_owner: address, rental: Rental) -> bytes32:
-    return keccak256(
+def _state_hash(token_id: uint256, nft_owner: address, rental: Rental) -> uint256:
+    return convert(keccak256(
         concat(
             convert(token_id, bytes32),
             convert(nft_owner, bytes32),
@@ -1098,7 +1264,7 @@ def _state_hash(token_id: uint256, nft_owner: address, rental: Rental) -> bytes3
             convert(rental.amount, bytes32),
             convert(rental.protocol_fee, bytes32),
         )
-    )
+    ), uint256) & ~_REVOCATION_MASK
 
 
 @pure
@@ -1124,24 +1290,18 @@ def _is_rental_active(rental: Rental) -> bool:
 @internal
 def _is_context_valid(context: TokenContext) -> bool:
     """ Check if the context is valid, also meaning that the token is deposited """
-    return self.rental_states[context.token_id] == self._state_hash(context.token_id, context.nft_owner, context.active_rental)
-
-
-@internal
-def _store_token_state(token_id: uint256, nft_owner: address, rental: Rental):
-    self.rental_states[token_id] = self._state_hash(token_id, nft_owner, rental)
+    return self.token_slots[context.token_id] & ~_REVOCATION_MASK == self._state_hash(context.token_id, context.nft_owner, context.active_rental)
 
 
+@view
 @internal
-def _clear_token_state(token_id: uint256):
-    self.rental_states[token_id] = empty(bytes32)
+def _check_context(context: TokenContext):
+    assert self._is_context_valid(context), "invalid context"
 
 
 @internal
-def _get_vault(token_id: uint256) -> IVault:
-    vault: address = self._tokenid_to_vault(token_id)
-    assert vault.is_contract, "no vault exists for token_id"
-    return IVault(vault)
+def _store_token_state(token_id: uint256, nft_owner: address, rental: Rental):
+    self.token_slots[token_id] = self._state_hash(token_id, nft_owner, rental) | self.token_slots[token_id] & _REVOCATION_MASK
 
 
 @internal
@@ -1157,12 +1317,35 @@ def _create_vault(token_id: uint256) -> IVault:
 
 @internal
 def _transfer_payment_token(_to: address, _amount: uint256):
-    assert extcall payment_token.transfer(_to, _amount), "transferFrom failed"
+    # native payouts call the recipient, the entry points paying out are nonreentrant
+    if _amount == 0:
+        return
+    if payment_token.address == empty(address):
+        raw_call(_to, b"", value=_amount)
+    else:
+        assert extcall payment_token.transfer(_to, _amount), "transfer failed"
 
 
 @internal
+@payable
 def _receive_payment_token(_from: address, _amount: uint256):
-    assert extcall payment_token.transferFrom(_from, self, _amount), "transferFrom failed"
+    # in native mode the payment is the exact call value, which must be zero otherwise
+    native: bool = payment_token.address == empty(address)
+    assert msg.value == (_amount if native else 0), "invalid payment amount"
+    if not native and _amount > 0:
+        assert extcall payment_token.transferFrom(_from, self, _amount), "transferFrom failed"
+
+
+@internal
+def _permit_payment_token(permit: Permit):
+    # a permit may have been front-run, so a failed one is accepted if the allowance it grants is already in place
+    if permit.deadline != 0 and payment_token.address != empty(address):
+        if not raw_call(
+            payment_token.address,
+            abi_encode(msg.sender, self, permit.value, permit.deadline, permit.signature, method_id=method_id("permit(address,address,uint256,uint256,uint8,bytes32,bytes32)")),
+            revert_on_failure=False
+        ):
+            assert staticcall payment_token.allowance(msg.sender, self) >= permit.value, "permit failed"
 
 
 @pure
@@ -1182,6 +1365,28 @@ def _compute_real_rental_amount(duration: uint256, real_duration: uint256, renta
     return rental_amount * real_duration // duration
 
 
+@view
+@internal
+def _staking_pool() -> address:
+    staking_addr: address = self.staking_addr
+    assert staking_addr != empty(address), "staking not supported"
+    return staking_addr
+
+
+@view
+@internal
+def _check_staking_context(token_context: TokenContext):
+    assert msg.sender == token_context.nft_owner, "not owner"
+    self._check_context(token_context)
+
+
+@view
+@internal
+def _check_owner_context(token_context: TokenContext):
+    self._check_context(token_context)
+    assert token_context.nft_owner == msg.sender, "not owner"
+
+
 @internal
 def _check_not_paused():
     assert not self.paused, "paused"
@@ -1217,12 +1422,186 @@ def _consolidate_claims(token_id: uint256, nft_owner: address, active_rental: Re
 
 
 @internal
-def _check_valid_listing(token_id: uint256, signed_listing: SignedListing, signature_timestamp:uint256, nft_owner: address):
+def _write_accrual(accrual: Accrual):
+    if accrual.rewards > 0:
+        self.unclaimed_rewards[accrual.owner] += accrual.rewards
+    if accrual.protocol_fees > 0:
+        self.protocol_fees_amount += accrual.protocol_fees
+
+
+@internal
+def _start_rental(token_context: TokenContext, signed_listing: SignedListing, duration: uint256, delegate: address, signature_timestamp: uint256, check_signatures: bool, accrual: Accrual) -> (RentalLog, Accrual):
+    self._check_context(token_context)
+    vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
+    assert not self._is_rental_active(token_context.active_rental), "active rental"
+    assert self._is_within_duration_range(signed_listing.listing, duration), "duration not respected"
+    assert signed_listing.listing.price > 0, "listing not active"
+    self._check_valid_listing(token_context.token_id, signed_listing, signature_timestamp, token_context.nft_owner, check_signatures)
+
+    expiration: uint256 = block.timestamp + duration * 3600
+    extcall vault.delegate_to_wallet(delegate if delegate != empty(address) else msg.sender, expiration)
+
+    # accrue the unclaimed rewards and protocol fee of an expired rental, its state being replaced below
+    pending: Accrual = accrual
+    if token_context.active_rental.amount > 0 and token_context.active_rental.expiration < block.timestamp:
+        if token_context.active_rental.owner != pending.owner:
+            self._write_accrual(pending)
+            pending = Accrual({owner: token_context.active_rental.owner, rewards: 0, protocol_fees: 0})
+        protocol_fee_amount: uint256 = token_context.active_rental.amount * token_context.active_rental.protocol_fee // 10000
+        pending.rewards += token_context.active_rental.amount - protocol_fee_amount
+        pending.protocol_fees += protocol_fee_amount
+
+    # create rental
+    rental_id: bytes32 = self._compute_rental_id(msg.sender, token_context.token_id, block.timestamp, expiration)
+
+    new_rental: Rental = Rental({
+        id: rental_id,
+        owner: token_context.nft_owner,
+        renter: msg.sender,
+        delegate: delegate,
+        token_id: token_context.token_id,
+        start: block.timestamp,
+        min_expiration: block.timestamp + signed_listing.listing.min_duration * 3600,
+        expiration: expiration,
+        amount: self._compute_rental_amount(block.timestamp, expiration, signed_listing.listing.price),
+        protocol_fee: self.protocol_fee,
+    })
+
+    self._store_token_state(token_context.token_id, token_context.nft_owner, new_rental)
+
+    return RentalLog({
+        id: rental_id,
+        vault: vault.address,
+        owner: token_context.nft_owner,
+        token_id: token_context.token_id,
+        start: block.timestamp,
+        min_expiration: new_rental.min_expiration,
+        expiration: expiration,
+        amount: new_rental.amount,
+        protocol_fee: new_rental.protocol_fee,
+    }), pending
+
+
+@internal
+def _extend_rental(token_context: TokenContext, signed_listing: SignedListing, duration: uint256, signature_timestamp: uint256, check_signatures: bool, accrual: Accrual) -> (RentalExtensionLog, Accrual):
+    self._check_context(token_context)
+    vault: IVault = IVault(self._tokenid_to_vault(token_context.token_id))
+    assert self._is_rental_active(token_context.active_rental), "no active rental"
+    assert msg.sender == token_context.active_rental.renter, "not renter of active rental"
+
+    assert self._is_within_duration_range(signed_listing.listing, duration), "duration not respected"
+    assert signed_listing.listing.price > 0, "listing not active"
+    self._check_valid_listing(token_context.token_id, signed_listing, signature_timestamp, token_context.nft_owner, check_signatures)
+
+    expiration: uint256 = block.timestamp + duration * 3600
+    real_expiration_adjusted: uint256 = block.timestamp
+    if block.timestamp < token_context.active_rental.min_expiration:
+        real_expiration_adjusted = token_context.active_rental.min_expiration
+
+    pro_rata_rental_amount: uint256 = self._compute_real_rental_amount(
+        token_context.active_rental.expiration - token_context.active_rental.start,
+        real_expiration_adjusted - token_context.active_rental.start,
+        token_context.active_rental.amount
+    )
+    new_rental_amount: uint256 = self._compute_rental_amount(block.timestamp, expiration, signed_listing.listing.price)
+    protocol_fee_amount: uint256 = pro_rata_rental_amount * token_context.active_rental.protocol_fee // 10000
+
+    new_rental: Rental = Rental({
+        id: token_context.active_rental.id,
+        owner: token_context.nft_owner,
+        renter: msg.sender,
+        delegate: token_context.active_rental.delegate,
+        token_id: token_context.token_id,
+        start: block.timestamp,
+        min_expiration: block.timestamp + signed_listing.listing.min_duration * 3600,
+        expiration: expiration,
+        amount: new_rental_amount,
+        protocol_fee: self.protocol_fee,
+    })
+    # update active rental
+    self._store_token_state(token_context.token_id, token_context.nft_owner, new_rental)
+
+    # accrue unclaimed rewards and protocol fee
+    pending: Accrual = accrual
+    if token_context.nft_owner != pending.owner:
+        self._write_accrual(pending)
+        pending = Accrual({owner: token_context.nft_owner, rewards: 0, protocol_fees: 0})
+    pending.rewards += pro_rata_rental_amount - protocol_fee_amount
+    pending.protocol_fees += protocol_fee_amount
+
+    # extend delegation
+    extcall vault.delegate_to_wallet(token_context.active_rental.delegate, expiration)
+
+    return RentalExtensionLog({
+        id: token_context.active_rental.id,
+        vault: vault.address,
+        owner: token_context.active_rental.owner,
+        token_id: token_context.active_rental.token_id,
+        start: block.timestamp,
+        min_expiration: block.timestamp + signed_listing.listing.min_duration * 3600,
+        expiration: expiration,
+        amount_settled: pro_rata_rental_amount,
+        extension_amount: new_rental_amount,
+        protocol_fee: token_context.active_rental.protocol_fee,
+    }), pending
+
+
+@internal
+@payable
+def _settle_extensions(payback_amounts: uint256, extension_amounts: uint256, accrual: Accrual):
+    self._write_accrual(accrual)
+
+    if payback_amounts > extension_amounts:
+        self._transfer_payment_token(msg.sender, payback_amounts - extension_amounts)
+    self._receive_payment_token(msg.sender, extension_amounts - min(payback_amounts, extension_amounts))
+
+
+@pure
+@internal
+def _unpack_context(context: CompactTokenContextAndListing, compact: CompactRental) -> TokenContextAndListing:
+    rental: Rental = empty(Rental)
+    if context.terms & 255 != 0:
+        rental = Rental({
+            id: compact.id,
+            owner: convert(compact.owner_amount >> 96, address),
+            renter: convert(compact.renter_times >> 96, address),
+            delegate: convert(compact.delegate_expiration >> 96, address),
+            token_id: context.token_id,
+            start: compact.renter_times >> 56 & _UINT40_MASK,
+            min_expiration: compact.renter_times >> 16 & _UINT40_MASK,
+            expiration: compact.delegate_expiration >> 56 & _UINT40_MASK,
+            amount: compact.owner_amount & _UINT96_MASK,
+            protocol_fee: compact.renter_times & 65535,
+        })
+    return TokenContextAndListing({
+        token_context: TokenContext({
+            token_id: context.token_id,
+            nft_owner: convert(context.owner_price >> 96, address),
+            active_rental: rental,
+        }),
+        signed_listing: SignedListing({
+            listing: Listing({
+                token_id: context.token_id,
+                price: context.owner_price & _UINT96_MASK,
+                min_duration: context.terms >> 224,
+                max_duration: context.terms >> 192 & _UINT32_MASK,
+                timestamp: context.terms >> 152 & _UINT40_MASK,
+            }),
+            owner_signature: Signature({v: context.terms >> 16 & 255, r: context.owner_signature[0], s: context.owner_signature[1]}),
+            admin_signature: Signature({v: context.terms >> 8 & 255, r: context.admin_signature[0], s: context.admin_signature[1]}),
+        }),
+        duration: context.terms >> 24 & _UINT32_MASK,
+    })
+
+
+@internal
+def _check_valid_listing(token_id: uint256, signed_listing: SignedListing, signature_timestamp:uint256, nft_owner: address, check_signatures: bool):
     assert token_id == signed_listing.listing.token_id, "invalid token_id"
-    assert self._is_listing_signed_by_owner(signed_listing, nft_owner), "invalid owner signature"
-    assert self._is_listing_signed_by_admin(signed_listing, signature_timestamp), "invalid admin signature"
+    if check_signatures:
+        assert self._is_listing_signed_by_owner(signed_listing, nft_owner), "invalid owner signature"
+        assert self._is_signed_by_admin(keccak256(abi_encode(signed_listing.owner_signature)), signed_listing.admin_signature, signature_timestamp), "invalid admin signature"
     assert signature_timestamp + LISTINGS_SIGNATURE_VALID_PERIOD > block.timestamp, "listing expired"
-    assert self.listing_revocations[signed_listing.listing.token_id] < signed_listing.listing.timestamp, "listing revoked"
+    assert self.token_slots[signed_listing.listing.token_id] & _REVOCATION_MASK < signed_listing.listing.timestamp, "listing revoked"
 
 
 @internal
@@ -1230,18 +1609,55 @@ def _is_within_duration_range(listing: Listing, duration: uint256) -> bool:
     return duration >= listing.min_duration and (listing.max_duration == 0 or duration <= listing.max_duration)
 
 
+@internal
+def _compute_listing_root(listing: Listing, proof: DynArray[bytes32, 10]) -> bytes32:
+    # sorted pairs, so the proof doesn't need the position of each sibling
+    node: bytes32 = keccak256(abi_encode(LISTING_TYPE_HASH, listing))
+    for sibling: bytes32 in proof:
+        if convert(node, uint256) < convert(sibling, uint256):
+            node = keccak256(concat(node, sibling))
+        else:
+            node = keccak256(concat(sibling, node))
+    return node
+
+
+@internal
+def _check_owner_signatures(owner_signatures: DynArray[Signature, 32], admin_signature: Signature, signature_timestamp: uint256):
+    # the admin signs the chained hashes of the owner signatures, the same message as for a single listing if there is only one
+    signatures_hash: bytes32 = empty(bytes32)
+    for owner_signature: Signature in owner_signatures:
+        signature_hash: bytes32 = keccak256(abi_encode(owner_signature))
+        if signatures_hash != empty(bytes32):
+            signature_hash = keccak256(concat(signatures_hash, signature_hash))
+        signatures_hash = signature_hash
+    assert self._is_signed_by_admin(signatures_hash, admin_signature, signature_timestamp), "invalid admin signature"
+
+
+@internal
+def _check_root_listing(context: TokenContextAndRootListing, owner_signature: Signature):
+    # the signer is recovered once per root and transaction, the owner is still checked for each listing
+    root: bytes32 = self._compute_listing_root(context.listing, context.proof)
+    cache_key: bytes32 = keccak256(abi_encode(root, owner_signature))
+    root_signer: address = self.root_signers[cache_key]
+    if root_signer == empty(address):
+        struct_hash: bytes32 = root
+        if len(context.proof) > 0:
+            struct_hash = keccak256(abi_encode(LISTINGS_ROOT_TYPE_HASH, root))
+        root_signer = self._recover_typed_data_signer(struct_hash, owner_signature)
+        self.root_signers[cache_key] = root_signer
+    assert root_signer == context.token_context.nft_owner, "invalid owner signature"
+
+
+@internal
+def _root_signed_listing(listing: Listing) -> SignedListing:
+    # the signatures of a listing signed through a root are already checked
+    return SignedListing({listing: listing, owner_signature: empty(Signature), admin_signature: empty(Signature)})
+
+
 @internal
 def _is_listing_signed_by_owner(signed_listing: SignedListing, owner: address) -> bool:
     return ecrecover(
-        keccak256(
-            concat(
-                convert("\x19\x01", Bytes[2]),
-                abi_encode(
-                    listing_sig_domain_separator,
-                    keccak256(abi_encode(LISTING_TYPE_HASH, signed_listing.listing))
-                )
-            )
-        ),
+        keccak256(concat(convert("\x19\x01", Bytes[2]), abi_encode(listing_sig_domain_separator, keccak256(abi_encode(LISTING_TYPE_HASH, signed_listing.listing))))),
         signed_listing.owner_signature.v,
         signed_listing.owner_signature.r,
         signed_listing.owner_signature.s
@@ -1249,17 +1665,27 @@ def _is_listing_signed_by_owner(signed_listing: SignedListing, owner: address) -
 
 
 @internal
-def _is_listing_signed_by_admin(signed_listing: SignedListing, signature_timestamp: uint256) -> bool:
+def _recover_typed_data_signer(struct_hash: bytes32, signature: Signature) -> address:
+    return ecrecover(
+        keccak256(concat(convert("\x19\x01", Bytes[2]), abi_encode(listing_sig_domain_separator, struct_hash))),
+        signature.v,
+        signature.r,
+        signature.s
+    )
+
+
+@internal
+def _is_signed_by_admin(signed_hash: bytes32, admin_signature: Signature, signature_timestamp: uint256) -> bool:
     return ecrecover(
         keccak256(
             concat(
                 convert("\x19\x00", Bytes[2]),
                 convert(self, bytes20),
-                keccak256(abi_encode(signed_listing.owner_signature)),
+                signed_hash,
                 convert(signature_timestamp, bytes32)
             )
         ),
-        signed_listing.admin_signature.v,
-        signed_listing.admin_signature.r,
-        signed_listing.admin_signature.s
+        admin_signature.v,
+        admin_signature.r,
+        admin_signature.s
     ) == self.protocol_admin
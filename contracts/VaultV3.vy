@@ -81,13 +81,14 @@ def deposit(token_id: uint256, nft_owner: address, delegate: address):
     @notice Deposit an NFT into the vault and optionaly sets up delegation.
     @dev Transfers the NFT from the owner to the vault and optionally sets up delegation.
     @param token_id The id of the NFT to be deposited.
-    @param nft_owner The address of the NFT owner.
+    @param nft_owner The address of the NFT owner, or the vault itself if the NFT was already transferred by the caller.
     @param delegate The address to delegate the NFT to. If empty no delegation is done.
     """
 
     assert msg.sender == self.caller, "not caller"
 
-    extcall nft_contract.safeTransferFrom(nft_owner, self, token_id, b"")
+    if nft_owner != self:
+        extcall nft_contract.safeTransferFrom(nft_owner, self, token_id, b"")
 
     if delegate != empty(address):
         self._delegate_to_wallet(delegate, max_value(uint256))
@@ -0,0 +1,95 @@
+# @dev ERC-20 token with EIP-2612 permits, for testing permit based payments
+# https://github.com/ethereum/EIPs/blob/master/EIPS/eip-2612.md
+
+# @version 0.4.1
+
+from ethereum.ercs import IERC20
+from ethereum.ercs import IERC20Detailed
+
+implements: IERC20
+implements: IERC20Detailed
+
+event Transfer:
+    sender: indexed(address)
+    receiver: indexed(address)
+    value: uint256
+
+event Approval:
+    owner: indexed(address)
+    spender: indexed(address)
+    value: uint256
+
+PERMIT_TYPE_HASH: constant(bytes32) = keccak256("Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)")
+DOMAIN_TYPE_HASH: constant(bytes32) = keccak256("EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+
+name: public(String[32])
+symbol: public(String[32])
+decimals: public(uint8)
+balanceOf: public(HashMap[address, uint256])
+allowance: public(HashMap[address, HashMap[address, uint256]])
+totalSupply: public(uint256)
+minter: public(address)
+nonces: public(HashMap[address, uint256])
+DOMAIN_SEPARATOR: public(immutable(bytes32))
+
+
+@deploy
+def __init__(_name: String[32], _symbol: String[32], _decimals: uint8, _supply: uint256):
+    init_supply: uint256 = _supply * 10 ** convert(_decimals, uint256)
+    self.name = _name
+    self.symbol = _symbol
+    self.decimals = _decimals
+    self.balanceOf[msg.sender] = init_supply
+    self.totalSupply = init_supply
+    self.minter = msg.sender
+    DOMAIN_SEPARATOR = keccak256(abi_encode(DOMAIN_TYPE_HASH, keccak256(_name), keccak256("1"), chain.id, self))
+    log Transfer(empty(address), msg.sender, init_supply)
+
+
+@external
+def transfer(_to : address, _value : uint256) -> bool:
+    self.balanceOf[msg.sender] -= _value
+    self.balanceOf[_to] += _value
+    log Transfer(msg.sender, _to, _value)
+    return True
+
+
+@external
+def transferFrom(_from : address, _to : address, _value : uint256) -> bool:
+    self.balanceOf[_from] -= _value
+    self.balanceOf[_to] += _value
+    self.allowance[_from][msg.sender] -= _value
+    log Transfer(_from, _to, _value)
+    return True
+
+
+@external
+def approve(_spender : address, _value : uint256) -> bool:
+    self.allowance[msg.sender][_spender] = _value
+    log Approval(msg.sender, _spender, _value)
+    return True
+
+
+@external
+def permit(_owner: address, _spender: address, _value: uint256, _deadline: uint256, _v: uint8, _r: bytes32, _s: bytes32):
+    """
+    @dev Approves `_spender` for `_value` tokens of `_owner` with the owner's EIP-712 signature.
+    """
+    assert _deadline >= block.timestamp, "permit expired"
+    nonce: uint256 = self.nonces[_owner]
+    struct_hash: bytes32 = keccak256(abi_encode(PERMIT_TYPE_HASH, _owner, _spender, _value, nonce, _deadline))
+    digest: bytes32 = keccak256(concat(b"\x19\x01", DOMAIN_SEPARATOR, struct_hash))
+    signer: address = ecrecover(digest, _v, _r, _s)
+    assert signer != empty(address) and signer == _owner, "invalid permit"
+    self.nonces[_owner] = nonce + 1
+    self.allowance[_owner][_spender] = _value
+    log Approval(_owner, _spender, _value)
+
+
+@external
+def mint(_to: address, _value: uint256):
+    assert msg.sender == self.minter
+    assert _to != empty(address)
+    self.totalSupply += _value
+    self.balanceOf[_to] += _value
+    log Transfer(empty(address), _to, _value)
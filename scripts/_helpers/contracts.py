@@ -269,7 +269,7 @@ class RentingV3Contract(ContractConfig):
         version: str | None = None,
         abi_key: str,
         vault_impl_key: str,
-        payment_token_key: str,
+        payment_token_key: str | None = None,  # None to pay in the native currency
         nft_contract_key: str,
         delegation_registry_key: str,
         renting_erc721_contract_key: str,
@@ -280,6 +280,7 @@ class RentingV3Contract(ContractConfig):
         protocol_admin: str | None = None,
         address: str | None = None,
     ):
+        payment_token_deps = [payment_token_key] if payment_token_key else []
         staking_deps = [staking_contract_key] if staking_contract_key else []
         super().__init__(
             key,
@@ -290,7 +291,7 @@ class RentingV3Contract(ContractConfig):
             container_name="RentingV3",
             deployment_deps=[
                 vault_impl_key,
-                payment_token_key,
+                *payment_token_deps,
                 nft_contract_key,
                 delegation_registry_key,
                 renting_erc721_contract_key,
@@ -298,7 +299,7 @@ class RentingV3Contract(ContractConfig):
             ],
             deployment_args=[
                 vault_impl_key,
-                payment_token_key,
+                payment_token_key or ZERO_ADDRESS,
                 nft_contract_key,
                 delegation_registry_key,
                 renting_erc721_contract_key,
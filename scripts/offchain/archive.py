@@ -0,0 +1,260 @@
+import mmap
+import os
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+from eth_utils import to_checksum_address
+
+from .structs import EventLog, RentalExtensionLog, RentalLog
+
+ARCHIVE_MAGIC = b"ZRLA"
+ARCHIVE_VERSION = 1
+HEADER = struct.Struct("<4sIQ")  # magic, version, committed record count
+HEADER_SIZE = 64
+
+RENTAL_STARTED = 0
+RENTAL_CLOSED = 1
+RENTAL_EXTENDED = 2
+EVENT_KINDS = {"RentalStarted": RENTAL_STARTED, "RentalClosed": RENTAL_CLOSED, "RentalExtended": RENTAL_EXTENDED}
+
+# RentalLog and RentalExtensionLog in a single layout, `extension_amount` is zero for RentalLog records
+RECORD_DTYPE = np.dtype(
+    [
+        ("block_number", "<u8"),
+        ("log_index", "<u4"),
+        ("protocol_fee", "<u2"),
+        ("kind", "u1"),
+        ("item", "u1"),  # position of the rental in the event
+        ("id", "u1", 32),
+        ("token_id", "<u8"),
+        ("start", "<u8"),
+        ("min_expiration", "<u8"),
+        ("expiration", "<u8"),
+        ("vault", "u1", 20),
+        ("owner", "u1", 20),
+        ("amount", "u1", 32),
+        ("extension_amount", "u1", 32),
+    ]
+)
+TOKEN_INDEX_DTYPE = np.dtype([("token_id", "<u8"), ("position", "<u8")])
+BLOCK_INDEX_DTYPE = np.dtype([("block_number", "<u8"), ("position", "<u8")])
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_paths(path: str | Path) -> tuple[Path, Path, Path]:
+    path = Path(path)
+    return path.with_suffix(".dat"), path.with_suffix(".tokens"), path.with_suffix(".blocks")
+
+
+def to_record(event: EventLog, item: int, log: RentalLog | RentalExtensionLog) -> np.void:
+    record = np.zeros((), dtype=RECORD_DTYPE)
+    record["block_number"] = event.block_number
+    record["log_index"] = event.log_index
+    record["protocol_fee"] = log.protocol_fee
+    record["kind"] = EVENT_KINDS[event.name]
+    record["item"] = item
+    record["id"] = np.frombuffer(log.id, dtype=np.uint8)
+    record["token_id"] = log.token_id
+    record["start"] = log.start
+    record["min_expiration"] = log.min_expiration
+    record["expiration"] = log.expiration
+    record["vault"] = np.frombuffer(bytes.fromhex(log.vault[2:]), dtype=np.uint8)
+    record["owner"] = np.frombuffer(bytes.fromhex(log.owner[2:]), dtype=np.uint8)
+    if isinstance(log, RentalExtensionLog):
+        record["amount"] = np.frombuffer(log.amount_settled.to_bytes(32, "big"), dtype=np.uint8)
+        record["extension_amount"] = np.frombuffer(log.extension_amount.to_bytes(32, "big"), dtype=np.uint8)
+    else:
+        record["amount"] = np.frombuffer(log.amount.to_bytes(32, "big"), dtype=np.uint8)
+    return record
+
+
+def to_log(record: np.void) -> RentalLog | RentalExtensionLog:
+    fields = (
+        record["id"].tobytes(),
+        to_checksum_address(record["vault"].tobytes()),
+        to_checksum_address(record["owner"].tobytes()),
+        int(record["token_id"]),
+        int(record["start"]),
+        int(record["min_expiration"]),
+        int(record["expiration"]),
+        int.from_bytes(record["amount"].tobytes(), "big"),
+    )
+    if record["kind"] == RENTAL_EXTENDED:
+        return RentalExtensionLog(
+            *fields, int.from_bytes(record["extension_amount"].tobytes(), "big"), int(record["protocol_fee"])
+        )
+    return RentalLog(*fields, int(record["protocol_fee"]))
+
+
+class ArchiveWriter:
+    """
+    Single writer of an append-only archive of rental logs. Records and their sidecar index entries are written and
+    synced past the committed region first, and only then the committed count in the header is updated, so readers
+    never see a partial append. Anything past the committed count (from a crash mid append) is dropped on open.
+    """
+
+    def __init__(self, path: str | Path):
+        self.data_path, self.tokens_path, self.blocks_path = archive_paths(path)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fds = [os.open(p, os.O_RDWR | os.O_CREAT, 0o644) for p in (self.data_path, self.tokens_path, self.blocks_path)]
+        self._data, self._tokens, self._blocks = self._fds
+
+        header = os.pread(self._data, HEADER.size, 0)
+        if len(header) == HEADER.size:
+            self.count = _parse_header(header)
+        else:
+            self.count = 0
+            self._commit(0)
+        self._recover()
+
+    def _recover(self):
+        os.ftruncate(self._data, HEADER_SIZE + self.count * RECORD_DTYPE.itemsize)
+        os.ftruncate(self._tokens, self.count * TOKEN_INDEX_DTYPE.itemsize)
+        blocks = _read_array(self._blocks, BLOCK_INDEX_DTYPE)
+        self._block_entries = int(np.searchsorted(blocks["position"], self.count))
+        os.ftruncate(self._blocks, self._block_entries * BLOCK_INDEX_DTYPE.itemsize)
+        if self.count:
+            last = np.frombuffer(
+                os.pread(self._data, RECORD_DTYPE.itemsize, HEADER_SIZE + (self.count - 1) * RECORD_DTYPE.itemsize),
+                dtype=RECORD_DTYPE,
+            )[0]
+            self.last_position = _position(last)
+        else:
+            self.last_position = (-1, -1, -1)
+
+    def _commit(self, count: int):
+        os.pwrite(self._data, HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, count).ljust(HEADER_SIZE, b"\x00"), 0)
+        os.fsync(self._data)
+        self.count = count
+
+    def append_records(self, records: np.ndarray):
+        if not len(records):
+            return
+        records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+        block_steps = np.diff(records["block_number"].astype(np.int64))
+        item_steps = np.diff(records["log_index"].astype(np.int64) * 256 + records["item"])
+        if _position(records[0]) <= self.last_position or ((block_steps < 0) | ((block_steps == 0) & (item_steps <= 0))).any():
+            raise ArchiveError(f"records must be appended in (block, log index, item) order after {self.last_position}")
+
+        positions_in_archive = np.arange(self.count, self.count + len(records), dtype=np.uint64)
+        tokens = np.empty(len(records), dtype=TOKEN_INDEX_DTYPE)
+        tokens["token_id"] = records["token_id"]
+        tokens["position"] = positions_in_archive
+
+        new_block = np.ones(len(records), dtype=bool)
+        new_block[1:] = records["block_number"][1:] != records["block_number"][:-1]
+        new_block[0] = int(records["block_number"][0]) != self.last_position[0]
+        blocks = np.empty(int(new_block.sum()), dtype=BLOCK_INDEX_DTYPE)
+        blocks["block_number"] = records["block_number"][new_block]
+        blocks["position"] = positions_in_archive[new_block]
+
+        os.pwrite(self._data, records.tobytes(), HEADER_SIZE + self.count * RECORD_DTYPE.itemsize)
+        os.pwrite(self._tokens, tokens.tobytes(), self.count * TOKEN_INDEX_DTYPE.itemsize)
+        os.pwrite(self._blocks, blocks.tobytes(), self._block_entries * BLOCK_INDEX_DTYPE.itemsize)
+        for fd in self._fds:
+            os.fsync(fd)
+
+        self._commit(self.count + len(records))
+        self._block_entries += len(blocks)
+        self.last_position = _position(records[-1])
+
+    def append(self, events: Iterable[EventLog]):
+        # archives the rental logs of RentalStarted, RentalClosed and RentalExtended, ignoring other events
+        records = []
+        for event in events:
+            if event.name not in EVENT_KINDS:
+                continue
+            log_type = RentalExtensionLog if event.name == "RentalExtended" else RentalLog
+            records.extend(to_record(event, item, log_type(*log)) for item, log in enumerate(event.args["rentals"]))
+        self.append_records(np.array(records, dtype=RECORD_DTYPE))
+
+    def close(self):
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Lock free reader of an archive, mapping the files read only and exposing the records as numpy arrays backed by
+    the mapping. `refresh` picks up the records committed since the last call.
+    """
+
+    def __init__(self, path: str | Path):
+        self.data_path, self.tokens_path, self.blocks_path = archive_paths(path)
+        self.count = 0
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
+        self._token_ids = np.empty(0, dtype=np.uint64)
+        self._token_positions = np.empty(0, dtype=np.uint64)
+        self._blocks = np.empty(0, dtype=BLOCK_INDEX_DTYPE)
+        self.refresh()
+
+    def refresh(self) -> int:
+        with open(self.data_path, "rb") as f:
+            count = _parse_header(f.read(HEADER.size))
+            if count == self.count:
+                return count
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER_SIZE)
+
+        tokens = _map_array(self.tokens_path, TOKEN_INDEX_DTYPE)[:count]
+        order = np.argsort(tokens["token_id"], kind="stable")
+        self._token_ids = tokens["token_id"][order]
+        self._token_positions = tokens["position"][order]
+
+        blocks = _map_array(self.blocks_path, BLOCK_INDEX_DTYPE)
+        self._blocks = blocks[: np.searchsorted(blocks["position"], count)]
+        self.count = count
+        return count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def token_records(self, token_id: int) -> np.ndarray:
+        start, stop = np.searchsorted(self._token_ids, [token_id, token_id + 1])
+        return self.records[self._token_positions[start:stop]]
+
+    def block_records(self, from_block: int, to_block: int) -> np.ndarray:
+        # records of blocks `from_block` to `to_block`, both included
+        start, stop = np.searchsorted(self._blocks["block_number"], [from_block, to_block + 1])
+        first = int(self._blocks["position"][start]) if start < len(self._blocks) else self.count
+        last = int(self._blocks["position"][stop]) if stop < len(self._blocks) else self.count
+        return self.records[first:last]
+
+    def logs(self, records: np.ndarray | None = None) -> list[RentalLog | RentalExtensionLog]:
+        return [to_log(record) for record in (self.records if records is None else records)]
+
+
+def _position(record: np.void) -> tuple[int, int, int]:
+    return int(record["block_number"]), int(record["log_index"]), int(record["item"])
+
+
+def _parse_header(header: bytes) -> int:
+    magic, version, count = HEADER.unpack(header)
+    if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+        raise ArchiveError(f"not a version {ARCHIVE_VERSION} rental archive")
+    return count
+
+
+def _read_array(fd: int, dtype: np.dtype) -> np.ndarray:
+    size = os.fstat(fd).st_size
+    return np.frombuffer(os.pread(fd, size, 0), dtype=dtype, count=size // dtype.itemsize)
+
+
+def _map_array(path: Path, dtype: np.dtype) -> np.ndarray:
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), dtype=dtype, count=size // dtype.itemsize)
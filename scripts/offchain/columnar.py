@@ -0,0 +1,149 @@
+from collections.abc import Iterable
+
+import numpy as np
+from eth_utils import to_checksum_address
+
+from .structs import Rental, TokenContext
+
+ADDRESS_COLUMNS = ("nft_owner", "owner", "renter", "delegate")
+UINT_COLUMNS = ("token_id", "rental_token_id", "start", "min_expiration", "expiration")
+COLUMNS = (*ADDRESS_COLUMNS, *UINT_COLUMNS, "rental_id", "amount", "protocol_fee")
+
+ADDRESS_SIZE = 20
+BYTES32_SIZE = 32
+UINT64_MAX = 2**64 - 1
+
+
+class ColumnarStore:
+    """
+    TokenContext store keeping each field in its own fixed width array, one row per deposited token. Addresses,
+    rental ids and amounts are kept as raw big endian bytes, the remaining fields as uint64 (uint16 for the fee).
+    Rows stay packed at the start of the arrays, so queries run over `[:len(store)]` without a presence mask.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._rows: dict[int, int] = {}
+        self._size = 0
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity: int):
+        columns = {
+            **{name: np.zeros((capacity, ADDRESS_SIZE), dtype=np.uint8) for name in ADDRESS_COLUMNS},
+            **{name: np.zeros(capacity, dtype=np.uint64) for name in UINT_COLUMNS},
+            "rental_id": np.zeros((capacity, BYTES32_SIZE), dtype=np.uint8),
+            "amount": np.zeros((capacity, BYTES32_SIZE), dtype=np.uint8),
+            "protocol_fee": np.zeros(capacity, dtype=np.uint16),
+        }
+        for name, column in columns.items():
+            current = getattr(self, name, None)
+            if current is not None:
+                column[: self._size] = current[: self._size]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, token_id: int) -> bool:
+        return token_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def set(self, context: TokenContext):
+        rental = context.active_rental
+        if max(context.token_id, rental.token_id, rental.start, rental.min_expiration, rental.expiration) > UINT64_MAX:
+            raise ValueError(f"token {context.token_id} doesn't fit the uint64 columns")
+
+        row = self._rows.get(context.token_id)
+        if row is None:
+            if self._size == self.capacity:
+                self._allocate(self.capacity * 2)
+            row = self._rows[context.token_id] = self._size
+            self._size += 1
+
+        self.token_id[row] = context.token_id
+        self.nft_owner[row] = _address_bytes(context.nft_owner)
+        self.rental_id[row] = np.frombuffer(rental.id, dtype=np.uint8)
+        self.owner[row] = _address_bytes(rental.owner)
+        self.renter[row] = _address_bytes(rental.renter)
+        self.delegate[row] = _address_bytes(rental.delegate)
+        self.rental_token_id[row] = rental.token_id
+        self.start[row] = rental.start
+        self.min_expiration[row] = rental.min_expiration
+        self.expiration[row] = rental.expiration
+        self.amount[row] = np.frombuffer(rental.amount.to_bytes(BYTES32_SIZE, "big"), dtype=np.uint8)
+        self.protocol_fee[row] = rental.protocol_fee
+
+    def update(self, contexts: Iterable[TokenContext]):
+        for context in contexts:
+            self.set(context)
+
+    def remove(self, token_id: int):
+        # moves the last row into the freed one to keep the rows packed
+        row = self._rows.pop(token_id)
+        last = self._size - 1
+        if row != last:
+            for name in COLUMNS:
+                column = getattr(self, name)
+                column[row] = column[last]
+            self._rows[int(self.token_id[row])] = row
+        self._size = last
+
+    def get(self, token_id: int) -> TokenContext | None:
+        row = self._rows.get(token_id)
+        if row is None:
+            return None
+        return TokenContext(
+            int(self.token_id[row]),
+            _address(self.nft_owner[row]),
+            Rental(
+                self.rental_id[row].tobytes(),
+                _address(self.owner[row]),
+                _address(self.renter[row]),
+                _address(self.delegate[row]),
+                int(self.rental_token_id[row]),
+                int(self.start[row]),
+                int(self.min_expiration[row]),
+                int(self.expiration[row]),
+                int.from_bytes(self.amount[row].tobytes(), "big"),
+                int(self.protocol_fee[row]),
+            ),
+        )
+
+    def to_tuple(self, token_id: int) -> tuple:
+        # the `TokenContext` argument layout of RentingV3
+        return self.get(token_id).to_tuple()
+
+    def token_ids(self, mask: np.ndarray | None = None) -> np.ndarray:
+        token_ids = self.token_id[: self._size]
+        return token_ids if mask is None else token_ids[mask]
+
+    # vectorized queries, each returning a boolean mask over the rows, to be combined and passed to `token_ids`
+
+    def has_rental(self) -> np.ndarray:
+        return self.rental_id[: self._size].any(axis=1)
+
+    def expired(self, timestamp: int) -> np.ndarray:
+        return self.has_rental() & (self.expiration[: self._size] < timestamp)
+
+    def active(self, timestamp: int) -> np.ndarray:
+        return self.has_rental() & (self.expiration[: self._size] >= timestamp)
+
+    def unclaimed(self) -> np.ndarray:
+        return self.amount[: self._size].any(axis=1)
+
+    def owned_by(self, address: str) -> np.ndarray:
+        return (self.nft_owner[: self._size] == _address_bytes(address)).all(axis=1)
+
+    def rented_by(self, address: str) -> np.ndarray:
+        return self.has_rental() & (self.renter[: self._size] == _address_bytes(address)).all(axis=1)
+
+
+def _address_bytes(address: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(address[2:]), dtype=np.uint8)
+
+
+def _address(value: np.ndarray) -> str:
+    return to_checksum_address(value.tobytes())
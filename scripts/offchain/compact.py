@@ -0,0 +1,64 @@
+from collections.abc import Iterable
+
+from .structs import Rental, Signature, TokenContextAndListing
+
+
+def _fit(value: int, bits: int, name: str) -> int:
+    if not 0 <= value < 1 << bits:
+        raise ValueError(f"{name} {value} doesn't fit in {bits} bits")
+    return value
+
+
+def _address(address: str) -> int:
+    return int(address, 16)
+
+
+def _signature(signature: Signature) -> tuple[int, int]:
+    return (signature.r, signature.s)
+
+
+def compact_rental(rental: Rental) -> tuple:
+    # RentingV3 CompactRental, the rental token id being the one of its token context
+    return (
+        rental.id,
+        _address(rental.owner) << 96 | _fit(rental.amount, 96, "amount"),
+        _address(rental.renter) << 96
+        | _fit(rental.start, 40, "start") << 56
+        | _fit(rental.min_expiration, 40, "min_expiration") << 16
+        | _fit(rental.protocol_fee, 16, "protocol_fee"),
+        _address(rental.delegate) << 96 | _fit(rental.expiration, 40, "expiration") << 56,
+    )
+
+
+def compact_context(context: TokenContextAndListing) -> tuple:
+    # RentingV3 CompactTokenContextAndListing, the listing token id being the one of its token context
+    token_context, signed_listing = context.token_context, context.signed_listing
+    listing = signed_listing.listing
+    if listing.token_id != token_context.token_id:
+        raise ValueError(f"listing of token {listing.token_id} for the context of token {token_context.token_id}")
+    return (
+        token_context.token_id,
+        _address(token_context.nft_owner) << 96 | _fit(listing.price, 96, "price"),
+        _fit(listing.min_duration, 32, "min_duration") << 224
+        | _fit(listing.max_duration, 32, "max_duration") << 192
+        | _fit(listing.timestamp, 40, "timestamp") << 152
+        | _fit(context.duration, 32, "duration") << 24
+        | _fit(signed_listing.owner_signature.v, 8, "owner signature v") << 16
+        | _fit(signed_listing.admin_signature.v, 8, "admin signature v") << 8
+        | (token_context.active_rental != Rental()),
+        _signature(signed_listing.owner_signature),
+        _signature(signed_listing.admin_signature),
+    )
+
+
+def encode_compact(contexts: Iterable[TokenContextAndListing]) -> tuple[list[tuple], list[tuple]]:
+    # the `token_contexts` and `rentals` arguments of RentingV3 `start_rentals_compact` and `extend_rentals_compact`
+    compact_contexts, rentals = [], []
+    for context in contexts:
+        compact_contexts.append(compact_context(context))
+        token_id, rental = context.token_context.token_id, context.token_context.active_rental
+        if rental != Rental():
+            if rental.token_id != token_id:
+                raise ValueError(f"rental of token {rental.token_id} for the context of token {token_id}")
+            rentals.append(compact_rental(rental))
+    return compact_contexts, rentals
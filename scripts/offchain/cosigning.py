@@ -0,0 +1,215 @@
+import asyncio
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+
+from eth_keys import keys
+
+from .signing import ListingSigner
+from .structs import Listing, Signature, SignedListing
+from .validation import LISTINGS_SIGNATURE_VALID_PERIOD, ListingValidator
+
+LATENCY_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# a listing, its owner signature, the lowercase owner address and the signature timestamp
+CoSignRequest = tuple[Listing, Signature, str, int]
+# the single listing or the `ListingTree` root signed by an owner, its owner signature and the owner address
+RootCoSignRequest = tuple[Listing | bytes, Signature, str]
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, exported with cumulative counts per upper bound like a Prometheus histogram.
+    """
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q quantile, inf when it falls past the last bound
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts, strict=True):
+            seen += count
+            if seen >= rank and seen > 0:
+                return bound
+        return 0.0
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip((*self.bounds, float("inf")), self.counts, strict=True):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class CoSigner:
+    """
+    Admin co-signing service for the listings of a RentingV3 market. The signature timestamp is rounded down to
+    `bucket` seconds, so every request for the same owner signature within a bucket shares one admin signature that
+    still has at least `min_validity` of the `LISTINGS_SIGNATURE_VALID_PERIOD` left. Requests missing the cache are
+    collected for `batch_window` seconds, then their owner signatures are checked and signed together off the event
+    loop. Only listings whose owner signature recovers to the listing owner are co-signed.
+
+    `cosign_roots` signs the single admin signature of a `start_rentals_from_roots` or `extend_rentals_from_roots`
+    call over all its owner signatures. Those batches differ per call, so they are neither cached nor coalesced.
+    """
+
+    def __init__(
+        self,
+        signer: ListingSigner,
+        admin_key: bytes,
+        *,
+        bucket: int = 30,
+        min_validity: int = 60,
+        batch_window: float = 0.002,
+        max_batch: int = 256,
+        clock: Callable[[], float] = time.time,
+    ):
+        if bucket < 1 or bucket + min_validity > LISTINGS_SIGNATURE_VALID_PERIOD:
+            raise ValueError(f"a {bucket}s bucket can't keep {min_validity}s of validity")
+        self.signer = signer
+        self.validator = ListingValidator(signer, keys.PrivateKey(bytes(admin_key)).public_key.to_checksum_address())
+        self.bucket = bucket
+        self.min_validity = min_validity
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.clock = clock
+        self.request_latency = Histogram()
+        self.batch_latency = Histogram()
+        self.batch_sizes = Histogram(BATCH_SIZE_BOUNDS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._admin_key = bytes(admin_key)
+        self._cache: dict[CoSignRequest, Signature] = {}
+        self._cache_timestamp = 0
+        self._pending: dict[CoSignRequest, asyncio.Future] = {}
+        self._queue: list[CoSignRequest] = []
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def signature_timestamp(self) -> int:
+        now = int(self.clock())
+        return now - now % self.bucket
+
+    async def cosign(self, listing: Listing, owner_signature: Signature, owner: str) -> tuple[Signature, int]:
+        # the admin signature and its signature timestamp, `owner` being the current owner of the listed token
+        started = time.perf_counter()
+        timestamp = self.signature_timestamp()
+        if timestamp != self._cache_timestamp:
+            self._cache = {}
+            self._cache_timestamp = timestamp
+        key = (listing, owner_signature, owner.lower(), timestamp)
+        signature = self._cache.get(key)
+        if signature is None:
+            signature = await self._request(key)
+        else:
+            self.cache_hits += 1
+        self.request_latency.observe(time.perf_counter() - started)
+        return signature, timestamp
+
+    async def cosign_listing(self, listing: Listing, owner_signature: Signature, owner: str) -> tuple[SignedListing, int]:
+        admin_signature, timestamp = await self.cosign(listing, owner_signature, owner)
+        return SignedListing(listing, owner_signature, admin_signature), timestamp
+
+    async def cosign_roots(self, roots: Sequence[RootCoSignRequest]) -> tuple[Signature, int]:
+        # the admin signature over the owner signatures, in the order of the call's `owner_signatures`
+        started = time.perf_counter()
+        timestamp = self.signature_timestamp()
+        signature = await asyncio.get_running_loop().run_in_executor(None, self._sign_roots, list(roots), timestamp)
+        self.request_latency.observe(time.perf_counter() - started)
+        return signature, timestamp
+
+    def metrics(self) -> dict:
+        return {
+            "request_latency": self.request_latency.snapshot(),
+            "batch_latency": self.batch_latency.snapshot(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    async def _request(self, key: CoSignRequest) -> Signature:
+        future = self._pending.get(key)
+        if future is None:
+            self.cache_misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._queue.append(key)
+            self._wakeup.set()
+        else:
+            self.cache_hits += 1
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_window)
+            batch, self._queue = self._queue[: self.max_batch], self._queue[self.max_batch :]
+            if not self._queue:
+                self._wakeup.clear()
+
+            started = time.perf_counter()
+            try:
+                signatures = await loop.run_in_executor(None, self._sign_batch, batch)
+            except Exception as e:
+                for key in batch:
+                    self._pending.pop(key).set_exception(e)
+                continue
+            self.batch_latency.observe(time.perf_counter() - started)
+            self.batch_sizes.observe(len(batch))
+
+            for key, signature in zip(batch, signatures, strict=True):
+                if signature is None:
+                    self._pending.pop(key).set_exception(ValueError("invalid owner signature"))
+                    continue
+                if key[3] == self._cache_timestamp:
+                    self._cache[key] = signature
+                self._pending.pop(key).set_result(signature)
+
+    def _sign_batch(self, batch: list[CoSignRequest]) -> list[Signature | None]:
+        # None for the requests whose owner signature doesn't recover to the owner
+        return [
+            self.signer.sign_admin(owner_signature, self._admin_key, timestamp)
+            if self.validator.is_signed_by_owner(listing, owner_signature, owner)
+            else None
+            for listing, owner_signature, owner, timestamp in batch
+        ]
+
+    def _sign_roots(self, roots: list[RootCoSignRequest], timestamp: int) -> Signature:
+        for signed, owner_signature, owner in roots:
+            if isinstance(signed, Listing):
+                valid = self.validator.is_signed_by_owner(signed, owner_signature, owner)
+            else:
+                valid = self.validator.is_root_signed_by_owner(signed, owner_signature, owner)
+            if not valid:
+                raise ValueError("invalid owner signature")
+        return self.signer.sign_batch_admin([owner_signature for _, owner_signature, _ in roots], self._admin_key, timestamp)
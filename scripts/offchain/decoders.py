@@ -0,0 +1,266 @@
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from typing import Any
+
+import numpy as np
+from eth_abi import decode as abi_decode
+from eth_utils import keccak, to_checksum_address
+
+from .archive import EVENT_KINDS, RECORD_DTYPE
+from .structs import EventLog, RawLog
+
+WORD = 32
+
+# RentalLog / RentalExtensionLog fields kept as raw bytes in the archive records, (start, stop) within the abi word;
+# the remaining fields are stored as uint64 from the low 8 bytes of their word
+RECORD_BYTES_FIELDS = {"id": (0, 32), "vault": (12, 32), "owner": (12, 32), "amount": (0, 32), "extension_amount": (0, 32)}
+RECORD_FIELD_ALIASES = {"amount_settled": "amount"}
+
+
+def _uint(word: bytes) -> int:
+    return int.from_bytes(word, "big")
+
+
+def _int(word: bytes) -> int:
+    return int.from_bytes(word, "big", signed=True)
+
+
+def _bool(word: bytes) -> bool:
+    return word != bytes(WORD)
+
+
+@lru_cache(maxsize=1 << 16)
+def _address(word: bytes) -> str:
+    # events repeat the same few addresses (renter, nft contract, owners), so the checksums are cached
+    return to_checksum_address(word[12:])
+
+
+WORD_DECODERS = {"address": _address, "bool": _bool}
+
+
+def _word_decoder(abi_type: str) -> Callable[[bytes], Any] | None:
+    # decoder for the types encoded in a single word, None for anything else
+    if "[" in abi_type or "(" in abi_type:
+        return None
+    if abi_type in WORD_DECODERS:
+        return WORD_DECODERS[abi_type]
+    if abi_type.startswith(("uint", "int")):
+        return _uint if abi_type[0] == "u" else _int
+    if abi_type.startswith("bytes") and abi_type != "bytes":
+        return itemgetter(slice(int(abi_type[5:])))
+    return None
+
+
+def canonical_type(abi_input: dict) -> str:
+    if abi_input["type"].startswith("tuple"):
+        return "(" + ",".join(canonical_type(c) for c in abi_input["components"]) + ")" + abi_input["type"][5:]
+    return abi_input["type"]
+
+
+class EventDecoder:
+    """
+    Decoder for the logs of one event, compiled once from its ABI. Static words and dynamic arrays of static words or
+    static structs, which covers every RentingV3 event, are decoded by slicing the data at offsets computed upfront.
+    Any other layout falls back to eth_abi.
+    """
+
+    def __init__(self, event_abi: dict):
+        self.name = event_abi["name"]
+        self.inputs = event_abi["inputs"]
+        self.types = [canonical_type(i) for i in self.inputs]
+        self.topic = keccak(text=f"{self.name}({','.join(self.types)})")
+        self.data_types = [t for t, i in zip(self.types, self.inputs, strict=True) if not i["indexed"]]
+        self.array_slots = {}  # head slot of each dynamic array argument
+        self.struct_words = {}  # word index of each struct field, for the array arguments holding structs
+        self._fields = self._compile()
+
+    def _compile(self) -> list[tuple[str, Callable[[bytes, Sequence[bytes]], Any]]] | None:
+        fields = []
+        slot = 0
+        topic = 1
+        for abi_input, abi_type in zip(self.inputs, self.types, strict=True):
+            if abi_input["indexed"]:
+                decode_word = _word_decoder(abi_type)
+                if decode_word is None:
+                    return None
+                fields.append((abi_input["name"], _indexed_field(decode_word, topic)))
+                topic += 1
+                continue
+
+            decode_word = _word_decoder(abi_type)
+            if decode_word is not None:
+                fields.append((abi_input["name"], _static_field(decode_word, slot * WORD)))
+            elif abi_type.endswith("[]") and (element := _word_decoder(abi_type[:-2])) is not None:
+                self.array_slots[abi_input["name"]] = slot
+                fields.append((abi_input["name"], _array_field([element], slot * WORD, tuple_elements=False)))
+            elif abi_type.endswith("[]") and abi_type.startswith("(") and abi_type.count("(") == 1:
+                components = abi_input["components"]
+                decoders = [_word_decoder(c["type"]) for c in components]
+                if None in decoders:
+                    return None
+                self.array_slots[abi_input["name"]] = slot
+                self.struct_words[abi_input["name"]] = {c["name"]: i for i, c in enumerate(components)}
+                fields.append((abi_input["name"], _array_field(decoders, slot * WORD, tuple_elements=True)))
+            else:
+                return None
+            slot += 1
+        return fields
+
+    def decode_args(self, log: RawLog) -> dict[str, Any]:
+        if self._fields is not None:
+            return {name: decode(log.data, log.topics) for name, decode in self._fields}
+        return self._decode_generic(log)
+
+    def _decode_generic(self, log: RawLog) -> dict[str, Any]:
+        values = iter(abi_decode(self.data_types, log.data))
+        topics = iter(log.topics[1:])
+        args = {}
+        for abi_input, abi_type in zip(self.inputs, self.types, strict=True):
+            value = abi_decode([abi_type], next(topics))[0] if abi_input["indexed"] else next(values)
+            args[abi_input["name"]] = value
+        return args
+
+    def decode(self, log: RawLog) -> EventLog:
+        return EventLog(self.name, self.decode_args(log), log.block_number, log.log_index, log.timestamp, log.address)
+
+
+def _indexed_field(decode_word: Callable[[bytes], Any], topic: int) -> Callable[[bytes, Sequence[bytes]], Any]:
+    return lambda data, topics: decode_word(topics[topic])  # noqa: ARG005
+
+
+def _static_field(decode_word: Callable[[bytes], Any], offset: int) -> Callable[[bytes, Sequence[bytes]], Any]:
+    return lambda data, topics: decode_word(data[offset : offset + WORD])  # noqa: ARG005
+
+
+def _array_field(
+    decoders: list[Callable[[bytes], Any]], offset: int, *, tuple_elements: bool
+) -> Callable[[bytes, Sequence[bytes]], Any]:
+    size = len(decoders) * WORD
+    words = list(zip(range(0, size, WORD), decoders, strict=True))
+    decode_word = decoders[0]
+
+    def decode(data: bytes, topics: Sequence[bytes]) -> list:
+        start = _uint(data[offset : offset + WORD])
+        count = _uint(data[start : start + WORD])
+        positions = range(start + WORD, start + WORD + count * size, size)
+        if tuple_elements:
+            return [tuple(d(data[p + w : p + w + WORD]) for w, d in words) for p in positions]
+        return [decode_word(data[p : p + WORD]) for p in positions]
+
+    return decode
+
+
+class LogDecoder:
+    """
+    Decodes raw logs of a contract with one compiled `EventDecoder` per event topic, either into `EventLog` for the
+    indexer or, for the rental events, straight into the archive records.
+    """
+
+    def __init__(self, abi: list[dict]):
+        self.abi = abi
+        self.events = {d.topic: d for d in (EventDecoder(e) for e in abi if e["type"] == "event")}
+
+    def decode(self, log: RawLog) -> EventLog | None:
+        decoder = self.events.get(log.topics[0]) if log.topics else None
+        return decoder.decode(log) if decoder else None
+
+    def decode_all(self, logs: Iterable[RawLog]) -> list[EventLog]:
+        return [event for event in map(self.decode, logs) if event is not None]
+
+    def rental_records(self, logs: Iterable[RawLog]) -> np.ndarray:
+        # the RentalStarted, RentalClosed and RentalExtended logs as archive records, decoded with numpy over all the
+        # structs of each event type at once
+        batches: dict[bytes, list[tuple[int, RawLog, int, int]]] = {}
+        for order, log in enumerate(logs):
+            decoder = self.events.get(log.topics[0]) if log.topics else None
+            if decoder is None or decoder.name not in EVENT_KINDS:
+                continue
+            offset = decoder.array_slots["rentals"] * WORD
+            start = _uint(log.data[offset : offset + WORD])
+            count = _uint(log.data[start : start + WORD])
+            batches.setdefault(decoder.topic, []).append((order, log, start + WORD, count))
+
+        parts = [self._decode_records(self.events[topic], batch) for topic, batch in batches.items()]
+        if not parts:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        records = np.concatenate([records for records, _ in parts])
+        order = np.concatenate([order for _, order in parts])
+        return records[np.lexsort((records["item"], order))]
+
+    def _decode_records(
+        self, decoder: EventDecoder, batch: list[tuple[int, RawLog, int, int]]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        struct_words = decoder.struct_words["rentals"]
+        size = len(struct_words) * WORD
+        counts = np.array([count for _, _, _, count in batch], dtype=np.int64)
+        rows = np.frombuffer(
+            b"".join(log.data[start : start + count * size] for _, log, start, count in batch), dtype=np.uint8
+        )
+        rows = rows.reshape(-1, size)
+
+        records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        records["block_number"] = np.repeat([log.block_number for _, log, _, _ in batch], counts)
+        records["log_index"] = np.repeat([log.log_index for _, log, _, _ in batch], counts)
+        records["kind"] = EVENT_KINDS[decoder.name]
+        records["item"] = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        for name, word in struct_words.items():
+            field = RECORD_FIELD_ALIASES.get(name, name)
+            if field in RECORD_BYTES_FIELDS:
+                start, stop = RECORD_BYTES_FIELDS[field]
+                records[field] = rows[:, word * WORD + start : word * WORD + stop]
+            else:
+                records[field] = np.ascontiguousarray(rows[:, word * WORD + 24 : (word + 1) * WORD]).view(">u8").ravel()
+        order = np.repeat([order for order, _, _, _ in batch], counts)
+        return records, order
+
+
+_worker_decoder: LogDecoder | None = None
+
+
+def _init_worker(abi: list[dict]):
+    global _worker_decoder  # noqa: PLW0603
+    _worker_decoder = LogDecoder(abi)
+
+
+def _decode_chunk(logs: list[RawLog]) -> list[EventLog]:
+    return _worker_decoder.decode_all(logs)
+
+
+def _records_chunk(logs: list[RawLog]) -> np.ndarray:
+    return _worker_decoder.rental_records(logs)
+
+
+def _chunks(logs: Iterable[RawLog], size: int) -> Iterable[list[RawLog]]:
+    logs = iter(logs)
+    while chunk := list(islice(logs, size)):
+        yield chunk
+
+
+class DecoderPool:
+    """
+    Process pool decoding batches of raw logs, each worker compiling its own `LogDecoder` from the ABI once.
+    Results keep the order of the input logs.
+    """
+
+    def __init__(self, abi: list[dict], workers: int | None = None, chunk_size: int = 2000):
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(abi,))
+
+    def decode_all(self, logs: Iterable[RawLog]) -> list[EventLog]:
+        return [event for events in self._executor.map(_decode_chunk, _chunks(logs, self.chunk_size)) for event in events]
+
+    def rental_records(self, logs: Iterable[RawLog]) -> np.ndarray:
+        parts = list(self._executor.map(_records_chunk, _chunks(logs, self.chunk_size)))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,241 @@
+from collections.abc import Callable, Iterable
+from dataclasses import replace
+from itertools import starmap
+
+from .state import EMPTY_STATE, state_hash
+from .structs import (
+    EventLog,
+    Rental,
+    RentalExtensionLog,
+    RentalLog,
+    RewardLog,
+    TokenContext,
+    TokenState,
+    VaultLog,
+    WithdrawalLog,
+)
+
+
+class IndexerError(Exception):
+    pass
+
+
+class TokenContextIndexer:
+    """
+    Rebuilds the RentingV3 per-token state (`TokenContext`), the `unclaimed_rewards` and `protocol_fees_amount`
+    mirrors and the listing revocations by replaying the contract events in order. `protocol_fee` is the market fee in
+    place at `start_block`, later tracked through `ProtocolFeeSet`, as extensions take it without logging it.
+    """
+
+    def __init__(self, protocol_fee: int, start_block: int = 0):
+        self.contexts: dict[int, TokenContext] = {}
+        self.unclaimed_rewards: dict[str, int] = {}
+        self.listing_revocations: dict[int, int] = {}
+        self.protocol_fees_amount = 0
+        self.protocol_fee = protocol_fee
+        self.last_block = start_block - 1  # last block whose events were all applied
+        self._block = start_block
+        self._hashes: dict[int, bytes] = {}
+        self._handlers: dict[str, Callable[[EventLog], None]] = {
+            "NftsDeposited": self._on_nfts_deposited,
+            "NftsWithdrawn": self._on_nfts_withdrawn,
+            "RenterDelegatedToWallet": self._on_renter_delegated_to_wallet,
+            "ListingsRevoked": self._on_listings_revoked,
+            "RentalStarted": self._on_rental_started,
+            "RentalClosed": self._on_rental_closed,
+            "RentalExtended": self._on_rental_extended,
+            "RewardsClaimed": self._on_rewards_claimed,
+            "TokenOwnershipChanged": self._on_token_ownership_changed,
+            "ProtocolFeeSet": self._on_protocol_fee_set,
+            "FeesClaimed": self._on_fees_claimed,
+        }
+
+    def apply(self, event: EventLog):
+        if event.block_number <= self.last_block or event.block_number < self._block:
+            raise IndexerError(f"event {event.name} at block {event.block_number} is older than block {self._block}")
+        handler = self._handlers.get(event.name)
+        if handler is not None:
+            handler(event)
+        self._block = event.block_number
+
+    def apply_all(self, events: Iterable[EventLog]):
+        for event in events:
+            self.apply(event)
+
+    def advance_to(self, block_number: int):
+        # marks every block up to `block_number` as fully applied
+        if block_number < max(self.last_block, self._block):
+            raise IndexerError(f"can't move back to block {block_number} from block {self._block}")
+        self.last_block = self._block = block_number
+
+    def token_context(self, token_id: int) -> TokenContext | None:
+        return self.contexts.get(token_id)
+
+    def state_hash(self, token_id: int) -> bytes:
+        cached = self._hashes.get(token_id)
+        if cached is not None:
+            return cached
+        context = self.contexts.get(token_id)
+        if context is None:
+            return EMPTY_STATE
+        digest = state_hash(context.token_id, context.nft_owner, context.active_rental)
+        self._hashes[token_id] = digest
+        return digest
+
+    def verify(self, rental_states: Callable[[int], bytes], token_ids: Iterable[int] | None = None) -> list[int]:
+        # returns the token ids whose indexed context doesn't match the on-chain `rental_states`
+        token_ids = self.contexts.keys() if token_ids is None else token_ids
+        return [token_id for token_id in token_ids if bytes(rental_states(token_id)) != self.state_hash(token_id)]
+
+    def verify_states(self, token_ids: Iterable[int], token_states: Iterable[TokenState]) -> list[int]:
+        # like `verify` but from the RentingV3 `token_states` view, also checking the listing revocations
+        return [
+            token_id
+            for token_id, token_state in zip(token_ids, token_states, strict=True)
+            if bytes(token_state.state) != self.state_hash(token_id)
+            or token_state.listing_revocation != self.listing_revocations.get(token_id, 0)
+        ]
+
+    def valid_contexts(self, rental_states: Callable[[int], bytes], token_ids: Iterable[int]) -> list[TokenContext]:
+        invalid = set(self.verify(rental_states, token_ids))
+        if invalid:
+            raise IndexerError(f"invalid context for tokens {sorted(invalid)}")
+        return [self.contexts[token_id] for token_id in token_ids]
+
+    # state mutations, every change to the indexed state goes through these
+
+    def _set_context(self, token_id: int, context: TokenContext | None):
+        if context is None:
+            self.contexts.pop(token_id, None)
+        else:
+            self.contexts[token_id] = context
+        self._hashes.pop(token_id, None)
+
+    def _set_unclaimed_rewards(self, wallet: str, amount: int):
+        if amount:
+            self.unclaimed_rewards[wallet] = amount
+        else:
+            self.unclaimed_rewards.pop(wallet, None)
+
+    def _set_protocol_fees_amount(self, amount: int):
+        self.protocol_fees_amount = amount
+
+    def _set_protocol_fee(self, fee: int):
+        self.protocol_fee = fee
+
+    def _set_listing_revocation(self, token_id: int, timestamp: int):
+        self.listing_revocations[token_id] = timestamp
+
+    # helpers mirroring the contract accounting
+
+    def _context(self, token_id: int) -> TokenContext:
+        context = self.contexts.get(token_id)
+        if context is None:
+            raise IndexerError(f"token {token_id} is not deposited")
+        return context
+
+    def _accrue(self, wallet: str, reward: int, protocol_fee_amount: int):
+        if reward:
+            self._set_unclaimed_rewards(wallet, self.unclaimed_rewards.get(wallet, 0) + reward)
+        if protocol_fee_amount:
+            self._set_protocol_fees_amount(self.protocol_fees_amount + protocol_fee_amount)
+
+    def _settle(self, wallet: str, amount: int, protocol_fee: int):
+        protocol_fee_amount = amount * protocol_fee // 10000
+        self._accrue(wallet, amount - protocol_fee_amount, protocol_fee_amount)
+
+    def _consolidate_claims(self, rental: Rental, timestamp: int) -> Rental:
+        # mirrors RentingV3._consolidate_claims
+        if rental.amount == 0 or rental.expiration >= timestamp:
+            return rental
+        self._settle(rental.owner, rental.amount, rental.protocol_fee)
+        return replace(rental, amount=0)
+
+    # event handlers
+
+    def _on_nfts_deposited(self, event: EventLog):
+        owner = event.args["owner"]
+        for vault_log in starmap(VaultLog, event.args["vaults"]):
+            self._set_context(vault_log.token_id, TokenContext(vault_log.token_id, owner, Rental()))
+
+    def _on_nfts_withdrawn(self, event: EventLog):
+        for withdrawal in starmap(WithdrawalLog, event.args["withdrawals"]):
+            context = self._context(withdrawal.token_id)
+            self._consolidate_claims(context.active_rental, event.timestamp)
+            self._set_context(withdrawal.token_id, None)
+            self._set_listing_revocation(withdrawal.token_id, event.timestamp)
+        self._set_unclaimed_rewards(event.args["owner"], 0)
+
+    def _on_renter_delegated_to_wallet(self, event: EventLog):
+        for vault_log in starmap(VaultLog, event.args["vaults"]):
+            context = self._context(vault_log.token_id)
+            rental = replace(context.active_rental, delegate=event.args["delegate"])
+            self._set_context(vault_log.token_id, replace(context, active_rental=rental))
+
+    def _on_listings_revoked(self, event: EventLog):
+        for token_id in event.args["token_ids"]:
+            self._set_listing_revocation(token_id, event.args["timestamp"])
+
+    def _on_rental_started(self, event: EventLog):
+        for log in starmap(RentalLog, event.args["rentals"]):
+            context = self._context(log.token_id)
+            self._consolidate_claims(context.active_rental, log.start)
+            rental = Rental(
+                log.id,
+                context.nft_owner,
+                event.args["renter"],
+                event.args["delegate"],
+                log.token_id,
+                log.start,
+                log.min_expiration,
+                log.expiration,
+                log.amount,
+                log.protocol_fee,
+            )
+            self._set_context(log.token_id, TokenContext(log.token_id, context.nft_owner, rental))
+
+    def _on_rental_closed(self, event: EventLog):
+        for log in starmap(RentalLog, event.args["rentals"]):
+            context = self._context(log.token_id)
+            self._settle(context.nft_owner, log.amount, log.protocol_fee)
+            self._set_context(log.token_id, TokenContext(log.token_id, context.nft_owner, Rental()))
+
+    def _on_rental_extended(self, event: EventLog):
+        for log in starmap(RentalExtensionLog, event.args["rentals"]):
+            context = self._context(log.token_id)
+            self._settle(context.nft_owner, log.amount_settled, log.protocol_fee)
+            # the extended rental uses the protocol fee in place at the time, which is not part of the log
+            rental = Rental(
+                log.id,
+                context.nft_owner,
+                event.args["renter"],
+                context.active_rental.delegate,
+                log.token_id,
+                log.start,
+                log.min_expiration,
+                log.expiration,
+                log.extension_amount,
+                self.protocol_fee,
+            )
+            self._set_context(log.token_id, TokenContext(log.token_id, context.nft_owner, rental))
+
+    def _on_rewards_claimed(self, event: EventLog):
+        for log in starmap(RewardLog, event.args["rewards"]):
+            context = self._context(log.token_id)
+            rental = context.active_rental
+            if rental.amount != log.active_rental_amount:
+                self._settle(rental.owner, rental.amount, rental.protocol_fee)
+                self._set_context(log.token_id, replace(context, active_rental=replace(rental, amount=0)))
+        self._set_unclaimed_rewards(event.args["owner"], 0)
+        self._set_protocol_fees_amount(event.args["protocol_fee_amount"])
+
+    def _on_token_ownership_changed(self, event: EventLog):
+        for token_id in event.args["tokens"]:
+            context = self._context(token_id)
+            self._set_context(token_id, replace(context, nft_owner=event.args["new_owner"]))
+
+    def _on_protocol_fee_set(self, event: EventLog):
+        self._set_protocol_fee(event.args["new_fee"])
+
+    def _on_fees_claimed(self, event: EventLog):  # noqa: ARG002
+        self._set_protocol_fees_amount(0)
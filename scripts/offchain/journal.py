@@ -0,0 +1,84 @@
+from collections import deque
+
+from .indexer import IndexerError, TokenContextIndexer
+from .structs import EventLog, TokenContext
+
+CONTEXT = 0
+UNCLAIMED_REWARDS = 1
+PROTOCOL_FEES_AMOUNT = 2
+PROTOCOL_FEE = 3
+LISTING_REVOCATION = 4
+
+
+class JournaledIndexer(TokenContextIndexer):
+    """
+    TokenContextIndexer keeping an undo journal for the last `max_depth` blocks, so a chain reorg can be handled by
+    rolling back to the common ancestor and applying the canonical blocks, touching only the entries they changed.
+    """
+
+    def __init__(self, protocol_fee: int, start_block: int = 0, max_depth: int = 64):
+        super().__init__(protocol_fee=protocol_fee, start_block=start_block)
+        self.max_depth = max_depth
+        self._journal: deque[tuple[int, list[tuple[int, object, object]]]] = deque()
+        self._pending_block = start_block
+        self._floor = start_block - 1  # oldest block the indexer can roll back to
+
+    def apply(self, event: EventLog):
+        self._pending_block = event.block_number
+        super().apply(event)
+
+    def advance_to(self, block_number: int):
+        super().advance_to(block_number)
+        while self._journal and self._journal[0][0] <= block_number - self.max_depth:
+            self._floor = self._journal.popleft()[0]
+        self._floor = max(self._floor, block_number - self.max_depth)
+
+    def rollback_to(self, block_number: int):
+        # undoes every change made after `block_number`, the indexer must then be fed from `block_number + 1`
+        if block_number < self._floor:
+            raise IndexerError(f"can't roll back to block {block_number}, journal only goes back to block {self._floor}")
+        while self._journal and self._journal[-1][0] > block_number:
+            _, entries = self._journal.pop()
+            for kind, key, value in reversed(entries):
+                self._undo(kind, key, value)
+        self.last_block = min(self.last_block, block_number)
+        self._block = block_number + 1
+
+    def _record(self, kind: int, key: object, value: object):
+        if not self._journal or self._journal[-1][0] != self._pending_block:
+            self._journal.append((self._pending_block, []))
+        self._journal[-1][1].append((kind, key, value))
+
+    def _undo(self, kind: int, key: object, value: object):
+        if kind == CONTEXT:
+            super()._set_context(key, value)
+        elif kind == UNCLAIMED_REWARDS:
+            super()._set_unclaimed_rewards(key, value)
+        elif kind == PROTOCOL_FEES_AMOUNT:
+            super()._set_protocol_fees_amount(value)
+        elif kind == PROTOCOL_FEE:
+            super()._set_protocol_fee(value)
+        elif value is None:
+            self.listing_revocations.pop(key, None)
+        else:
+            super()._set_listing_revocation(key, value)
+
+    def _set_context(self, token_id: int, context: TokenContext | None):
+        self._record(CONTEXT, token_id, self.contexts.get(token_id))
+        super()._set_context(token_id, context)
+
+    def _set_unclaimed_rewards(self, wallet: str, amount: int):
+        self._record(UNCLAIMED_REWARDS, wallet, self.unclaimed_rewards.get(wallet, 0))
+        super()._set_unclaimed_rewards(wallet, amount)
+
+    def _set_protocol_fees_amount(self, amount: int):
+        self._record(PROTOCOL_FEES_AMOUNT, None, self.protocol_fees_amount)
+        super()._set_protocol_fees_amount(amount)
+
+    def _set_protocol_fee(self, fee: int):
+        self._record(PROTOCOL_FEE, None, self.protocol_fee)
+        super()._set_protocol_fee(fee)
+
+    def _set_listing_revocation(self, token_id: int, timestamp: int):
+        self._record(LISTING_REVOCATION, token_id, self.listing_revocations.get(token_id))
+        super()._set_listing_revocation(token_id, timestamp)
@@ -0,0 +1,132 @@
+from bisect import bisect_left, insort
+from collections.abc import Iterable, Iterator, Mapping
+from heapq import merge
+from itertools import islice, starmap, takewhile
+
+from .structs import EventLog, Listing, RentalExtensionLog, RentalLog, SignedListing, WithdrawalLog
+
+
+class ListingCache:
+    """
+    Latest signed listing of each token, kept in sync with the RentingV3 `listing_revocations` by following the
+    `ListingsRevoked` and `NftsWithdrawn` events. A listing is usable while its timestamp is after the revocation time
+    of its token, as checked by `_check_valid_listing`, and revoked listings are evicted. Other events are ignored, so
+    the cache can follow the same stream as `TokenContextIndexer`. Evictions are not undone on reorgs.
+    """
+
+    def __init__(self, listing_revocations: Mapping[int, int] | None = None):
+        # `listing_revocations` seeds the revocation times, eg from the indexer or the `token_states` view
+        self.listings: dict[int, SignedListing] = {}
+        self.listing_revocations: dict[int, int] = dict(listing_revocations or {})
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def __contains__(self, token_id: int) -> bool:
+        return token_id in self.listings
+
+    def get(self, token_id: int) -> SignedListing | None:
+        return self.listings.get(token_id)
+
+    def is_usable(self, listing: Listing) -> bool:
+        return listing.timestamp > self.listing_revocations.get(listing.token_id, 0)
+
+    def put(self, signed_listing: SignedListing) -> bool:
+        # keeps the most recent listing of the token, returns whether it was cached
+        listing = signed_listing.listing
+        cached = self.listings.get(listing.token_id)
+        if not self.is_usable(listing) or (cached is not None and cached.listing.timestamp > listing.timestamp):
+            return False
+        self.remove(listing.token_id)
+        self.listings[listing.token_id] = signed_listing
+        return True
+
+    def put_all(self, signed_listings: Iterable[SignedListing]) -> int:
+        return sum(self.put(signed_listing) for signed_listing in signed_listings)
+
+    def apply(self, event: EventLog):
+        if event.name == "ListingsRevoked":
+            for token_id in event.args["token_ids"]:
+                self.revoke(token_id, event.args["timestamp"])
+        elif event.name == "NftsWithdrawn":
+            for withdrawal in starmap(WithdrawalLog, event.args["withdrawals"]):
+                self.revoke(withdrawal.token_id, event.timestamp)
+
+    def apply_all(self, events: Iterable[EventLog]):
+        for event in events:
+            self.apply(event)
+
+    def revoke(self, token_id: int, timestamp: int):
+        self.listing_revocations[token_id] = max(timestamp, self.listing_revocations.get(token_id, 0))
+        cached = self.listings.get(token_id)
+        if cached is not None and not self.is_usable(cached.listing):
+            self.remove(token_id)
+
+    def remove(self, token_id: int) -> SignedListing | None:
+        return self.listings.pop(token_id, None)
+
+
+class OrderBook(ListingCache):
+    """
+    Listings of a RentingV3 market sorted by hourly price, for top-N queries such as the cheapest listings allowing a
+    given duration. Listings are grouped by their (min_duration, max_duration) bounds, each group being sorted by
+    price, so a query merges the cheapest listings of the groups whose bounds allow the duration. A listing leaves
+    the book when it's revoked or replaced, and unlisted tokens (zero price) are never in it. Renting a token doesn't
+    use up its listing, so the listing stays in the book and queries skip it until the rental is closed or expires.
+    """
+
+    def __init__(self, listing_revocations: Mapping[int, int] | None = None):
+        super().__init__(listing_revocations)
+        self._groups: dict[tuple[int, int], list[tuple[int, int]]] = {}  # (min, max duration) -> [(price, token_id)]
+        self.rental_expirations: dict[int, int] = {}  # expiration of the last rental of each rented token
+
+    def put(self, signed_listing: SignedListing) -> bool:
+        if not super().put(signed_listing):
+            return False
+        listing = signed_listing.listing
+        if listing.price:
+            insort(
+                self._groups.setdefault((listing.min_duration, listing.max_duration), []), (listing.price, listing.token_id)
+            )
+        return True
+
+    def remove(self, token_id: int) -> SignedListing | None:
+        signed_listing = super().remove(token_id)
+        if signed_listing is not None and signed_listing.listing.price:
+            listing = signed_listing.listing
+            key = (listing.min_duration, listing.max_duration)
+            group = self._groups[key]
+            del group[bisect_left(group, (listing.price, token_id))]
+            if not group:
+                del self._groups[key]
+        return signed_listing
+
+    def apply(self, event: EventLog):
+        if event.name == "RentalStarted":
+            for log in starmap(RentalLog, event.args["rentals"]):
+                self.rental_expirations[log.token_id] = log.expiration
+        elif event.name == "RentalExtended":
+            for log in starmap(RentalExtensionLog, event.args["rentals"]):
+                self.rental_expirations[log.token_id] = log.expiration
+        elif event.name == "RentalClosed":
+            for log in starmap(RentalLog, event.args["rentals"]):
+                self.rental_expirations.pop(log.token_id, None)
+        else:
+            super().apply(event)
+
+    def is_rented(self, token_id: int, now: int) -> bool:
+        # mirrors RentingV3._is_rental_active
+        return self.rental_expirations.get(token_id, 0) > now
+
+    def cheapest(self, n: int, duration: int, max_price: int | None = None, *, now: int) -> list[SignedListing]:
+        # the `n` cheapest listings allowing a rental of `duration` hours at `now`, ties broken by token id
+        groups = [
+            group
+            for (min_duration, max_duration), group in self._groups.items()
+            if min_duration <= duration and (max_duration == 0 or duration <= max_duration)
+        ]
+        entries: Iterator[tuple[int, int]] = merge(*groups)
+        if max_price is not None:
+            entries = takewhile(lambda entry: entry[0] <= max_price, entries)
+        available = (token_id for _, token_id in entries if not self.is_rented(token_id, now))
+        return [self.listings[token_id] for token_id in islice(available, n)]
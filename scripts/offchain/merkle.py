@@ -0,0 +1,77 @@
+from collections.abc import Sequence
+
+from eth_utils import keccak
+
+from .signing import ListingSigner, listing_struct_hash
+from .structs import Listing, Signature, TokenContext, TokenContextAndListing, TokenContextAndRootListing
+
+# mirrors the bound of TokenContextAndRootListing.proof in RentingV3
+MAX_PROOF_LENGTH = 10
+MAX_LEAVES = 1 << MAX_PROOF_LENGTH
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+def compute_root(leaf: bytes, proof: Sequence[bytes]) -> bytes:
+    # mirrors RentingV3._compute_listing_root
+    node = leaf
+    for sibling in proof:
+        node = hash_pair(node, sibling)
+    return node
+
+
+def single_listing_roots(
+    contexts: Sequence[TokenContextAndListing],
+) -> tuple[list[TokenContextAndRootListing], list[Signature]]:
+    # listings signed one by one, each being its own root, so the admin signs once over the batch of owner signatures
+    root_contexts = [
+        TokenContextAndRootListing(c.token_context, c.signed_listing.listing, (), i, c.duration)
+        for i, c in enumerate(contexts)
+    ]
+    return root_contexts, [c.signed_listing.owner_signature for c in contexts]
+
+
+class ListingTree:
+    """
+    Merkle tree over the EIP-712 struct hashes of a batch of listings, so the owner signs a single root instead of
+    each listing. Pairs are hashed in sorted order and a node without a sibling moves up unchanged, as verified by
+    RentingV3 `start_rentals_from_roots` and `extend_rentals_from_roots`. A tree of a single listing is signed as the
+    listing itself.
+    """
+
+    def __init__(self, signer: ListingSigner, listings: Sequence[Listing]):
+        if not 0 < len(listings) <= MAX_LEAVES:
+            raise ValueError(f"a tree takes 1 to {MAX_LEAVES} listings, got {len(listings)}")
+        self.signer = signer
+        self.listings = list(listings)
+        self.layers = [[listing_struct_hash(listing) for listing in self.listings]]
+        while len(layer := self.layers[-1]) > 1:
+            self.layers.append(
+                [hash_pair(*layer[i : i + 2]) if i + 1 < len(layer) else layer[i] for i in range(0, len(layer), 2)]
+            )
+
+    @property
+    def root(self) -> bytes:
+        return self.layers[-1][0]
+
+    def proof(self, index: int) -> tuple[bytes, ...]:
+        proof = []
+        for layer in self.layers[:-1]:
+            sibling = index ^ 1
+            if sibling < len(layer):
+                proof.append(layer[sibling])
+            index //= 2
+        return tuple(proof)
+
+    def sign(self, owner_key: bytes) -> Signature:
+        if len(self.listings) == 1:
+            return self.signer.sign_owner(self.listings[0], owner_key)
+        return self.signer.sign_root(self.root, owner_key)
+
+    def token_context(
+        self, index: int, token_context: TokenContext, duration: int, signature_index: int = 0
+    ) -> TokenContextAndRootListing:
+        # `signature_index` is the position of this tree's owner signature in the call
+        return TokenContextAndRootListing(token_context, self.listings[index], self.proof(index), signature_index, duration)
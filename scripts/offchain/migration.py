@@ -0,0 +1,63 @@
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+from .indexer import TokenContextIndexer
+from .state import EMPTY_STATE, state_digest
+from .structs import TokenContext
+
+BATCH_SIZE = 32  # the RentingV3 `withdraw` and `deposit` batch limit
+
+
+@dataclass(frozen=True, slots=True)
+class OwnerMigration:
+    owner: str
+    withdrawals: list[list[TokenContext]]  # `withdraw` batches on the old market
+    deposits: list[list[int]]  # `deposit` batches on the new market
+
+
+@dataclass
+class MigrationPlan:
+    """
+    Moves the tokens indexed for a RentingV3 market to a market with a new storage layout. Vaults are bound to
+    the market address, so each owner withdraws its tokens from the old market, which also pays out its unclaimed
+    rewards, and deposits them in the new one. Tokens in an active rental can't be withdrawn and are left in `rented`
+    until their expiration. Listings are signed for the market address, so the migrated tokens must be relisted, eg
+    with `Relister`. The withdrawals must be sent by the current owner of each token, which is the holder of its
+    RentingERC721 token if it was transferred without `claim_token_ownership`.
+    """
+
+    owners: list[OwnerMigration] = field(default_factory=list)
+    rented: dict[int, int] = field(default_factory=dict)  # token_id -> expiration, for tokens still rented
+
+
+def legacy_mismatches(
+    indexer: TokenContextIndexer, rental_states: Callable[[int], bytes], token_ids: Iterable[int] | None = None
+) -> list[int]:
+    # like `TokenContextIndexer.verify` for a market storing the full state hash, ie deployed before the packed slots
+    token_ids = indexer.contexts.keys() if token_ids is None else token_ids
+    mismatches = []
+    for token_id in token_ids:
+        context = indexer.token_context(token_id)
+        digest = EMPTY_STATE if context is None else state_digest(token_id, context.nft_owner, context.active_rental)
+        if bytes(rental_states(token_id)) != digest:
+            mismatches.append(token_id)
+    return mismatches
+
+
+def migration_plan(indexer: TokenContextIndexer, now: int, *, batch_size: int = BATCH_SIZE) -> MigrationPlan:
+    # groups the tokens that can be withdrawn at `now` by owner, in batches of at most `batch_size` tokens
+    by_owner: dict[str, list[TokenContext]] = {}
+    plan = MigrationPlan()
+    for token_id in sorted(indexer.contexts):
+        context = indexer.contexts[token_id]
+        if context.active_rental.expiration > now:
+            plan.rented[token_id] = context.active_rental.expiration
+        else:
+            by_owner.setdefault(context.nft_owner, []).append(context)
+
+    for owner, contexts in by_owner.items():
+        withdrawals = [contexts[i : i + batch_size] for i in range(0, len(contexts), batch_size)]
+        plan.owners.append(
+            OwnerMigration(owner, withdrawals, [[context.token_id for context in batch] for batch in withdrawals])
+        )
+    return plan
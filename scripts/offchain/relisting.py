@@ -0,0 +1,95 @@
+import json
+import os
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from pathlib import Path
+
+from .signing import ListingSigner, SigningPool
+from .structs import Listing, Signature
+
+# hourly price of a token, None to leave it untouched and 0 to unlist it
+PricePolicy = Callable[[int], int | None]
+ListingStore = Callable[[list[tuple[Listing, Signature]]], None]
+
+
+def relistings(
+    token_ids: Iterable[int],
+    policy: PricePolicy,
+    timestamp: int,
+    *,
+    min_duration: int = 0,
+    max_duration: int = 0,
+    listing_revocations: Mapping[int, int] | None = None,
+) -> Iterator[Listing]:
+    # each listing must be more recent than the revocation time of its token, see RentingV3._check_valid_listing
+    listing_revocations = listing_revocations or {}
+    for token_id in token_ids:
+        price = policy(token_id)
+        if price is not None:
+            yield Listing(
+                token_id, price, min_duration, max_duration, max(timestamp, listing_revocations.get(token_id, 0) + 1)
+            )
+
+
+class Relister:
+    """
+    Signs new listings for the tokens of an owner as a stream, storing them chunk by chunk with a bounded number of
+    chunks in memory. After each stored chunk the progress is checkpointed to `checkpoint_path`, so an interrupted
+    run resumes with the same timestamp after the listings already stored. The token ids and policy must be the same
+    when resuming. The checkpoint is removed once the run completes.
+    """
+
+    def __init__(
+        self, signer: ListingSigner, pool: SigningPool, store: ListingStore, checkpoint_path: str | Path, max_pending: int = 8
+    ):
+        self.signer = signer
+        self.pool = pool
+        self.store = store
+        self.checkpoint_path = Path(checkpoint_path)
+        self.max_pending = max_pending
+
+    def run(
+        self,
+        token_ids: Iterable[int],
+        policy: PricePolicy,
+        owner_key: bytes,
+        timestamp: int,
+        *,
+        min_duration: int = 0,
+        max_duration: int = 0,
+        listing_revocations: Mapping[int, int] | None = None,
+    ) -> int:
+        # returns the number of listings stored by this run
+        done, timestamp = self._load_checkpoint(timestamp)
+        listings = relistings(
+            token_ids,
+            policy,
+            timestamp,
+            min_duration=min_duration,
+            max_duration=max_duration,
+            listing_revocations=listing_revocations,
+        )
+        for _ in range(done):
+            next(listings, None)
+
+        stored = 0
+        for chunk in self.pool.stream_owner_signatures(self.signer, listings, owner_key, self.max_pending):
+            self.store(chunk)
+            stored += len(chunk)
+            self._save_checkpoint(done + stored, timestamp)
+        self.checkpoint_path.unlink(missing_ok=True)
+        return stored
+
+    def _load_checkpoint(self, timestamp: int) -> tuple[int, int]:
+        if not self.checkpoint_path.exists():
+            return 0, timestamp
+        with open(self.checkpoint_path, "r") as f:
+            checkpoint = json.load(f)
+        return checkpoint["done"], checkpoint["timestamp"]
+
+    def _save_checkpoint(self, done: int, timestamp: int):
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"done": done, "timestamp": timestamp}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.checkpoint_path)
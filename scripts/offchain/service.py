@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+
+from web3 import AsyncWeb3
+from web3.exceptions import Web3RPCError
+
+from .decoders import LogDecoder
+from .journal import JournaledIndexer
+from .structs import RawLog
+
+logger = logging.getLogger(__name__)
+
+# blocks the followers stay behind the head, a reorg deeper than that is rolled back through the journal
+CONFIRMATIONS = 3
+
+# fragments of the errors returned by the providers when a eth_getLogs range is too large or has too many results
+RANGE_ERRORS = ("more than", "block range", "range is too large", "response size", "limit exceeded", "too many")
+
+
+class RangeTooLargeError(Exception):
+    pass
+
+
+class LogSource(Protocol):
+    async def block_number(self) -> int: ...
+
+    async def get_logs(self, addresses: list[str], from_block: int, to_block: int) -> list[RawLog]: ...
+
+    async def block_hash(self, block_number: int) -> bytes: ...
+
+
+class Web3LogSource:
+    def __init__(self, w3: AsyncWeb3):
+        self.w3 = w3
+        self._timestamps: dict[int, int] = {}
+
+    async def block_number(self) -> int:
+        return await self.w3.eth.block_number
+
+    async def get_logs(self, addresses: list[str], from_block: int, to_block: int) -> list[RawLog]:
+        try:
+            logs = await self.w3.eth.get_logs({"address": addresses, "fromBlock": from_block, "toBlock": to_block})
+        except Web3RPCError as e:
+            if any(fragment in str(e).lower() for fragment in RANGE_ERRORS):
+                raise RangeTooLargeError(str(e)) from e
+            raise
+        timestamps = await self._block_timestamps({log["blockNumber"] for log in logs})
+        return [
+            RawLog(
+                log["address"],
+                tuple(bytes(topic) for topic in log["topics"]),
+                bytes(log["data"]),
+                log["blockNumber"],
+                log["logIndex"],
+                timestamps[log["blockNumber"]],
+            )
+            for log in logs
+        ]
+
+    async def block_hash(self, block_number: int) -> bytes:
+        return bytes((await self.w3.eth.get_block(block_number))["hash"])
+
+    async def _block_timestamps(self, block_numbers: set[int]) -> dict[int, int]:
+        missing = [n for n in block_numbers if n not in self._timestamps]
+        blocks = await asyncio.gather(*(self.w3.eth.get_block(n) for n in missing))
+        self._timestamps.update((block["number"], block["timestamp"]) for block in blocks)
+        timestamps = {n: self._timestamps[n] for n in block_numbers}
+        if len(self._timestamps) > 10000:
+            self._timestamps.clear()
+        return timestamps
+
+
+class LogFetcher:
+    """
+    Log fetcher shared by the markets of a chain. Requests for the same block range made in the same event loop
+    iteration are coalesced into a single `eth_getLogs` over all their addresses and at most `max_requests` run at
+    once. The range size adapts to the provider: halved when a range is refused or returns more than `target_logs`,
+    doubled after a full range returning less than half of that.
+    """
+
+    def __init__(
+        self,
+        source: LogSource,
+        *,
+        max_requests: int = 4,
+        block_range: int = 2000,
+        max_block_range: int = 10000,
+        target_logs: int = 5000,
+        head_ttl: float = 1.0,
+    ):
+        self.source = source
+        self.block_range = block_range
+        self.max_block_range = max_block_range
+        self.target_logs = target_logs
+        self.head_ttl = head_ttl
+        self.requests = 0
+        self._semaphore = asyncio.Semaphore(max_requests)
+        self._pending: dict[tuple[int, int], tuple[set[str], asyncio.Future]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._head: asyncio.Task | None = None
+        self._head_time = 0.0
+
+    async def head(self) -> int:
+        # the chain head, requested at most once per `head_ttl` for all the markets
+        now = time.monotonic()
+        if self._head is None or now - self._head_time >= self.head_ttl:
+            self._head = asyncio.ensure_future(self.source.block_number())
+            self._head_time = now
+        try:
+            return await asyncio.shield(self._head)
+        except Exception:
+            self._head = None
+            raise
+
+    async def get_logs(self, address: str, from_block: int, to_block: int) -> tuple[list[RawLog], int]:
+        # logs of `address` from `from_block` up to `to_block`, or less if the range is capped, and the last block covered
+        to_block = min(to_block, from_block + self.block_range - 1)
+        key = (from_block, to_block)
+        if key not in self._pending:
+            self._pending[key] = (set(), asyncio.get_running_loop().create_future())
+            task = asyncio.create_task(self._dispatch(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        addresses, future = self._pending[key]
+        addresses.add(address.lower())
+        logs, last_block = await asyncio.shield(future)
+        return logs.get(address.lower(), []), last_block
+
+    async def block_hash(self, block_number: int) -> bytes:
+        async with self._semaphore:
+            self.requests += 1
+            return await self.source.block_hash(block_number)
+
+    async def _dispatch(self, key: tuple[int, int]):
+        await asyncio.sleep(0)  # lets the other markets asking for the same range join the request
+        addresses, future = self._pending.pop(key)
+        try:
+            future.set_result(await self._fetch(sorted(addresses), *key))
+        except Exception as e:
+            future.set_exception(e)
+
+    async def _fetch(self, addresses: list[str], from_block: int, to_block: int) -> tuple[dict[str, list[RawLog]], int]:
+        refused = False
+        while True:
+            size = to_block - from_block + 1
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    logs = await self.source.get_logs(addresses, from_block, to_block)
+                except RangeTooLargeError:
+                    if size == 1:
+                        raise
+                    refused = True
+                    self.block_range = min(self.block_range, size // 2)
+                    to_block = from_block + size // 2 - 1
+                    continue
+            if len(logs) > self.target_logs:
+                self.block_range = max(1, min(self.block_range, size // 2))
+            elif len(logs) < self.target_logs // 2 and size >= self.block_range and not refused:
+                self.block_range = min(self.max_block_range, self.block_range * 2)
+            grouped: dict[str, list[RawLog]] = {}
+            for log in logs:
+                grouped.setdefault(log.address.lower(), []).append(log)
+            return grouped, to_block
+
+
+@dataclass(frozen=True, slots=True)
+class MarketConfig:
+    chain: str
+    name: str
+    address: str
+    protocol_fee: int
+    start_block: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.chain}/{self.name}"
+
+
+@dataclass(slots=True)
+class MarketMetrics:
+    head_block: int = -1
+    indexed_block: int = -1
+    logs: int = 0
+    events: int = 0
+    errors: int = 0
+    updated_at: float = 0.0  # unix time of the last poll reaching the confirmed head
+
+    @property
+    def lag_blocks(self) -> int:
+        return max(self.head_block - self.indexed_block, 0)
+
+
+def load_market_configs(config_files: Iterable[str | Path], start_blocks: dict[str, int] | None = None) -> list[MarketConfig]:
+    # the RentingV3 markets in `configs/<env>/<chain>/renting.json` files, `start_blocks` keyed by "<chain>/<name>"
+    start_blocks = start_blocks or {}
+    markets = []
+    for config_file in map(Path, config_files):
+        chain = config_file.parent.name
+        with open(config_file, "r") as f:
+            config = json.load(f)
+        markets.extend(
+            MarketConfig(chain, name, c["address"], c["properties"]["protocol_fee"], start_blocks.get(f"{chain}/{name}", 0))
+            for name, c in config["renting"].items()
+            if c["contract"] == "RentingV3Contract" and c.get("address")
+        )
+    return markets
+
+
+class MarketFollower:
+    """
+    Feeds the `JournaledIndexer` of a market one block range at a time. A range is applied entirely or not at all, and
+    the hash of the last block of each range, unchanged while its logs were fetched, is kept so a reorg is rolled back
+    to the last range still canonical.
+    """
+
+    def __init__(
+        self,
+        market: MarketConfig,
+        fetcher: LogFetcher,
+        decoder: LogDecoder,
+        confirmations: int = CONFIRMATIONS,
+        indexer: JournaledIndexer | None = None,
+    ):
+        self.market = market
+        self.fetcher = fetcher
+        self.decoder = decoder
+        self.confirmations = confirmations
+        self.indexer = indexer or JournaledIndexer(market.protocol_fee, market.start_block)
+        self.metrics = MarketMetrics(indexed_block=self.indexer.last_block)
+        self._block_hashes: dict[int, bytes] = {}  # hash of the last block of each range within the journal depth
+        self._base_block = self.indexer.last_block  # last block indexed before the oldest range in `_block_hashes`
+
+    async def poll(self):
+        # rolls back a reorg, then catches up with the confirmed head
+        self.metrics.head_block = await self.fetcher.head()
+        await self._rollback_reorg()
+        target = self.metrics.head_block - self.confirmations
+        while self.indexer.last_block < target:
+            checkpoint = self.indexer.last_block
+            # the hash of the end block read before and after its logs, a reorg in between changes it
+            to_block = min(target, checkpoint + self.fetcher.block_range)
+            block_hash = await self.fetcher.block_hash(to_block)
+            logs, last_block = await self.fetcher.get_logs(self.market.address, checkpoint + 1, to_block)
+            if last_block != to_block or await self.fetcher.block_hash(to_block) != block_hash:
+                continue  # a capped range or a reorg, fetched again
+            events = self.decoder.decode_all(logs)
+            try:
+                self.indexer.apply_all(events)
+                self.indexer.advance_to(last_block)
+            except Exception:
+                self.indexer.rollback_to(checkpoint)
+                raise
+            self._block_hashes[last_block] = block_hash
+            for block_number in [n for n in self._block_hashes if n < last_block - self.indexer.max_depth]:
+                del self._block_hashes[block_number]
+                self._base_block = max(self._base_block, block_number)
+            self.metrics.logs += len(logs)
+            self.metrics.events += len(events)
+            self.metrics.indexed_block = last_block
+        self.metrics.updated_at = time.time()
+
+    async def _rollback_reorg(self):
+        # rolls back to the last range end still on the canonical chain, the journal must go back that far
+        reorged = []
+        for block_number in sorted(self._block_hashes, reverse=True):
+            if await self.fetcher.block_hash(block_number) == self._block_hashes[block_number]:
+                break
+            reorged.append(block_number)
+        if reorged:
+            block_number = max(self._block_hashes.keys() - reorged, default=self._base_block)
+            logger.warning("%s reorged, rolling back to block %d", self.market.key, block_number)
+            self.indexer.rollback_to(block_number)
+            for reorged_block in reorged:
+                del self._block_hashes[reorged_block]
+            self.metrics.indexed_block = block_number
+
+    async def run(self, poll_interval: float):
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                self.metrics.errors += 1
+                logger.exception("failed to index %s", self.market.key)
+            await asyncio.sleep(poll_interval)
+
+
+class IndexingService:
+    """
+    Follows every RentingV3 market concurrently, one `JournaledIndexer` per market fed through the `LogFetcher` of
+    its chain.
+    """
+
+    def __init__(
+        self,
+        markets: Iterable[MarketConfig],
+        fetchers: dict[str, LogFetcher],
+        abi: list[dict],
+        confirmations: int = CONFIRMATIONS,
+        poll_interval: float = 12.0,
+    ):
+        decoder = LogDecoder(abi)
+        self.poll_interval = poll_interval
+        self.followers = {m.key: MarketFollower(m, fetchers[m.chain], decoder, confirmations) for m in markets}
+
+    def indexer(self, key: str) -> JournaledIndexer:
+        return self.followers[key].indexer
+
+    def metrics(self) -> dict[str, MarketMetrics]:
+        return {key: follower.metrics for key, follower in self.followers.items()}
+
+    async def poll(self):
+        await asyncio.gather(*(follower.poll() for follower in self.followers.values()))
+
+    async def run(self):
+        await asyncio.gather(*(follower.run(self.poll_interval) for follower in self.followers.values()))
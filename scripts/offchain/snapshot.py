@@ -0,0 +1,111 @@
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from .indexer import TokenContextIndexer
+from .structs import Rental, TokenContext
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PREFIX = "snapshot-"
+SNAPSHOT_SUFFIX = ".json"
+
+
+def dump_state(indexer: TokenContextIndexer) -> dict[str, Any]:
+    return {
+        "version": SNAPSHOT_VERSION,
+        "last_block": indexer.last_block,
+        "protocol_fee": indexer.protocol_fee,
+        "protocol_fees_amount": indexer.protocol_fees_amount,
+        "unclaimed_rewards": indexer.unclaimed_rewards,
+        "listing_revocations": [[token_id, ts] for token_id, ts in indexer.listing_revocations.items()],
+        "contexts": [
+            [c.token_id, c.nft_owner, [c.active_rental.id.hex(), *c.active_rental.to_tuple()[1:]]]
+            for c in indexer.contexts.values()
+        ],
+    }
+
+
+def load_state(state: dict[str, Any]) -> TokenContextIndexer:
+    if state["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version {state['version']}")
+    indexer = TokenContextIndexer(protocol_fee=state["protocol_fee"], start_block=state["last_block"] + 1)
+    indexer.protocol_fees_amount = state["protocol_fees_amount"]
+    indexer.unclaimed_rewards = dict(state["unclaimed_rewards"])
+    indexer.listing_revocations = dict(state["listing_revocations"])
+    indexer.contexts = {
+        token_id: TokenContext(token_id, nft_owner, Rental(bytes.fromhex(rental[0]), *rental[1:]))
+        for token_id, nft_owner, rental in state["contexts"]
+    }
+    return indexer
+
+
+class SnapshotStore:
+    """
+    Directory of indexer snapshots, one file per checkpointed block. Files are written to a temporary name and
+    atomically renamed, so a crash while saving never leaves a partial snapshot behind.
+    """
+
+    def __init__(self, directory: str | Path, keep: int = 3):
+        self.directory = Path(directory)
+        self.keep = keep
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, block_number: int) -> Path:
+        return self.directory / f"{SNAPSHOT_PREFIX}{block_number:012d}{SNAPSHOT_SUFFIX}"
+
+    def blocks(self) -> list[int]:
+        return sorted(
+            int(p.name[len(SNAPSHOT_PREFIX) : -len(SNAPSHOT_SUFFIX)])
+            for p in self.directory.glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}")
+        )
+
+    def save(self, indexer: TokenContextIndexer) -> Path:
+        path = self.path(indexer.last_block)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(dump_state(indexer), f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(path)
+        self.prune()
+        return path
+
+    def prune(self):
+        for block_number in self.blocks()[: -self.keep]:
+            self.path(block_number).unlink(missing_ok=True)
+
+    def load(self, block_number: int) -> TokenContextIndexer:
+        with open(self.path(block_number), "r") as f:
+            return load_state(json.load(f))
+
+    def latest(self) -> TokenContextIndexer | None:
+        # falls back to older snapshots if the latest one can't be read
+        for block_number in reversed(self.blocks()):
+            try:
+                return self.load(block_number)
+            except (OSError, ValueError, KeyError):
+                continue
+        return None
+
+
+class Checkpointer:
+    # snapshots the indexer whenever it crosses a multiple of `interval` blocks
+    def __init__(self, indexer: TokenContextIndexer, store: SnapshotStore, interval: int):
+        self.indexer = indexer
+        self.store = store
+        self.interval = interval
+        self.checkpoint_block = max(indexer.last_block, 0)
+
+    def advance_to(self, block_number: int) -> bool:
+        self.indexer.advance_to(block_number)
+        if block_number // self.interval <= self.checkpoint_block // self.interval:
+            return False
+        self.store.save(self.indexer)
+        self.checkpoint_block = block_number
+        return True
+
+
+def resume(store: SnapshotStore, protocol_fee: int, start_block: int = 0) -> TokenContextIndexer:
+    # the returned indexer must be fed the events from `indexer.last_block + 1` onwards
+    return store.latest() or TokenContextIndexer(protocol_fee=protocol_fee, start_block=start_block)
@@ -0,0 +1,45 @@
+from eth_utils import keccak
+
+from .structs import ZERO_BYTES32, Rental
+
+
+def address_word(address: str) -> bytes:
+    return bytes.fromhex(address[2:]).rjust(32, b"\x00")
+
+
+def uint_word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def state_hash(token_id: int, nft_owner: str, rental: Rental) -> bytes:
+    # mirrors RentingV3._state_hash, the contract keeps the upper 192 bits of the hash as the state commitment
+    return state_commitment(state_digest(token_id, nft_owner, rental))
+
+
+def state_digest(token_id: int, nft_owner: str, rental: Rental) -> bytes:
+    # the full state hash, as stored by the markets deployed before the packed token slots
+    return keccak(
+        b"".join(
+            (
+                uint_word(token_id),
+                address_word(nft_owner),
+                rental.id,
+                address_word(rental.owner),
+                address_word(rental.renter),
+                address_word(rental.delegate),
+                uint_word(rental.token_id),
+                uint_word(rental.start),
+                uint_word(rental.min_expiration),
+                uint_word(rental.expiration),
+                uint_word(rental.amount),
+                uint_word(rental.protocol_fee),
+            )
+        )
+    )
+
+
+def state_commitment(digest: bytes) -> bytes:
+    return digest[:24] + bytes(8)
+
+
+EMPTY_STATE = ZERO_BYTES32
@@ -0,0 +1,183 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+ZERO_ADDRESS = "0x" + "00" * 20
+ZERO_BYTES32 = b"\x00" * 32
+
+
+@dataclass(frozen=True, slots=True)
+class Rental:
+    id: bytes = ZERO_BYTES32
+    owner: str = ZERO_ADDRESS
+    renter: str = ZERO_ADDRESS
+    delegate: str = ZERO_ADDRESS
+    token_id: int = 0
+    start: int = 0
+    min_expiration: int = 0
+    expiration: int = 0
+    amount: int = 0
+    protocol_fee: int = 0
+
+    def to_tuple(self) -> tuple:
+        return (
+            self.id,
+            self.owner,
+            self.renter,
+            self.delegate,
+            self.token_id,
+            self.start,
+            self.min_expiration,
+            self.expiration,
+            self.amount,
+            self.protocol_fee,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class TokenContext:
+    token_id: int = 0
+    nft_owner: str = ZERO_ADDRESS
+    active_rental: Rental = field(default_factory=Rental)
+
+    def to_tuple(self) -> tuple:
+        return (self.token_id, self.nft_owner, self.active_rental.to_tuple())
+
+
+@dataclass(frozen=True, slots=True)
+class Listing:
+    token_id: int = 0
+    price: int = 0  # price per hour, 0 means not listed
+    min_duration: int = 0  # hours
+    max_duration: int = 0  # hours, 0 means unlimited
+    timestamp: int = 0
+
+    def to_tuple(self) -> tuple:
+        return (self.token_id, self.price, self.min_duration, self.max_duration, self.timestamp)
+
+
+@dataclass(frozen=True, slots=True)
+class Signature:
+    v: int
+    r: int
+    s: int
+
+    def to_tuple(self) -> tuple:
+        return (self.v, self.r, self.s)
+
+
+@dataclass(frozen=True, slots=True)
+class SignedListing:
+    listing: Listing
+    owner_signature: Signature
+    admin_signature: Signature
+
+    def to_tuple(self) -> tuple:
+        return (self.listing.to_tuple(), self.owner_signature.to_tuple(), self.admin_signature.to_tuple())
+
+
+@dataclass(frozen=True, slots=True)
+class TokenContextAndListing:
+    token_context: TokenContext
+    signed_listing: SignedListing
+    duration: int  # hours
+
+    def to_tuple(self) -> tuple:
+        return (self.token_context.to_tuple(), self.signed_listing.to_tuple(), self.duration)
+
+
+@dataclass(frozen=True, slots=True)
+class Permit:
+    # EIP-2612 permit of the payment token, a zero deadline meaning no permit
+    value: int = 0
+    deadline: int = 0
+    signature: Signature = field(default_factory=lambda: Signature(0, 0, 0))
+
+    def to_tuple(self) -> tuple:
+        return (self.value, self.deadline, self.signature.to_tuple())
+
+
+@dataclass(frozen=True, slots=True)
+class TokenContextAndRootListing:
+    token_context: TokenContext
+    listing: Listing
+    proof: tuple[bytes, ...]  # empty for a listing signed by itself
+    signature_index: int
+    duration: int  # hours
+
+    def to_tuple(self) -> tuple:
+        return (self.token_context.to_tuple(), self.listing.to_tuple(), list(self.proof), self.signature_index, self.duration)
+
+
+@dataclass(frozen=True, slots=True)
+class VaultLog:
+    vault: str
+    token_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class RentalLog:
+    id: bytes
+    vault: str
+    owner: str
+    token_id: int
+    start: int
+    min_expiration: int
+    expiration: int
+    amount: int
+    protocol_fee: int
+
+
+@dataclass(frozen=True, slots=True)
+class RentalExtensionLog:
+    id: bytes
+    vault: str
+    owner: str
+    token_id: int
+    start: int
+    min_expiration: int
+    expiration: int
+    amount_settled: int
+    extension_amount: int
+    protocol_fee: int
+
+
+@dataclass(frozen=True, slots=True)
+class RewardLog:
+    token_id: int
+    active_rental_amount: int
+
+
+@dataclass(frozen=True, slots=True)
+class WithdrawalLog:
+    vault: str
+    token_id: int
+
+
+@dataclass(frozen=True, slots=True)
+class TokenState:
+    state: bytes
+    listing_revocation: int
+    vault: str
+    vault_deployed: bool
+
+
+@dataclass(frozen=True, slots=True)
+class EventLog:
+    # a decoded RentingV3 event, with struct arguments kept as tuples in the abi field order
+    name: str
+    args: dict[str, Any]
+    block_number: int
+    log_index: int
+    timestamp: int
+    address: str = ZERO_ADDRESS
+
+
+@dataclass(frozen=True, slots=True)
+class RawLog:
+    # an undecoded log as returned by eth_getLogs, the timestamp comes from the block
+    address: str
+    topics: tuple[bytes, ...]
+    data: bytes
+    block_number: int
+    log_index: int
+    timestamp: int = 0
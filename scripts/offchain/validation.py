@@ -0,0 +1,159 @@
+from collections.abc import Sequence
+from functools import lru_cache
+
+from eth_keys import keys
+from eth_keys.exceptions import BadSignature, ValidationError
+
+from .signing import ListingSigner
+from .state import state_hash
+from .structs import ZERO_ADDRESS, Listing, Signature, TokenContext, TokenContextAndListing, TokenState
+
+# mirrors the RentingV3 constants
+LISTINGS_SIGNATURE_VALID_PERIOD = 120
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+
+
+@lru_cache(maxsize=1 << 14)
+def ecrecover(digest: bytes, v: int, r: int, s: int) -> str:
+    # mirrors the ecrecover precompile, returning the zero address for an invalid signature
+    if v not in {27, 28} or not 0 < r < SECP256K1_N or not 0 < s < SECP256K1_N:
+        return ZERO_ADDRESS
+    try:
+        public_key = keys.Signature(vrs=(v - 27, r, s)).recover_public_key_from_msg_hash(digest)
+    except (BadSignature, ValidationError):
+        return ZERO_ADDRESS
+    return public_key.to_checksum_address()
+
+
+def _same_address(a: str, b: str) -> bool:
+    return a.lower() == b.lower()
+
+
+def is_within_duration_range(listing: Listing, duration: int) -> bool:
+    # mirrors RentingV3._is_within_duration_range
+    return duration >= listing.min_duration and (listing.max_duration == 0 or duration <= listing.max_duration)
+
+
+def is_rental_active(context: TokenContext, now: int) -> bool:
+    # mirrors RentingV3._is_rental_active
+    return context.active_rental.expiration > now
+
+
+class ListingValidator:
+    """
+    Mirrors the per-item checks of RentingV3 `start_rentals` and `extend_rentals`, in the same order, so a batch can
+    be screened before submitting it. Each verdict is the revert reason of the first failing check, or None if the
+    item passes. `token_states` are the matching results of the `token_states` view and `now` the expected block
+    timestamp. The batch level checks (pause, payment token balance and allowance) are not covered.
+    """
+
+    def __init__(self, signer: ListingSigner, protocol_admin: str):
+        self.signer = signer
+        self.protocol_admin = protocol_admin
+
+    def is_signed_by_owner(self, listing: Listing, owner_signature: Signature, owner: str) -> bool:
+        # mirrors RentingV3._is_listing_signed_by_owner
+        digest = self.signer.listing_hash(listing)
+        return _same_address(ecrecover(digest, *owner_signature.to_tuple()), owner)
+
+    def is_root_signed_by_owner(self, root: bytes, owner_signature: Signature, owner: str) -> bool:
+        # mirrors RentingV3._check_root_listing for a tree of more than one listing
+        digest = self.signer.root_hash(root)
+        return _same_address(ecrecover(digest, *owner_signature.to_tuple()), owner)
+
+    def is_signed_by_admin(self, owner_signature: Signature, admin_signature: Signature, signature_timestamp: int) -> bool:
+        # mirrors RentingV3._is_signed_by_admin
+        digest = self.signer.admin_hash(owner_signature, signature_timestamp)
+        return _same_address(ecrecover(digest, *admin_signature.to_tuple()), self.protocol_admin)
+
+    def check_listing(
+        self, context: TokenContextAndListing, signature_timestamp: int, now: int, listing_revocation: int
+    ) -> str | None:
+        # mirrors RentingV3._check_valid_listing
+        signed_listing = context.signed_listing
+        listing = signed_listing.listing
+        if context.token_context.token_id != listing.token_id:
+            return "invalid token_id"
+        if not self.is_signed_by_owner(listing, signed_listing.owner_signature, context.token_context.nft_owner):
+            return "invalid owner signature"
+        if not self.is_signed_by_admin(signed_listing.owner_signature, signed_listing.admin_signature, signature_timestamp):
+            return "invalid admin signature"
+        if signature_timestamp + LISTINGS_SIGNATURE_VALID_PERIOD <= now:
+            return "listing expired"
+        if listing_revocation >= listing.timestamp:
+            return "listing revoked"
+        return None
+
+    def validate_start(
+        self,
+        contexts: Sequence[TokenContextAndListing],
+        token_states: Sequence[TokenState],
+        signature_timestamp: int,
+        now: int,
+    ) -> list[str | None]:
+        return self._validate(contexts, token_states, signature_timestamp, now, renter=None)
+
+    def validate_extend(
+        self,
+        contexts: Sequence[TokenContextAndListing],
+        token_states: Sequence[TokenState],
+        signature_timestamp: int,
+        now: int,
+        renter: str,
+    ) -> list[str | None]:
+        return self._validate(contexts, token_states, signature_timestamp, now, renter=renter)
+
+    def _validate(
+        self,
+        contexts: Sequence[TokenContextAndListing],
+        token_states: Sequence[TokenState],
+        signature_timestamp: int,
+        now: int,
+        renter: str | None,
+    ) -> list[str | None]:
+        # a token accepted earlier in the batch has its state changed, so a repeated token is an invalid context
+        accepted: set[int] = set()
+        verdicts = []
+        for context, token_state in zip(contexts, token_states, strict=True):
+            verdict = self._check_item(context, token_state, signature_timestamp, now, renter)
+            if verdict is None and context.token_context.token_id in accepted:
+                verdict = "invalid context"
+            if verdict is None:
+                accepted.add(context.token_context.token_id)
+            verdicts.append(verdict)
+        return verdicts
+
+    def _check_item(
+        self,
+        context: TokenContextAndListing,
+        token_state: TokenState,
+        signature_timestamp: int,
+        now: int,
+        renter: str | None,
+    ) -> str | None:
+        return (
+            _check_context(context.token_context, token_state, now, renter)
+            or _check_terms(context)
+            or self.check_listing(context, signature_timestamp, now, token_state.listing_revocation)
+        )
+
+
+def _check_context(token_context: TokenContext, token_state: TokenState, now: int, renter: str | None) -> str | None:
+    # a deposited token always has a non-empty state, so a matching state also proves its vault exists
+    if bytes(token_state.state) != state_hash(token_context.token_id, token_context.nft_owner, token_context.active_rental):
+        return "invalid context"
+    if renter is None:
+        return "active rental" if is_rental_active(token_context, now) else None
+    if not is_rental_active(token_context, now):
+        return "no active rental"
+    if not _same_address(renter, token_context.active_rental.renter):
+        return "not renter of active rental"
+    return None
+
+
+def _check_terms(context: TokenContextAndListing) -> str | None:
+    if not is_within_duration_range(context.signed_listing.listing, context.duration):
+        return "duration not respected"
+    if context.signed_listing.listing.price == 0:
+        return "listing not active"
+    return None
@@ -0,0 +1,119 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .vaults import vault_addresses
+
+INDEX_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Market:
+    renting: str
+    vault_impl: str
+    token_ids: range
+
+
+def load_markets(config_file: str | Path, token_ids: dict[str, range]) -> dict[str, Market]:
+    # the RentingV3 markets in a `configs/<env>/<chain>/renting.json` file, by their key in the "renting" scope, each
+    # market needs the token id range of its collection in `token_ids`
+    with open(config_file, "r") as f:
+        config = json.load(f)
+    configs = {
+        name: c
+        for name, c in config["renting"].items()
+        if c["contract"] == "RentingV3Contract" and c.get("address") and c.get("properties_addresses", {}).get("vault_impl")
+    }
+    if missing := [name for name in configs if name not in token_ids]:
+        raise ValueError(f"no token id range for markets {', '.join(missing)}")
+    return {
+        name: Market(c["address"], c["properties_addresses"]["vault_impl"], token_ids[name]) for name, c in configs.items()
+    }
+
+
+class VaultIndex:
+    """
+    Reverse index from vault address to (market, token id) for the RentingV3 markets of a chain, derived offline from
+    the CREATE2 addresses. Only markets that are new or whose renting contract, vault implementation or token range
+    changed are derived again when syncing with the configs.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else None
+        self.markets: dict[str, Market] = {}
+        self._vaults: dict[bytes, tuple[str, int]] = {}
+        self._market_vaults: dict[str, list[bytes]] = {}
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._vaults)
+
+    def lookup(self, vault: str) -> tuple[str, int] | None:
+        return self._vaults.get(bytes.fromhex(vault[2:]))
+
+    def add_market(self, key: str, market: Market) -> bool:
+        if self.markets.get(key) == market:
+            return False
+        self.remove_market(key)
+        addresses = vault_addresses(market.renting, market.vault_impl, market.token_ids)
+        self._add(key, market, addresses)
+        return True
+
+    def remove_market(self, key: str):
+        self.markets.pop(key, None)
+        for address in self._market_vaults.pop(key, []):
+            del self._vaults[address]
+
+    def sync(self, markets: dict[str, Market]) -> list[str]:
+        # returns the keys of the markets added, updated or removed
+        removed = [key for key in self.markets if key not in markets]
+        for key in removed:
+            self.remove_market(key)
+        changed = [key for key, market in markets.items() if self.add_market(key, market)]
+        if (removed or changed) and self.path:
+            self.save()
+        return removed + changed
+
+    def save(self):
+        keys = list(self.markets)
+        vaults = [address for key in keys for address in self._market_vaults[key]]
+        meta = {
+            "version": INDEX_VERSION,
+            "markets": {
+                key: [market.renting, market.vault_impl, market.token_ids.start, market.token_ids.stop]
+                for key, market in self.markets.items()
+            },
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(meta)),
+                vaults=np.frombuffer(b"".join(vaults), dtype=np.uint8).reshape(-1, 20),
+                counts=np.array([len(self._market_vaults[key]) for key in keys], dtype=np.uint64),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.path)
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            vaults = data["vaults"]
+            counts = data["counts"].tolist()
+        if meta["version"] != INDEX_VERSION:
+            raise ValueError(f"unsupported vault index version {meta['version']}")
+        offset = 0
+        for (key, (renting, vault_impl, start, stop)), count in zip(meta["markets"].items(), counts, strict=True):
+            market = Market(renting, vault_impl, range(start, stop))
+            self._add(key, market, [row.tobytes() for row in vaults[offset : offset + count]])
+            offset += count
+
+    def _add(self, key: str, market: Market, addresses: list[bytes]):
+        self.markets[key] = market
+        self._market_vaults[key] = addresses
+        self._vaults.update(zip(addresses, ((key, token_id) for token_id in market.token_ids), strict=True))
@@ -0,0 +1,59 @@
+from collections.abc import Iterable
+from functools import lru_cache
+
+import numpy as np
+from eth_utils import keccak, to_checksum_address
+
+# mirrors the RentingV3 constants used to derive the vault addresses
+COLLISION_OFFSET = bytes.fromhex("FF")
+DEPLOYMENT_CODE = bytes.fromhex("602D3D8160093D39F3")
+PRE = bytes.fromhex("363d3d373d3d3d363d73")
+POST = bytes.fromhex("5af43d82803e903d91602b57fd5bf3")
+
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:])
+
+
+@lru_cache(maxsize=64)
+def init_code_hash(vault_impl: str) -> bytes:
+    # the ERC1167 proxy init code only depends on the vault implementation, so one hash serves every renting contract
+    return keccak(DEPLOYMENT_CODE + PRE + _address_bytes(vault_impl) + POST)
+
+
+def compute_address(salt: bytes, bytecode_hash: bytes, deployer: str) -> str:
+    # mirrors RentingV3._compute_address
+    return to_checksum_address(keccak(COLLISION_OFFSET + _address_bytes(deployer) + salt + bytecode_hash)[12:])
+
+
+def tokenid_to_vault(renting: str, vault_impl: str, token_id: int) -> str:
+    # mirrors RentingV3._tokenid_to_vault
+    return compute_address(token_id.to_bytes(32, "big"), init_code_hash(vault_impl), renting)
+
+
+def vault_addresses(renting: str, vault_impl: str, token_ids: Iterable[int]) -> list[bytes]:
+    # raw 20 byte vault addresses, skipping the checksum encoding
+    prefix = COLLISION_OFFSET + _address_bytes(renting)
+    bytecode_hash = init_code_hash(vault_impl)
+    return [keccak(prefix + token_id.to_bytes(32, "big") + bytecode_hash)[12:] for token_id in token_ids]
+
+
+def vault_table(renting: str, vault_impl: str, token_ids: Iterable[int]) -> dict[int, str]:
+    token_ids = list(token_ids)
+    addresses = vault_addresses(renting, vault_impl, token_ids)
+    return dict(zip(token_ids, _checksum_addresses(addresses), strict=True))
+
+
+def _checksum_addresses(addresses: list[bytes]) -> list[str]:
+    # EIP-55 over a whole batch, uppercasing the hex letters whose digest nibble is 8 or more
+    if not addresses:
+        return []
+    hex_addresses = [address.hex() for address in addresses]
+    digests = np.frombuffer(b"".join(keccak(h.encode())[:20] for h in hex_addresses), dtype=np.uint8).reshape(-1, 20)
+    nibbles = np.empty((len(addresses), 40), dtype=np.uint8)
+    nibbles[:, 0::2] = digests >> 4
+    nibbles[:, 1::2] = digests & 0x0F
+    chars = np.frombuffer("".join(hex_addresses).encode(), dtype=np.uint8).reshape(-1, 40).copy()
+    chars[(nibbles >= 8) & (chars >= ord("a"))] -= ord("a") - ord("A")
+    text = chars.tobytes().decode()
+    return ["0x" + text[i : i + 40] for i in range(0, len(text), 40)]
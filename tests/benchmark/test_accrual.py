@@ -0,0 +1,86 @@
+import os
+
+import boa
+import pytest
+from eth_account import Account
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, TokenContext, TokenContextAndListing
+
+from ..conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, ArtifactDeployer, deploy_market, get_event_logs
+
+BATCHES = [int(size) for size in os.environ.get("BENCH_ACCRUAL", "1,8,32").split(",")]
+PRICE = int(1e18)
+KEYS = ("start", "restart", "extend", "close")
+
+
+def deploy_renting(renting_contract_def, nft_owner: str, admin: str):
+    renting_contract, nft_contract, ape_contract, owner = deploy_market(admin, contract_def=renting_contract_def)
+
+    token_ids = list(range(1, max(BATCHES) + 1))
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    return renting_contract, ape_contract
+
+
+def execution_gas(function, *args, **kwargs) -> int:
+    # storage and accounts start cold, as in a new transaction
+    boa.env.reset_gas_used()
+    function(*args, **kwargs)
+    return function.contract._computation.get_gas_used()
+
+
+def token_gas(renting_contract_def, size: int) -> dict[str, float]:
+    # execution gas per token of the calls accruing owner rewards and protocol fees, all tokens of one owner
+    nft_owner, admin = Account.create(), Account.create()
+    renter = boa.env.generate_address("renter")
+    renting_contract, ape_contract = deploy_renting(renting_contract_def, nft_owner.address, admin.address)
+    signer = ListingSigner(renting_contract.address, boa.eval("chain.id"))
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 0))  # the deposits of `deploy_renting`
+    ape_contract.mint(renter, 1000 * PRICE * size, sender=ape_contract.minter())
+    ape_contract.approve(renting_contract.address, 1000 * PRICE * size, sender=renter)
+
+    def contexts(token_contexts, duration):
+        now = boa.eval("block.timestamp")
+        listings = [Listing(c.token_id, PRICE, 1, 0, now) for c in token_contexts]
+        signed = signer.sign_all(listings, nft_owner.key, admin.key, now)
+        return [TokenContextAndListing(c, s, duration).to_tuple() for c, s in zip(token_contexts, signed, strict=True)], now
+
+    token_ids = range(1, size + 1)
+    gas = {}
+    batch, now = contexts([TokenContext(token_id, nft_owner.address) for token_id in token_ids], 1)
+    gas["start"] = execution_gas(renting_contract.start_rentals, batch, ZERO_ADDRESS, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+
+    # the expired rentals are consolidated by the new ones
+    boa.env.time_travel(seconds=2 * 3600)
+    batch, now = contexts([indexer.token_context(token_id) for token_id in token_ids], 2)
+    gas["restart"] = execution_gas(renting_contract.start_rentals, batch, ZERO_ADDRESS, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+
+    boa.env.time_travel(seconds=3600)
+    batch, now = contexts([indexer.token_context(token_id) for token_id in token_ids], 3)
+    gas["extend"] = execution_gas(renting_contract.extend_rentals, batch, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 3))
+
+    boa.env.time_travel(seconds=3600)
+    token_contexts = [indexer.token_context(token_id).to_tuple() for token_id in token_ids]
+    gas["close"] = execution_gas(renting_contract.close_rentals, token_contexts, sender=renter)
+    return {key: value / size for key, value in gas.items()}
+
+
+# resetting the warm accounts and slots between calls doesn't work within an anchor
+@pytest.mark.ignore_isolation
+def test_accrual_gas():
+    per_token_contract_def = ArtifactDeployer("tests/stubs/RentingV3PerToken.json")
+    renting_contract_def = boa.load_partial("contracts/RentingV3.vy")
+
+    print("\nexecution gas per token, per token accrual -> batched accrual")
+    print(f"{'tokens':>6} {'start':>20} {'restart':>20} {'extend':>20} {'close':>20}")
+    for size in BATCHES:
+        before, after = token_gas(per_token_contract_def, size), token_gas(renting_contract_def, size)
+        print(f"{size:>6} {' '.join(f'{before[key]:>9,.0f} -> {after[key]:>7,.0f}' for key in KEYS)}")
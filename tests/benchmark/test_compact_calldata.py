@@ -0,0 +1,82 @@
+import os
+
+import boa
+from eth_account import Account
+
+from scripts.offchain.compact import encode_compact
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, TokenContext, TokenContextAndListing
+
+from ..conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, deploy_market, get_event_logs
+
+BATCHES = [int(size) for size in os.environ.get("BENCH_COMPACT_CALLDATA", "1,8,32").split(",")]
+PRICE = int(1e18)
+TX_GAS = 21000
+
+
+def deploy_renting(nft_owner: str, admin: str):
+    renting_contract, nft_contract, ape_contract, owner = deploy_market(admin)
+
+    token_ids = list(range(1, max(BATCHES) + 1))
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    return renting_contract, ape_contract
+
+
+def calldata_gas(calldata: bytes) -> int:
+    return sum(4 if byte == 0 else 16 for byte in calldata)
+
+
+def tx_gas(function, *args, **kwargs) -> tuple[int, int]:
+    # calldata gas, and intrinsic plus calldata plus execution gas of a transaction
+    calldata = calldata_gas(function.prepare_calldata(*args))
+    function(*args, **kwargs)
+    return calldata, TX_GAS + calldata + function.contract._computation.get_gas_used()
+
+
+def rental_gas(size: int, *, compact: bool) -> dict[str, tuple[int, int]]:
+    nft_owner, admin = Account.create(), Account.create()
+    renter = boa.env.generate_address("renter")
+    renting_contract, ape_contract = deploy_renting(nft_owner.address, admin.address)
+    signer = ListingSigner(renting_contract.address, boa.eval("chain.id"))
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 0))  # the deposits of `deploy_renting`
+    ape_contract.mint(renter, 1000 * PRICE * size, sender=ape_contract.minter())
+    ape_contract.approve(renting_contract.address, 1000 * PRICE * size, sender=renter)
+
+    def contexts(token_contexts, duration):
+        now = boa.eval("block.timestamp")
+        listings = [Listing(c.token_id, PRICE, 1, 0, now) for c in token_contexts]
+        signed = signer.sign_all(listings, nft_owner.key, admin.key, now)
+        batch = [TokenContextAndListing(c, s, duration) for c, s in zip(token_contexts, signed, strict=True)]
+        return (encode_compact(batch) if compact else ([context.to_tuple() for context in batch],)), now
+
+    token_ids = range(1, size + 1)
+    gas = {}
+    with boa.env.anchor():
+        args, now = contexts([TokenContext(token_id, nft_owner.address) for token_id in token_ids], 2)
+        start = renting_contract.start_rentals_compact if compact else renting_contract.start_rentals
+        gas["start"] = tx_gas(start, *args, ZERO_ADDRESS, now, sender=renter)
+        indexer.apply_all(get_event_logs(renting_contract, 1))
+
+        boa.env.time_travel(seconds=3600)
+        args, now = contexts([indexer.token_context(token_id) for token_id in token_ids], 3)
+        extend = renting_contract.extend_rentals_compact if compact else renting_contract.extend_rentals
+        gas["extend"] = tx_gas(extend, *args, now, sender=renter)
+    return gas
+
+
+def test_compact_calldata():
+    print("\ncalldata gas / transaction gas, abi -> compact")
+    print(f"{'tokens':>6} {'start':>44} {'extend':>44}")
+    for size in BATCHES:
+        abi, compact = rental_gas(size, compact=False), rental_gas(size, compact=True)
+        columns = [
+            f"{abi[k][0]:>9,} / {abi[k][1]:>9,} -> {compact[k][0]:>9,} / {compact[k][1]:>9,}" for k in ("start", "extend")
+        ]
+        print(f"{size:>6} {' '.join(columns)}")
+        assert compact["start"][0] < abi["start"][0]
+        assert compact["extend"][0] < abi["extend"][0]
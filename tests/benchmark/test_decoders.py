@@ -0,0 +1,65 @@
+import os
+import time
+from pathlib import Path
+
+from eth_abi import encode
+from vyper import compile_code
+
+from scripts.offchain.decoders import DecoderPool, LogDecoder
+from scripts.offchain.structs import RawLog
+
+LOGS = int(os.environ.get("BENCH_LOGS", "20000"))
+BATCH = 32
+RENTING = "0x" + "12" * 20
+WALLET = "0x" + "34" * 20
+
+SAMPLE_VALUES = {
+    "address": WALLET,
+    "bool": True,
+    "bytes32": b"\x01" * 32,
+}
+
+
+def sample(abi_type: str, i: int):
+    if abi_type.endswith("[]"):
+        return [sample(abi_type[:-2], i + j) for j in range(BATCH)]
+    if abi_type.startswith("("):
+        return tuple(sample(t, i) for t in abi_type[1:-1].split(","))
+    return SAMPLE_VALUES.get(abi_type, i)
+
+
+def synthetic_logs(decoder, name: str, count: int) -> list[RawLog]:
+    event = next(e for e in decoder.events.values() if e.name == name)
+    return [
+        RawLog(RENTING, (event.topic,), encode(event.data_types, [sample(t, i) for t in event.data_types]), i, 0, i)
+        for i in range(count)
+    ]
+
+
+def rate(fn, logs) -> float:
+    started = time.perf_counter()
+    fn(logs)
+    return len(logs) / (time.perf_counter() - started)
+
+
+def test_decoder_throughput():
+    abi = compile_code(Path("contracts/RentingV3.vy").read_text(encoding="utf-8"), output_formats=["abi"])["abi"]
+    decoder = LogDecoder(abi)
+    names = ["RentalStarted", "RentalExtended", "NftsDeposited", "RewardsClaimed", "ListingsRevoked", "FeesClaimed"]
+
+    header = f"{'event':<16} {'eth_abi':>12} {'compiled':>12} {'pool':>12} {'records':>12} {'pool records':>14}"
+    print(f"\n{header}  logs/s, {BATCH} structs per array")
+    with DecoderPool(abi) as pool:
+        for name in names:
+            logs = synthetic_logs(decoder, name, LOGS)
+            event = decoder.events[logs[0].topics[0]]
+            generic = rate(lambda logs, event=event: [event._decode_generic(log) for log in logs], logs)
+            compiled = rate(decoder.decode_all, logs)
+            pooled = rate(pool.decode_all, logs)
+            if name.startswith("Rental"):
+                records = f"{rate(decoder.rental_records, logs):>12,.0f} {rate(pool.rental_records, logs):>14,.0f}"
+            else:
+                records = f"{'-':>12} {'-':>14}"
+            print(f"{name:<16} {generic:>12,.0f} {compiled:>12,.0f} {pooled:>12,.0f} {records}")
+            if name == "RentalStarted":
+                assert compiled > generic
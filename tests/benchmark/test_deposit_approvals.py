@@ -0,0 +1,53 @@
+import os
+
+import boa
+
+from ..conftest_base import ZERO_ADDRESS, deploy_market
+
+TOKENS = int(os.environ.get("BENCH_DEPOSIT_TOKENS", "32"))
+TX_GAS = 21000
+
+
+def deploy_renting():
+    market = deploy_market()
+    return market.renting, market.nft, market.owner
+
+
+def calldata_gas(calldata: bytes) -> int:
+    return sum(4 if byte == 0 else 16 for byte in calldata)
+
+
+def tx_gas(function, *args, **kwargs) -> int:
+    # intrinsic, calldata and execution gas of a transaction
+    function(*args, **kwargs)
+    return TX_GAS + function.contract._computation.get_gas_used() + calldata_gas(function.prepare_calldata(*args))
+
+
+def test_deposit_approvals():
+    renting_contract, nft_contract, owner = deploy_renting()
+    nft_owner = boa.env.generate_address("nft_owner")
+    token_ids = list(range(1, TOKENS + 1))
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+
+    with boa.env.anchor():
+        approvals = [
+            tx_gas(nft_contract.approve, renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+            for token_id in token_ids
+        ]
+        per_vault = (
+            len(approvals) + 1,
+            sum(approvals),
+            tx_gas(renting_contract.deposit, token_ids, ZERO_ADDRESS, sender=nft_owner),
+        )
+
+    with boa.env.anchor():
+        approval = tx_gas(nft_contract.setApprovalForAll, renting_contract.address, True, sender=nft_owner)
+        approved_for_all = (2, approval, tx_gas(renting_contract.deposit, token_ids, ZERO_ADDRESS, sender=nft_owner))
+        assert all(nft_contract.ownerOf(token_id) == renting_contract.tokenid_to_vault(token_id) for token_id in token_ids)
+
+    print(f"\ndeposit of {TOKENS} tokens, gas including intrinsic and calldata")
+    print(f"{'mode':<18} {'txs':>4} {'approvals':>10} {'deposit':>10} {'total':>10}")
+    for name, (txs, approval_gas, deposit_gas) in [("approve per vault", per_vault), ("approved for all", approved_for_all)]:
+        print(f"{name:<18} {txs:>4} {approval_gas:>10,} {deposit_gas:>10,} {approval_gas + deposit_gas:>10,}")
+    assert sum(approved_for_all[1:]) < sum(per_vault[1:])
@@ -0,0 +1,62 @@
+import os
+import time
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.snapshot import Checkpointer, SnapshotStore, resume
+from scripts.offchain.structs import ZERO_ADDRESS, EventLog
+
+EVENTS = int(os.environ.get("BENCH_EVENTS", "1000000"))
+TOKENS = 1000
+EVENTS_PER_BLOCK = 10
+SNAPSHOT_INTERVAL = 10000
+PROTOCOL_FEE = 500
+OWNER = "0x" + "11" * 20
+RENTER = "0x" + "22" * 20
+
+
+def synthetic_event(i: int, n_tokens: int) -> EventLog:
+    # deterministic market history: every token is deposited and then rented and closed in rounds
+    block_number = i // EVENTS_PER_BLOCK
+    timestamp = block_number * 12
+    if i < n_tokens:
+        args = {"owner": OWNER, "nft_contract": ZERO_ADDRESS, "vaults": [(ZERO_ADDRESS, i + 1)]}
+        return EventLog("NftsDeposited", args, block_number, i % EVENTS_PER_BLOCK, timestamp)
+
+    rounds, token_index = divmod(i - n_tokens, n_tokens)
+    rental_id = (i - n_tokens * (rounds % 2)).to_bytes(32, "big")
+    rental = (rental_id, ZERO_ADDRESS, OWNER, token_index + 1, timestamp, timestamp, timestamp + 3600, 1000, PROTOCOL_FEE)
+    name = "RentalClosed" if rounds % 2 else "RentalStarted"
+    args = {"renter": RENTER, "delegate": RENTER, "nft_contract": ZERO_ADDRESS, "rentals": [rental]}
+    return EventLog(name, args, block_number, i % EVENTS_PER_BLOCK, timestamp)
+
+
+def replay(indexer: TokenContextIndexer, start: int, stop: int, checkpointer: Checkpointer | None = None):
+    for i in range(start, stop):
+        indexer.apply(synthetic_event(i, TOKENS))
+        if i % EVENTS_PER_BLOCK == EVENTS_PER_BLOCK - 1:
+            (checkpointer or indexer).advance_to(i // EVENTS_PER_BLOCK)
+
+
+def test_indexer_cold_and_warm_start(tmp_path):
+    store = SnapshotStore(tmp_path)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    replay(indexer, 0, EVENTS - EVENTS // 100, Checkpointer(indexer, store, SNAPSHOT_INTERVAL // EVENTS_PER_BLOCK))
+
+    started = time.perf_counter()
+    cold = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    replay(cold, 0, EVENTS)
+    cold_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm = resume(store, PROTOCOL_FEE)
+    replay(warm, (warm.last_block + 1) * EVENTS_PER_BLOCK, EVENTS)
+    warm_time = time.perf_counter() - started
+
+    print(f"\n{EVENTS} events, snapshot at block {store.blocks()[-1]}")
+    print(f"cold start: {cold_time:.2f}s ({EVENTS / cold_time:,.0f} events/s)")
+    print(f"warm start: {warm_time:.3f}s ({cold_time / warm_time:,.1f}x faster)")
+
+    assert warm.contexts == cold.contexts
+    assert warm.unclaimed_rewards == cold.unclaimed_rewards
+    assert warm.protocol_fees_amount == cold.protocol_fees_amount
+    assert warm_time < cold_time
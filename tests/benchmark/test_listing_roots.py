@@ -0,0 +1,89 @@
+import os
+
+import boa
+from eth_account import Account
+
+from scripts.offchain.merkle import ListingTree, single_listing_roots
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, Permit, TokenContext, TokenContextAndListing
+
+from ..conftest_base import ZERO_ADDRESS, deploy_market
+
+BATCHES = [int(size) for size in os.environ.get("BENCH_LISTING_ROOTS", "1,2,4,8,16,32").split(",")]
+PRICE = int(1e18)
+
+
+def deploy_renting(nft_owner: str, admin: str, renter: str):
+    renting_contract, nft_contract, ape_contract, owner = deploy_market(admin)
+
+    token_ids = list(range(1, max(BATCHES) + 1))
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    for i in range(0, len(token_ids), 32):
+        renting_contract.deposit(token_ids[i : i + 32], ZERO_ADDRESS, sender=nft_owner)
+    ape_contract.mint(renter, 1000 * PRICE * len(token_ids), sender=owner)
+    ape_contract.approve(renting_contract, 1000 * PRICE * len(token_ids), sender=renter)
+    return renting_contract
+
+
+def calldata_gas(calldata: bytes) -> int:
+    return sum(4 if byte == 0 else 16 for byte in calldata)
+
+
+def call_gas(function, *args, sender: str) -> int:
+    # execution plus calldata gas, the state being rolled back afterwards
+    with boa.env.anchor():
+        function(*args, sender=sender)
+        return function.contract._computation.get_gas_used() + calldata_gas(function.prepare_calldata(*args))
+
+
+def test_listing_roots_vs_listing_signatures():
+    nft_owner, admin = Account.create(), Account.create()
+    renter = boa.env.generate_address("renter")
+    renting_contract = deploy_renting(nft_owner.address, admin.address, renter)
+    signer = ListingSigner(renting_contract.address, boa.eval("chain.id"))
+    now = boa.eval("block.timestamp")
+
+    print("\nstart_rentals gas per token, execution plus calldata")
+    print(f"{'tokens':>6} {'per listing':>12} {'batch admin':>12} {'root':>12}  signatures")
+    for size in BATCHES:
+        listings = [Listing(token_id, PRICE, 1, 0, now) for token_id in range(1, size + 1)]
+        contexts = [
+            TokenContextAndListing(TokenContext(listing.token_id, nft_owner.address), signed, 1)
+            for listing, signed in zip(listings, signer.sign_all(listings, nft_owner.key, admin.key, now), strict=True)
+        ]
+        per_listing_gas = call_gas(
+            renting_contract.start_rentals, [c.to_tuple() for c in contexts], ZERO_ADDRESS, now, sender=renter
+        )
+
+        # the owner signatures of each listing with a single admin signature
+        root_contexts, owner_signatures = single_listing_roots(contexts)
+        batch_admin_gas = call_gas(
+            renting_contract.start_rentals_from_roots,
+            [c.to_tuple() for c in root_contexts],
+            [s.to_tuple() for s in owner_signatures],
+            signer.sign_batch_admin(owner_signatures, admin.key, now).to_tuple(),
+            ZERO_ADDRESS,
+            now,
+            Permit().to_tuple(),
+            sender=renter,
+        )
+
+        tree = ListingTree(signer, listings)
+        owner_signature = tree.sign(nft_owner.key)
+        root_gas = call_gas(
+            renting_contract.start_rentals_from_roots,
+            [tree.token_context(i, c.token_context, 1).to_tuple() for i, c in enumerate(contexts)],
+            [owner_signature.to_tuple()],
+            signer.sign_batch_admin([owner_signature], admin.key, now).to_tuple(),
+            ZERO_ADDRESS,
+            now,
+            Permit().to_tuple(),
+            sender=renter,
+        )
+
+        print(
+            f"{size:>6} {per_listing_gas // size:>12,} {batch_admin_gas // size:>12,} {root_gas // size:>12,}"
+            f"  {2 * size} / {size + 1} / 2"
+        )
@@ -0,0 +1,87 @@
+import os
+
+import boa
+from eth_account import Account
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, TokenContext, TokenContextAndListing
+
+from ..conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, deploy_market, get_event_logs
+
+BATCHES = [int(size) for size in os.environ.get("BENCH_NATIVE_PAYMENTS", "1,8,32").split(",")]
+PRICE = int(1e18)
+TX_GAS = 21000
+
+
+def deploy_renting(nft_owner: str, admin: str, *, native: bool):
+    renting_contract, nft_contract, ape_contract, owner = deploy_market(admin, native=native)
+
+    token_ids = list(range(1, max(BATCHES) + 1))
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    return renting_contract, ape_contract
+
+
+def calldata_gas(calldata: bytes) -> int:
+    return sum(4 if byte == 0 else 16 for byte in calldata)
+
+
+def tx_gas(function, *args, **kwargs) -> int:
+    # intrinsic, calldata and execution gas of a transaction
+    function(*args, **kwargs)
+    return TX_GAS + function.contract._computation.get_gas_used() + calldata_gas(function.prepare_calldata(*args))
+
+
+def rental_gas(*, native: bool, size: int) -> dict[str, int]:
+    nft_owner, admin = Account.create(), Account.create()
+    renter = boa.env.generate_address("renter")
+    renting_contract, ape_contract = deploy_renting(nft_owner.address, admin.address, native=native)
+    signer = ListingSigner(renting_contract.address, boa.eval("chain.id"))
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 0))  # the deposits of `deploy_renting`
+    boa.env.set_balance(renter, 1000 * PRICE * size)
+    ape_contract.mint(renter, 1000 * PRICE * size, sender=ape_contract.minter())
+
+    def contexts(token_contexts, duration):
+        now = boa.eval("block.timestamp")
+        listings = [Listing(c.token_id, PRICE, 1, 0, now) for c in token_contexts]
+        signed = signer.sign_all(listings, nft_owner.key, admin.key, now)
+        return [TokenContextAndListing(c, s, duration).to_tuple() for c, s in zip(token_contexts, signed, strict=True)], now
+
+    gas = {}
+    with boa.env.anchor():
+        gas["approve"] = (
+            0 if native else tx_gas(ape_contract.approve, renting_contract.address, 1000 * PRICE * size, sender=renter)
+        )
+        batch, now = contexts([TokenContext(token_id, nft_owner.address) for token_id in range(1, size + 1)], 2)
+        value = 2 * PRICE * size if native else 0
+        gas["start"] = tx_gas(renting_contract.start_rentals, batch, ZERO_ADDRESS, now, value=value, sender=renter)
+        indexer.apply_all(get_event_logs(renting_contract, 1))
+
+        boa.env.time_travel(seconds=3600)
+        batch, now = contexts([indexer.token_context(token_id) for token_id in range(1, size + 1)], 3)
+        value = 2 * PRICE * size if native else 0
+        gas["extend"] = tx_gas(renting_contract.extend_rentals, batch, now, value=value, sender=renter)
+        indexer.apply_all(get_event_logs(renting_contract, 2))
+
+        boa.env.time_travel(seconds=3600)
+        token_contexts = [indexer.token_context(token_id).to_tuple() for token_id in range(1, size + 1)]
+        gas["close"] = tx_gas(renting_contract.close_rentals, token_contexts, sender=renter)
+        indexer.apply_all(get_event_logs(renting_contract, 3))
+
+        token_contexts = [indexer.token_context(token_id).to_tuple() for token_id in range(1, size + 1)]
+        gas["claim"] = tx_gas(renting_contract.claim, token_contexts, sender=nft_owner.address)
+    return gas
+
+
+def test_native_vs_erc20_payments():
+    print("\ngas per transaction, intrinsic plus calldata plus execution, erc20 / native")
+    print(f"{'tokens':>6} {'approve':>10} {'start':>20} {'extend':>20} {'close':>20} {'claim':>20}")
+    for size in BATCHES:
+        erc20, native = rental_gas(native=False, size=size), rental_gas(native=True, size=size)
+        columns = [f"{erc20[k]:>9,} / {native[k]:>8,}" for k in ("start", "extend", "close", "claim")]
+        print(f"{size:>6} {erc20['approve']:>10,} {' '.join(columns)}")
+        assert native["start"] < erc20["start"]
@@ -0,0 +1,57 @@
+import os
+import random
+import time
+
+from scripts.offchain.listings import OrderBook
+from scripts.offchain.structs import Listing, Signature, SignedListing
+
+LISTINGS = int(os.environ.get("BENCH_ORDER_BOOK_LISTINGS", "100000"))
+QUERIES = 1000
+SIGNATURE = Signature(27, 1, 1)
+DURATIONS = [(0, 0), (1, 0), (24, 0), (1, 24), (1, 168), (24, 720), (168, 0)]
+
+
+def test_order_book_queries():
+    rng = random.Random(0)
+    listings = [
+        SignedListing(Listing(token_id, rng.randrange(1, 10**6) * 10**12, *rng.choice(DURATIONS), 1), SIGNATURE, SIGNATURE)
+        for token_id in range(LISTINGS)
+    ]
+
+    book = OrderBook()
+    started = time.perf_counter()
+    book.put_all(listings)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(QUERIES):
+        top = book.cheapest(10, 24, now=0)
+    query = (time.perf_counter() - started) / QUERIES
+
+    expected = sorted(
+        (s.listing.price, s.listing.token_id)
+        for s in listings
+        if s.listing.min_duration <= 24 and (s.listing.max_duration == 0 or s.listing.max_duration >= 24)
+    )[:10]
+    assert [(s.listing.price, s.listing.token_id) for s in top] == expected
+
+    token_ids = rng.sample(range(LISTINGS), QUERIES)
+    started = time.perf_counter()
+    for token_id in token_ids:
+        book.revoke(token_id, 1)
+    revoke = (time.perf_counter() - started) / QUERIES
+
+    naive = []
+    for _ in range(10):
+        naive_started = time.perf_counter()
+        sorted(
+            (s.listing.price, s.listing.token_id)
+            for s in book.listings.values()
+            if s.listing.min_duration <= 24 and (s.listing.max_duration == 0 or s.listing.max_duration >= 24)
+        )[:10]
+        naive.append(time.perf_counter() - naive_started)
+
+    print(f"\norder book of {LISTINGS:,} listings in {len(DURATIONS)} duration groups, built in {build:.2f}s")
+    print(f"top 10 for 24h: {query * 1e6:,.1f} us per query, {sum(naive) / len(naive) * 1e6:,.1f} us with a full scan")
+    print(f"revocation: {revoke * 1e6:,.1f} us")
+    assert len(book) == LISTINGS - QUERIES
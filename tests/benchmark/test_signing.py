@@ -0,0 +1,42 @@
+import os
+import time
+
+from eth_account import Account
+
+from scripts.offchain.signing import ListingSigner, SigningPool
+from scripts.offchain.structs import Listing
+
+from ..conftest_base import Listing as ListingArgs
+from ..conftest_base import sign_listing
+
+LISTINGS = int(os.environ.get("BENCH_LISTINGS", "2000"))
+RENTING = "0x" + "12" * 20
+CHAIN_ID = 1
+PRICE = int(1e18)
+
+
+def rate(fn, count: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - started)
+
+
+def test_listing_signing_throughput():
+    owner_key = Account.create().key
+    admin_key = Account.create().key
+    listings = [Listing(token_id, PRICE, 1, 24, 1700000000) for token_id in range(LISTINGS)]
+    signer = ListingSigner(RENTING, CHAIN_ID)
+    sample = listings[: max(LISTINGS // 10, 1)]
+
+    typed_data = rate(
+        lambda: [sign_listing(ListingArgs(*listing.to_tuple()), owner_key, admin_key, 1, RENTING) for listing in sample],
+        len(sample),
+    )
+    direct = rate(lambda: signer.sign_all(listings, owner_key, admin_key, 1), LISTINGS)
+    with SigningPool() as pool:
+        pool.sign_all(signer, sample, owner_key, admin_key, 1)  # warm up the workers
+        pooled = rate(lambda: pool.sign_all(signer, listings, owner_key, admin_key, 1), LISTINGS)
+
+    print(f"\nsigned listings/s, owner and admin signatures, {os.cpu_count()} cpus")
+    print(f"{'typed data':<12} {typed_data:>10,.0f}\n{'direct':<12} {direct:>10,.0f}\n{'pool':<12} {pooled:>10,.0f}")
+    assert direct > typed_data
@@ -0,0 +1,58 @@
+import os
+import time
+
+import boa
+
+from ..conftest_base import ZERO_ADDRESS, deploy_market
+
+BATCHES = [int(size) for size in os.environ.get("BENCH_TOKEN_STATES", "1,32,256").split(",")]
+
+
+def deploy_renting():
+    renting_contract, nft_contract, _, owner = deploy_market()
+    nft_owner = boa.env.generate_address("nft_owner")
+
+    # half of the tokens deposited, the other half without a vault
+    token_ids = list(range(max(BATCHES)))
+    deposited = token_ids[::2]
+    for token_id in deposited:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    for i in range(0, len(deposited), 32):
+        renting_contract.deposit(deposited[i : i + 32], ZERO_ADDRESS, sender=nft_owner)
+    return renting_contract, token_ids
+
+
+def per_token_reads(renting_contract, token_ids) -> tuple[list, int, int]:
+    gas = 0
+    calls = 0
+    states = []
+    for token_id in token_ids:
+        state = renting_contract.rental_states(token_id)
+        gas += renting_contract._computation.get_gas_used()
+        revocation = renting_contract.listing_revocations(token_id)
+        gas += renting_contract._computation.get_gas_used()
+        vault = renting_contract.tokenid_to_vault(token_id)
+        gas += renting_contract._computation.get_gas_used()
+        calls += 4  # plus an eth_getCode for the vault
+        states.append((state, revocation, vault, len(boa.env.get_code(vault)) > 0))
+    return states, gas, calls
+
+
+def test_token_states_vs_per_token_reads():
+    renting_contract, token_ids = deploy_renting()
+
+    print(f"\n{'tokens':>6} {'calls':>12} {'gas':>18} {'ms':>16}  per token reads vs token_states")
+    for size in BATCHES:
+        batch = token_ids[:size]
+        started = time.perf_counter()
+        expected, per_token_gas, calls = per_token_reads(renting_contract, batch)
+        per_token_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        states = renting_contract.token_states(batch)
+        bulk_ms = (time.perf_counter() - started) * 1000
+        bulk_gas = renting_contract._computation.get_gas_used()
+
+        assert states == expected
+        print(f"{size:>6} {calls:>5} vs {1:>4} {per_token_gas:>8,} vs {bulk_gas:>7,} {per_token_ms:>7.1f} vs {bulk_ms:>6.1f}")
@@ -0,0 +1,39 @@
+import os
+import time
+
+from eth_account import Account
+
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.state import state_hash
+from scripts.offchain.structs import Listing, Rental, TokenContext, TokenContextAndListing, TokenState
+from scripts.offchain.validation import ListingValidator, ecrecover
+
+BATCH = int(os.environ.get("BENCH_VALIDATION_BATCH", "32"))
+RENTING = "0x" + "12" * 20
+PRICE = int(1e18)
+NOW = 1700000000
+
+
+def test_batch_validation_latency():
+    owner, admin = Account.create(), Account.create()
+    signer = ListingSigner(RENTING, 1)
+    validator = ListingValidator(signer, admin.address)
+    contexts = [
+        TokenContextAndListing(
+            TokenContext(token_id, owner.address),
+            signer.sign(Listing(token_id, PRICE, 1, 0, NOW), owner.key, admin.key, NOW),
+            2,
+        )
+        for token_id in range(BATCH)
+    ]
+    token_states = [TokenState(state_hash(token_id, owner.address, Rental()), 0, "", True) for token_id in range(BATCH)]
+
+    ecrecover.cache_clear()
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        verdicts = validator.validate_start(contexts, token_states, NOW, NOW + 10)
+        timings.append((time.perf_counter() - started) * 1e6 / BATCH)
+
+    print(f"\nbatch of {BATCH}, us per item: {timings[0]:,.1f} with ecrecover, {timings[1]:,.1f} with recovered signers")
+    assert verdicts == [None] * BATCH
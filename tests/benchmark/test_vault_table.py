@@ -0,0 +1,18 @@
+import time
+
+from scripts.offchain.vaults import init_code_hash, vault_table
+
+RENTING = "0x" + "12" * 20
+VAULT_IMPL = "0x" + "34" * 20
+TOKENS = 10000
+
+
+def test_vault_table_for_collection():
+    init_code_hash.cache_clear()
+    started = time.perf_counter()
+    table = vault_table(RENTING, VAULT_IMPL, range(TOKENS))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{TOKENS} vault addresses in {elapsed * 1000:.1f}ms")
+    assert len(set(table.values())) == TOKENS
+    assert elapsed < 1
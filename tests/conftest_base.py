@@ -1,22 +1,28 @@
 import contextlib
+import json
 from collections import namedtuple
 from dataclasses import dataclass, field
-from functools import cached_property
+from functools import cache, cached_property
 from textwrap import dedent
+from typing import NamedTuple
 
 import boa
 import vyper
+from boa.contracts.abi.abi_contract import ABIContract, ABIContractFactory
 from boa.contracts.event_decoder import RawLogEntry
 from boa.contracts.vyper.vyper_contract import VyperContract
 from eth.exceptions import Revert
 from eth_abi import encode
 from eth_account import Account
 from eth_account.messages import encode_intended_validator, encode_typed_data
-from eth_utils import encode_hex, keccak
+from eth_utils import encode_hex, keccak, to_checksum_address
 from web3 import Web3
 
+from scripts.offchain.structs import EventLog, RawLog
+
 ZERO_ADDRESS = boa.eval("empty(address)")
 ZERO_BYTES32 = boa.eval("empty(bytes32)")
+PROTOCOL_FEE = 500
 
 
 def get_last_event(contract: VyperContract, name: str | None = None):
@@ -36,6 +42,40 @@ def get_events(contract: VyperContract, name: str | None = None):
     ]
 
 
+def get_event_logs(contract: VyperContract, block_number: int, timestamp: int | None = None) -> list[EventLog]:
+    timestamp = boa.eval("block.timestamp") if timestamp is None else timestamp
+    events = [e for e in contract.get_logs(strict=False) if not isinstance(e, RawLogEntry) and e.address == contract.address]
+    return [
+        EventLog(
+            type(e).__name__,
+            {k: v for k, v in e._asdict().items() if k != "address"},
+            block_number,
+            log_index,
+            timestamp,
+            str(e.address),
+        )
+        for log_index, e in enumerate(events)
+    ]
+
+
+def get_raw_logs(contract: VyperContract, block_number: int, timestamp: int | None = None) -> list[RawLog]:
+    timestamp = boa.eval("block.timestamp") if timestamp is None else timestamp
+    entries = sorted(contract._computation.get_raw_log_entries())
+    return [
+        RawLog(
+            to_checksum_address(address),
+            tuple(topic.to_bytes(32, "big") for topic in topics),
+            data,
+            block_number,
+            log_index,
+            timestamp,
+        )
+        for log_index, (_, address, topics, data) in enumerate(
+            e for e in entries if e[1] == contract.address.canonical_address
+        )
+    ]
+
+
 class EventWrapper:
     def __init__(self, event: namedtuple):
         self.event = event
@@ -78,6 +118,89 @@ def get_vault_from_proxy(proxy_addr):
     return deployer.at(proxy_addr)
 
 
+class ArtifactDeployer:
+    """Deploys a contract from its compiled abi and bytecode, for reference revisions kept out of the sources"""
+
+    def __init__(self, artifact_path: str):
+        with open(artifact_path, encoding="utf-8") as f:
+            artifact = json.load(f)
+        constructor = next(item for item in artifact["abi"] if item["type"] == "constructor")
+        self.constructor_types = [arg["type"] for arg in constructor["inputs"]]
+        self.bytecode = bytes.fromhex(artifact["bytecode"].removeprefix("0x"))
+        self.factory = ABIContractFactory.from_abi_dict(artifact["abi"], name=artifact["contractName"])
+
+    def deploy(self, *args) -> ABIContract:
+        args = [getattr(arg, "address", arg) for arg in args]
+        address, _ = boa.env.deploy_code(bytecode=self.bytecode + encode(self.constructor_types, args))
+        return self.factory.at(address)
+
+
+@cache
+def load_partial(path: str):
+    return boa.load_partial(path)
+
+
+def deploy_renting(
+    contract_def,
+    vault,
+    payment_token,
+    nft,
+    delegation_registry,
+    protocol_wallet,
+    admin,
+    *,
+    renting721=None,
+    staking_pool=ZERO_ADDRESS,
+    protocol_fee: int = PROTOCOL_FEE,
+    max_protocol_fee: int | None = None,
+):
+    # `contract_def` is RentingV3's partial or the `ArtifactDeployer` of a reference revision, the max protocol fee
+    # defaults to the protocol fee and a new RentingERC721 is deployed unless one is given
+    if renting721 is None:
+        renting721 = load_partial("contracts/RentingERC721V3.vy").deploy("", "", "", "")
+    return contract_def.deploy(
+        vault,
+        payment_token,
+        nft,
+        delegation_registry,
+        renting721,
+        staking_pool,
+        protocol_fee if max_protocol_fee is None else max_protocol_fee,
+        protocol_fee,
+        protocol_wallet,
+        admin,
+    )
+
+
+class Market(NamedTuple):
+    """A renting contract deployed along with its own nft, payment token, delegation registry and vault"""
+
+    renting: VyperContract
+    nft: VyperContract
+    payment_token: VyperContract
+    owner: str
+
+
+def deploy_market(admin: str | None = None, *, contract_def=None, native: bool = False) -> Market:
+    # the owner deploys every contract and is the protocol wallet, and the admin too unless one is given
+    owner = boa.env.generate_address("owner")
+    with boa.env.prank(owner):
+        nft = load_partial("contracts/auxiliary/ERC721.vy").deploy()
+        payment_token = load_partial("contracts/auxiliary/ERC20.vy").deploy("APE", "APE", 18, 0)
+        delegation_registry = load_partial("contracts/auxiliary/HotWalletMock.vy").deploy()
+        vault = load_partial("contracts/VaultV3.vy").deploy(payment_token, nft, delegation_registry)
+        renting = deploy_renting(
+            contract_def or load_partial("contracts/RentingV3.vy"),
+            vault,
+            ZERO_ADDRESS if native else payment_token,
+            nft,
+            delegation_registry,
+            owner,
+            admin or owner,
+        )
+    return Market(renting, nft, payment_token, owner)
+
+
 @contextlib.contextmanager
 def deploy_reverts():
     try:
@@ -264,7 +387,8 @@ class TokenContextAndListing:
 
 
 def compute_state_hash(token_id: int, nft_owner: str, rental: Rental):
-    return boa.eval(
+    # the state commitment stored by RentingV3, the upper 192 bits of the state hash
+    digest = boa.eval(
         dedent(
             f"""keccak256(
             concat(
@@ -283,6 +407,7 @@ def compute_state_hash(token_id: int, nft_owner: str, rental: Rental):
             ))"""
         )
     )
+    return digest[:24] + bytes(8)
 
 
 def sign_listing(listing: Listing, owner_key: str, admin_key: str, timestamp: int, verifying_contract: str) -> SignedListing:
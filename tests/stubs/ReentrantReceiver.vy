@@ -0,0 +1,30 @@
+# @version 0.4.1
+
+# Wallet calling back into the payer once when it receives native currency, recording whether the call went through
+
+callback_target: address
+callback_data: Bytes[4096]
+payments: public(uint256)
+reentered: public(bool)
+
+
+@external
+def set_callback(target: address, data: Bytes[4096]):
+    self.callback_target = target
+    self.callback_data = data
+
+
+@external
+@payable
+def execute(target: address, data: Bytes[4096], amount: uint256):
+    raw_call(target, data, value=amount)
+
+
+@external
+@payable
+def __default__():
+    self.payments += 1
+    target: address = self.callback_target
+    if target != empty(address):
+        self.callback_target = empty(address)
+        self.reentered = raw_call(target, self.callback_data, revert_on_failure=False)
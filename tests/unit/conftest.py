@@ -5,6 +5,8 @@ import pytest
 from boa.vm.py_evm import register_raw_precompile
 from eth_account import Account
 
+from ..conftest_base import deploy_renting
+
 
 @pytest.fixture(scope="session")
 def accounts():
@@ -99,6 +101,39 @@ def renting_erc721_contract_def():
     return boa.load_partial("contracts/RentingERC721V3.vy")
 
 
+@pytest.fixture(scope="module")
+def vault_contract(vault_contract_def, ape_contract, nft_contract, delegation_registry_warm_contract):
+    return vault_contract_def.deploy(ape_contract, nft_contract, delegation_registry_warm_contract)
+
+
+@pytest.fixture(scope="module")
+def renting721_contract(renting_erc721_contract_def):
+    return renting_erc721_contract_def.deploy("", "", "", "")
+
+
+@pytest.fixture(scope="module")
+def renting_contract(
+    renting_contract_def,
+    vault_contract,
+    ape_contract,
+    nft_contract,
+    delegation_registry_warm_contract,
+    protocol_wallet,
+    owner,
+    renting721_contract,
+):
+    return deploy_renting(
+        renting_contract_def,
+        vault_contract,
+        ape_contract,
+        nft_contract,
+        delegation_registry_warm_contract,
+        protocol_wallet,
+        owner,
+        renting721=renting721_contract,
+    )
+
+
 @pytest.fixture(scope="module")
 def empty_contract_def():
     return boa.loads_partial(
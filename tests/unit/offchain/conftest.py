@@ -0,0 +1,62 @@
+import boa
+import pytest
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, get_event_logs
+
+PRICE = int(1e18)
+
+
+class ChainFollower:
+    # feeds the indexer the events of each new block and keeps them, so a test can compare against a full replay
+    def __init__(self, contract, indexer):
+        self.contract = contract
+        self.indexer = indexer
+        self.blocks = []
+
+    def __call__(self):
+        events = get_event_logs(self.contract, len(self.blocks) + 1)
+        self.indexer.apply_all(events)
+        self.indexer.advance_to(len(self.blocks) + 1)
+        self.blocks.append(events)
+
+    def reorg(self, block_number):
+        # the indexer must be a `JournaledIndexer`
+        del self.blocks[block_number:]
+        self.indexer.rollback_to(block_number)
+
+
+@pytest.fixture(autouse=True)
+def mint(renter, owner, ape_contract):
+    with boa.env.anchor():
+        ape_contract.mint(renter, int(1000 * 1e18), sender=owner)
+        yield
+
+
+@pytest.fixture
+def signer(renting_contract):
+    return ListingSigner(renting_contract.address, boa.eval("chain.id"))
+
+
+@pytest.fixture
+def indexer():
+    return TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+
+
+@pytest.fixture
+def follow(renting_contract, indexer):
+    return ChainFollower(renting_contract, indexer)
+
+
+@pytest.fixture
+def deposited(renting_contract, nft_contract, ape_contract, nft_owner, owner, renter):
+    # tokens 1 to 8 deposited and token 9 minted but not deposited
+    token_ids = list(range(1, 9))
+    for token_id in [*token_ids, 9]:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    ape_contract.approve(renting_contract, 1000 * PRICE, sender=renter)
+    return token_ids
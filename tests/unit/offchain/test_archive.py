@@ -0,0 +1,158 @@
+import os
+
+import boa
+import numpy as np
+import pytest
+
+from scripts.offchain.archive import (
+    BLOCK_INDEX_DTYPE,
+    EVENT_KINDS,
+    RECORD_DTYPE,
+    RENTAL_CLOSED,
+    RENTAL_EXTENDED,
+    RENTAL_STARTED,
+    TOKEN_INDEX_DTYPE,
+    ArchiveError,
+    ArchiveReader,
+    ArchiveWriter,
+)
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.structs import EventLog, RentalExtensionLog, RentalLog
+
+from ...conftest_base import ZERO_ADDRESS, Listing, TokenContextAndListing, get_event_logs, sign_listing
+
+PROTOCOL_FEE = 500
+PRICE = int(1e18)
+VAULT = "0x" + "ab" * 20
+OWNER = "0x" + "11" * 20
+
+
+def rental_event(block_number, log_index, token_ids, name="RentalStarted"):
+    rentals = [
+        (token_id.to_bytes(32, "big"), VAULT, OWNER, token_id, block_number, block_number, block_number + 10, PRICE, 500)
+        for token_id in token_ids
+    ]
+    args = {"renter": OWNER, "delegate": OWNER, "nft_contract": ZERO_ADDRESS, "rentals": rentals}
+    return EventLog(name, args, block_number, log_index, block_number)
+
+
+def test_archive_rental_logs(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key, tmp_path
+):
+    token_ids = [1, 2]
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    writer = ArchiveWriter(tmp_path / "rentals")
+    archived = []
+
+    def follow(block_number):
+        events = get_event_logs(renting_contract, block_number)
+        indexer.apply_all(events)
+        writer.append(events)
+        archived.extend(
+            (RentalExtensionLog if e.name == "RentalExtended" else RentalLog)(*log)
+            for e in events
+            if e.name in EVENT_KINDS
+            for log in e.args["rentals"]
+        )
+
+    def contexts(duration):
+        now = boa.eval("block.timestamp")
+        return [
+            TokenContextAndListing(
+                indexer.token_context(token_id),
+                sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+                duration,
+            ).to_tuple()
+            for token_id in token_ids
+        ]
+
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    follow(1)
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(contexts(2), ZERO_ADDRESS, boa.eval("block.timestamp"), sender=renter)
+    follow(2)
+    boa.env.time_travel(seconds=3600)
+    renting_contract.extend_rentals(contexts(3), boa.eval("block.timestamp"), sender=renter)
+    follow(3)
+    renting_contract.close_rentals([indexer.token_context(2).to_tuple()], sender=renter)
+    follow(4)
+
+    reader = ArchiveReader(tmp_path / "rentals")
+    assert len(reader) == 5
+    assert reader.logs() == archived
+    assert reader.records["kind"].tolist() == [RENTAL_STARTED] * 2 + [RENTAL_EXTENDED] * 2 + [RENTAL_CLOSED]
+    assert reader.logs(reader.token_records(2)) == [archived[1], archived[3], archived[4]]
+    assert reader.logs(reader.block_records(3, 3)) == archived[2:4]
+    assert reader.records.base is not None
+
+
+def test_archive_indexes(tmp_path):
+    with ArchiveWriter(tmp_path / "rentals") as writer:
+        writer.append([rental_event(10, 0, [1, 2]), rental_event(10, 3, [3])])
+        writer.append([rental_event(12, 1, [2], "RentalClosed"), rental_event(15, 0, [1, 3])])
+
+    reader = ArchiveReader(tmp_path / "rentals")
+
+    assert reader.records["token_id"].tolist() == [1, 2, 3, 2, 1, 3]
+    assert reader.token_records(2)["block_number"].tolist() == [10, 12]
+    assert reader.token_records(4).size == 0
+    assert reader.block_records(10, 10)["token_id"].tolist() == [1, 2, 3]
+    assert reader.block_records(11, 14)["token_id"].tolist() == [2]
+    assert reader.block_records(13, 14).size == 0
+    assert reader.block_records(12, 100)["block_number"].tolist() == [12, 15, 15]
+    assert reader.block_records(16, 20).size == 0
+
+
+def test_archive_rejects_out_of_order_records(tmp_path):
+    with ArchiveWriter(tmp_path / "rentals") as writer:
+        writer.append([rental_event(10, 1, [1])])
+        with pytest.raises(ArchiveError):
+            writer.append([rental_event(10, 0, [2])])
+        with pytest.raises(ArchiveError):
+            writer.append([rental_event(12, 0, [2]), rental_event(11, 0, [3])])
+        assert writer.count == 1
+
+
+def test_readers_see_committed_records_only(tmp_path):
+    writer = ArchiveWriter(tmp_path / "rentals")
+    writer.append([rental_event(10, 0, [1])])
+    reader = ArchiveReader(tmp_path / "rentals")
+    records = reader.records
+
+    writer.append([rental_event(11, 0, [2]), rental_event(12, 0, [1])])
+    assert len(reader) == 1
+    assert reader.refresh() == 3
+    assert reader.token_records(1)["block_number"].tolist() == [10, 12]
+    assert records["token_id"].tolist() == [1]
+    writer.close()
+
+
+def test_archive_recovers_from_interrupted_append(tmp_path):
+    with ArchiveWriter(tmp_path / "rentals") as writer:
+        writer.append([rental_event(10, 0, [1, 2])])
+        data_path, tokens_path, blocks_path = writer.data_path, writer.tokens_path, writer.blocks_path
+
+    # a crash after writing the records and sidecar entries but before committing them
+    uncommitted = (
+        (data_path, os.urandom(RECORD_DTYPE.itemsize - 7)),
+        (tokens_path, np.array([(9, 2)], dtype=TOKEN_INDEX_DTYPE).tobytes()),
+        (blocks_path, np.array([(11, 2)], dtype=BLOCK_INDEX_DTYPE).tobytes()),
+    )
+    for path, data in uncommitted:
+        with open(path, "ab") as f:
+            f.write(data)
+
+    assert len(ArchiveReader(tmp_path / "rentals")) == 2
+
+    with ArchiveWriter(tmp_path / "rentals") as writer:
+        assert writer.count == 2
+        writer.append([rental_event(11, 0, [1])])
+
+    reader = ArchiveReader(tmp_path / "rentals")
+    assert reader.records["block_number"].tolist() == [10, 10, 11]
+    assert reader.token_records(1)["block_number"].tolist() == [10, 11]
+    assert reader.block_records(11, 11)["token_id"].tolist() == [1]
@@ -0,0 +1,118 @@
+import boa
+import numpy as np
+import pytest
+
+from scripts.offchain.columnar import ColumnarStore
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.structs import Rental, TokenContext
+
+from ...conftest_base import ZERO_ADDRESS, Listing, TokenContextAndListing, get_event_logs, sign_listing
+
+PROTOCOL_FEE = 500
+PRICE = int(1e18)
+OWNER = "0x" + "11" * 19 + "00"
+RENTER = "0x" + "22" * 20
+
+
+def context(token_id, expiration=0, renter=RENTER, amount=PRICE):
+    if not expiration:
+        return TokenContext(token_id, OWNER)
+    rental = Rental(
+        token_id.to_bytes(32, "big"), OWNER, renter, renter, token_id, expiration - 10, expiration - 5, expiration, amount, 500
+    )
+    return TokenContext(token_id, OWNER, rental)
+
+
+def test_store_round_trip():
+    contexts = [context(1), context(2, 1000), context(3, 2000, amount=2**200), context(2**64 - 1, 3000)]
+    store = ColumnarStore(capacity=1)
+    store.update(contexts)
+
+    assert len(store) == 4
+    assert store.capacity == 4
+    for c in contexts:
+        assert store.get(c.token_id) == c
+        assert store.to_tuple(c.token_id) == c.to_tuple()
+    assert store.get(4) is None
+
+
+def test_store_rejects_oversized_values():
+    with pytest.raises(ValueError, match="uint64"):
+        ColumnarStore().set(context(2**64))
+
+
+def test_store_remove_keeps_rows_packed():
+    store = ColumnarStore()
+    store.update(context(token_id, 1000 * token_id) for token_id in range(1, 6))
+
+    store.remove(2)
+    store.set(context(3))
+    store.remove(5)
+
+    assert len(store) == 3
+    assert 2 not in store
+    assert sorted(store.token_ids().tolist()) == [1, 3, 4]
+    assert store.get(3) == context(3)
+    assert store.get(4) == context(4, 4000)
+
+
+def test_store_queries():
+    other_renter = "0x" + "33" * 20
+    store = ColumnarStore()
+    store.update(
+        [
+            context(1),
+            context(2, 1000),
+            context(3, 2000, amount=0),
+            context(4, 3000, renter=other_renter),
+            context(5, 4000),
+        ]
+    )
+
+    assert store.token_ids(store.expired(2500)).tolist() == [2, 3]
+    assert store.token_ids(store.active(2500)).tolist() == [4, 5]
+    assert store.token_ids(store.expired(2500) & store.unclaimed()).tolist() == [2]
+    assert store.token_ids(store.rented_by(other_renter)).tolist() == [4]
+    assert store.token_ids(store.owned_by(OWNER)).tolist() == [1, 2, 3, 4, 5]
+    assert store.token_ids(store.owned_by(RENTER)).tolist() == []
+    assert isinstance(store.expired(0), np.ndarray)
+
+
+def test_exported_contexts_are_accepted_by_renting(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key
+):
+    token_ids = [1, 2, 3]
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+
+    now = boa.eval("block.timestamp")
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(
+        [
+            TokenContextAndListing(
+                indexer.token_context(token_id),
+                sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+                token_id,
+            ).to_tuple()
+            for token_id in token_ids
+        ],
+        ZERO_ADDRESS,
+        now,
+        sender=renter,
+    )
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+
+    store = ColumnarStore()
+    store.update(indexer.contexts.values())
+    assert [store.get(token_id) for token_id in token_ids] == [indexer.token_context(token_id) for token_id in token_ids]
+
+    boa.env.time_travel(seconds=2 * 3600 + 1)
+    expired = store.token_ids(store.expired(boa.eval("block.timestamp"))).tolist()
+    assert expired == [1, 2]
+
+    renting_contract.claim([store.to_tuple(token_id) for token_id in expired], sender=nft_owner)
+    renting_contract.close_rentals([store.to_tuple(3)], sender=renter)
@@ -0,0 +1,29 @@
+import pytest
+
+from scripts.offchain.compact import encode_compact
+from scripts.offchain.structs import Listing, Rental, Signature, SignedListing, TokenContext, TokenContextAndListing
+
+from ...conftest_base import ZERO_ADDRESS
+
+PRICE = int(1e18)
+
+
+def test_encode_compact_checks_ranges():
+    signature = Signature(27, 1, 2)
+
+    def context(listing, rental=None, duration=1):
+        return TokenContextAndListing(
+            TokenContext(1, ZERO_ADDRESS, rental or Rental()), SignedListing(listing, signature, signature), duration
+        )
+
+    token_contexts, _ = encode_compact([context(Listing(1, 2**96 - 1, 2**32 - 1, 0, 2**40 - 1), duration=2**32 - 1)])
+    assert token_contexts[0][3:] == ((1, 2), (1, 2))
+
+    with pytest.raises(ValueError, match="price"):
+        encode_compact([context(Listing(1, 2**96))])
+    with pytest.raises(ValueError, match="timestamp"):
+        encode_compact([context(Listing(1, PRICE, 0, 0, 2**40))])
+    with pytest.raises(ValueError, match="listing of token 2"):
+        encode_compact([context(Listing(2, PRICE))])
+    with pytest.raises(ValueError, match="rental of token 2"):
+        encode_compact([context(Listing(1, PRICE), Rental(token_id=2, amount=1))])
@@ -0,0 +1,139 @@
+import asyncio
+
+import boa
+import pytest
+
+from scripts.offchain.cosigning import CoSigner, Histogram
+from scripts.offchain.merkle import ListingTree
+from scripts.offchain.signing import signature_hash
+from scripts.offchain.structs import Listing, Permit, TokenContext
+
+from ...conftest_base import ZERO_ADDRESS, RentalLog, get_last_event
+
+PRICE = int(1e18)
+
+
+class Clock:
+    def __init__(self, now: int):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cosigner_batches_and_reuses_signatures(renting_contract, signer, nft_owner, nft_owner_key, owner_key):
+    clock = Clock(boa.eval("block.timestamp"))
+    listings = [Listing(token_id, PRICE, 0, 0, clock.now) for token_id in range(1, 6)]
+    owner_signatures = [signer.sign_owner(listing, nft_owner_key) for listing in listings]
+
+    async def run():
+        async with CoSigner(signer, owner_key, bucket=30, min_validity=60, clock=clock) as cosigner:
+            first = await asyncio.gather(
+                *(cosigner.cosign_listing(listing, s, nft_owner) for listing, s in zip(listings, owner_signatures))
+            )
+            repeated = await asyncio.gather(
+                *(cosigner.cosign(listing, s, nft_owner) for listing, s in zip(listings * 3, owner_signatures * 3))
+            )
+            clock.now += 30
+            rotated = await cosigner.cosign(listings[0], owner_signatures[0], nft_owner)
+            return cosigner, first, repeated, rotated
+
+    cosigner, first, repeated, rotated = asyncio.run(run())
+
+    timestamp = clock.now - 30 - (clock.now - 30) % 30
+    assert {t for _, t in first} == {timestamp}
+    for signed, _ in first:
+        assert renting_contract.internal._is_signed_by_admin(
+            signature_hash(signed.owner_signature), signed.admin_signature.to_tuple(), timestamp
+        )
+    assert repeated == [(signed.admin_signature, timestamp) for signed, _ in first] * 3
+
+    assert rotated[1] == timestamp + 30
+    assert rotated[0] == signer.sign_admin(owner_signatures[0], owner_key, timestamp + 30)
+
+    metrics = cosigner.metrics()
+    assert (metrics["cache_hits"], metrics["cache_misses"]) == (15, 6)
+    assert metrics["batch_size"]["count"] == 2
+    assert metrics["batch_size"]["buckets"][8] == 2
+    assert metrics["request_latency"]["count"] == 21
+
+
+def test_cosigner_coalesces_concurrent_requests(signer, nft_owner, nft_owner_key, owner_key):
+    listing = Listing(1, PRICE)
+    owner_signature = signer.sign_owner(listing, nft_owner_key)
+
+    async def run():
+        async with CoSigner(signer, owner_key, clock=Clock(1000)) as cosigner:
+            results = await asyncio.gather(*(cosigner.cosign(listing, owner_signature, nft_owner) for _ in range(10)))
+            return cosigner, results
+
+    cosigner, results = asyncio.run(run())
+
+    assert len(set(results)) == 1
+    assert (cosigner.cache_misses, cosigner.cache_hits) == (1, 9)
+    assert cosigner.batch_sizes.count == 1
+
+
+def test_cosigner_refuses_listings_not_signed_by_owner(signer, nft_owner, nft_owner_key, renter, owner_key):
+    listing = Listing(1, PRICE)
+    owner_signature = signer.sign_owner(listing, nft_owner_key)
+
+    async def run():
+        async with CoSigner(signer, owner_key, clock=Clock(1000)) as cosigner:
+            with pytest.raises(ValueError, match="invalid owner signature"):
+                await cosigner.cosign(listing, owner_signature, renter)
+            with pytest.raises(ValueError, match="invalid owner signature"):
+                await cosigner.cosign_listing(Listing(1, PRICE + 1), owner_signature, nft_owner)
+            return cosigner
+
+    # the owner signatures are recovered in the signing batches, off the event loop
+    cosigner = asyncio.run(run())
+    assert (cosigner.cache_misses, cosigner.batch_sizes.count) == (2, 2)
+    assert cosigner._cache == {}
+
+
+def test_cosigner_signs_root_batches(renting_contract, deposited, signer, nft_owner, nft_owner_key, owner_key, renter):
+    clock = Clock(boa.eval("block.timestamp"))
+    tree = ListingTree(signer, [Listing(token_id, PRICE, 0, 0, clock.now) for token_id in (1, 2, 3)])
+    single = Listing(4, PRICE, 0, 0, clock.now)
+    owner_signatures = [tree.sign(nft_owner_key), signer.sign_owner(single, nft_owner_key)]
+
+    async def run():
+        async with CoSigner(signer, owner_key, clock=clock) as cosigner:
+            roots = [(tree.root, owner_signatures[0], nft_owner), (single, owner_signatures[1], nft_owner)]
+            with pytest.raises(ValueError, match="invalid owner signature"):
+                await cosigner.cosign_roots([*roots, (Listing(5, PRICE, 0, 0, clock.now), owner_signatures[1], nft_owner)])
+            return await cosigner.cosign_roots(roots)
+
+    admin_signature, timestamp = asyncio.run(run())
+
+    contexts = [tree.token_context(i, TokenContext(token_id, nft_owner), 1, 0) for i, token_id in enumerate((1, 2, 3))]
+    contexts.append(ListingTree(signer, [single]).token_context(0, TokenContext(4, nft_owner), 1, 1))
+    renting_contract.start_rentals_from_roots(
+        [c.to_tuple() for c in contexts],
+        [s.to_tuple() for s in owner_signatures],
+        admin_signature.to_tuple(),
+        ZERO_ADDRESS,
+        timestamp,
+        Permit().to_tuple(),
+        sender=renter,
+    )
+    rentals = get_last_event(renting_contract, "RentalStarted").rentals
+    assert [RentalLog(*rental).token_id for rental in rentals] == [1, 2, 3, 4]
+
+
+def test_cosigner_rejects_buckets_without_enough_validity(signer, owner_key):
+    with pytest.raises(ValueError, match="validity"):
+        CoSigner(signer, owner_key, bucket=90, min_validity=60)
+
+
+def test_histogram():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for value in [0.0005, 0.002, 0.003, 0.05, 2]:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.2) == 0.001
+    assert histogram.quantile(0.5) == 0.01
+    assert histogram.quantile(1) == float("inf")
+    assert histogram.snapshot()["buckets"] == {0.001: 1, 0.01: 3, 0.1: 4, float("inf"): 5}
+    assert Histogram().quantile(0.5) == 0.0
@@ -0,0 +1,125 @@
+import boa
+import numpy as np
+import pytest
+from eth_abi import encode
+from eth_utils import keccak
+
+from scripts.offchain.archive import to_record
+from scripts.offchain.decoders import DecoderPool, EventDecoder, LogDecoder
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.structs import RawLog, RentalExtensionLog, RentalLog
+
+from ...conftest_base import ZERO_ADDRESS, Listing, TokenContextAndListing, get_event_logs, get_raw_logs, sign_listing
+
+PROTOCOL_FEE = 500
+PRICE = int(1e18)
+
+
+@pytest.fixture
+def history(renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key):
+    # raw and boa decoded logs for a history touching most of the RentingV3 events
+    token_ids = [1, 2, 3]
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    raw_logs, event_logs = [], []
+
+    def follow():
+        block_number = len(raw_logs) + 1
+        events = get_event_logs(renting_contract, block_number)
+        indexer.apply_all(events)
+        event_logs.extend(events)
+        raw_logs.extend(get_raw_logs(renting_contract, block_number))
+
+    def contexts(duration):
+        now = boa.eval("block.timestamp")
+        return [
+            TokenContextAndListing(
+                indexer.token_context(token_id),
+                sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+                duration,
+            ).to_tuple()
+            for token_id in token_ids
+        ]
+
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    follow()
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(contexts(2), ZERO_ADDRESS, boa.eval("block.timestamp"), sender=renter)
+    follow()
+    boa.env.time_travel(seconds=3600)
+    renting_contract.extend_rentals(contexts(3), boa.eval("block.timestamp"), sender=renter)
+    follow()
+    renting_contract.renter_delegate_to_wallet([indexer.token_context(1).to_tuple()], renter, sender=renter)
+    follow()
+    renting_contract.close_rentals([indexer.token_context(2).to_tuple()], sender=renter)
+    follow()
+    renting_contract.revoke_listing([indexer.token_context(3).to_tuple()], sender=nft_owner)
+    follow()
+    renting_contract.set_protocol_fee(100, sender=owner)
+    follow()
+    boa.env.time_travel(seconds=4 * 3600)
+    renting_contract.claim([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    follow()
+    renting_contract.withdraw([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    follow()
+    return raw_logs, event_logs
+
+
+def test_decode_matches_boa(renting_contract, history):
+    raw_logs, event_logs = history
+    decoder = LogDecoder(renting_contract.abi)
+
+    assert len(raw_logs) == len(event_logs)
+    assert decoder.decode_all(raw_logs) == event_logs
+
+
+def test_rental_records(renting_contract, history):
+    raw_logs, event_logs = history
+    decoder = LogDecoder(renting_contract.abi)
+
+    expected = [
+        to_record(event, item, (RentalExtensionLog if event.name == "RentalExtended" else RentalLog)(*log))
+        for event in event_logs
+        if event.name in {"RentalStarted", "RentalClosed", "RentalExtended"}
+        for item, log in enumerate(event.args["rentals"])
+    ]
+    records = decoder.rental_records(raw_logs)
+
+    assert len(records) == 7
+    assert records.tobytes() == np.array(expected).tobytes()
+
+
+def test_decoder_pool(renting_contract, history):
+    raw_logs, event_logs = history
+    decoder = LogDecoder(renting_contract.abi)
+
+    with DecoderPool(renting_contract.abi, workers=2, chunk_size=3) as pool:
+        assert pool.decode_all(raw_logs) == event_logs
+        assert pool.rental_records(raw_logs).tobytes() == decoder.rental_records(raw_logs).tobytes()
+
+
+def test_decoder_falls_back_to_generic_decoding():
+    event_abi = {
+        "name": "Named",
+        "type": "event",
+        "inputs": [
+            {"name": "owner", "type": "address", "indexed": True},
+            {"name": "name", "type": "string", "indexed": False},
+            {"name": "amount", "type": "uint256", "indexed": False},
+        ],
+    }
+    owner = "0x" + "ab" * 20
+    decoder = EventDecoder(event_abi)
+    log = RawLog(
+        ZERO_ADDRESS,
+        (keccak(text="Named(address,string,uint256)"), encode(["address"], [owner])),
+        encode(["string", "uint256"], ["koda", 7]),
+        1,
+        0,
+    )
+
+    assert decoder.topic == log.topics[0]
+    assert decoder.decode_args(log) == {"owner": owner, "name": "koda", "amount": 7}
+    assert LogDecoder([event_abi]).decode(RawLog(ZERO_ADDRESS, (keccak(text="Other()"),), b"", 1, 0)) is None
@@ -0,0 +1,261 @@
+from copy import deepcopy
+from itertools import starmap
+
+import boa
+import pytest
+
+from scripts.offchain.indexer import IndexerError
+from scripts.offchain.structs import EventLog, TokenContext, TokenState
+
+from ...conftest_base import (
+    PROTOCOL_FEE,
+    ZERO_ADDRESS,
+    Listing,
+    TokenContextAndListing,
+    sign_listing,
+)
+
+PRICE = int(1e18)
+
+
+def assert_in_sync(renting_contract, indexer, token_ids, wallets=()):
+    assert indexer.verify(renting_contract.rental_states, token_ids) == []
+    for wallet in wallets:
+        assert indexer.unclaimed_rewards.get(wallet, 0) == renting_contract.unclaimed_rewards(wallet)
+    assert indexer.protocol_fees_amount == renting_contract.protocol_fees_amount()
+
+
+def deposit(renting_contract, nft_contract, nft_owner, owner, token_ids):
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+
+
+def rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, duration):
+    now = boa.eval("block.timestamp")
+    return [
+        TokenContextAndListing(
+            indexer.token_context(token_id),
+            sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+            duration,
+        ).to_tuple()
+        for token_id in token_ids
+    ]
+
+
+def test_indexer_tracks_deposits(renting_contract, nft_contract, nft_owner, owner, indexer, follow):
+    token_ids = [1, 2, 3]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    for token_id in token_ids:
+        assert indexer.token_context(token_id) == TokenContext(token_id, nft_owner)
+    assert_in_sync(renting_contract, indexer, token_ids)
+
+
+def test_indexer_tracks_rental_lifecycle(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key, indexer, follow
+):
+    token_ids = [1, 2, 3, 4]
+    wallets = [nft_owner, renter]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(
+        rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, 10),
+        ZERO_ADDRESS,
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+    boa.env.time_travel(seconds=3600)
+    renting_contract.extend_rentals(
+        rental_contexts(renting_contract, indexer, token_ids[:2], nft_owner_key, owner_key, 5),
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+    delegate = boa.env.generate_address("delegate")
+    renting_contract.renter_delegate_to_wallet([indexer.token_context(1).to_tuple()], delegate, sender=renter)
+    follow()
+    assert indexer.token_context(1).active_rental.delegate == delegate
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+    boa.env.time_travel(seconds=3600)
+    renting_contract.close_rentals([indexer.token_context(token_id).to_tuple() for token_id in token_ids[1:3]], sender=renter)
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+    boa.env.time_travel(seconds=10 * 3600)
+    renting_contract.claim([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+    renting_contract.withdraw([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    follow()
+    assert indexer.contexts == {}
+    assert all(indexer.listing_revocations[token_id] == boa.eval("block.timestamp") for token_id in token_ids)
+    assert_in_sync(renting_contract, indexer, token_ids, wallets)
+
+
+def test_indexer_consolidates_expired_rentals(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key, indexer, follow
+):
+    token_ids = [1, 2]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(
+        rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, 1),
+        ZERO_ADDRESS,
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+
+    boa.env.time_travel(seconds=2 * 3600)
+    renting_contract.start_rentals(
+        rental_contexts(renting_contract, indexer, token_ids[:1], nft_owner_key, owner_key, 1),
+        renter,
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, [nft_owner])
+
+    renting_contract.withdraw([indexer.token_context(2).to_tuple()], sender=nft_owner)
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids, [nft_owner])
+
+
+def test_indexer_uses_current_protocol_fee_on_extension(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key, indexer, follow
+):
+    token_ids = [1]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(
+        rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, 2),
+        ZERO_ADDRESS,
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+
+    renting_contract.set_protocol_fee(100, sender=owner)
+    follow()
+
+    renting_contract.extend_rentals(
+        rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, 3),
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+    assert indexer.token_context(1).active_rental.protocol_fee == 100
+    assert_in_sync(renting_contract, indexer, token_ids, [nft_owner])
+
+
+def test_indexer_tracks_token_ownership(
+    renting_contract, renting721_contract, nft_contract, nft_owner, owner, indexer, follow
+):
+    token_ids = [1, 2]
+    new_owner = boa.env.generate_address("new_owner")
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    renting_contract.mint([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    follow()
+    for token_id in token_ids:
+        renting721_contract.transferFrom(nft_owner, new_owner, token_id, sender=nft_owner)
+
+    renting_contract.claim_token_ownership(
+        [indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=new_owner
+    )
+    follow()
+
+    assert all(indexer.token_context(token_id).nft_owner == new_owner for token_id in token_ids)
+    assert_in_sync(renting_contract, indexer, token_ids)
+
+
+def test_indexer_tracks_fees_claimed(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key, indexer, follow
+):
+    token_ids = [1]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    renting_contract.start_rentals(
+        rental_contexts(renting_contract, indexer, token_ids, nft_owner_key, owner_key, 2),
+        ZERO_ADDRESS,
+        boa.eval("block.timestamp"),
+        sender=renter,
+    )
+    follow()
+
+    boa.env.time_travel(seconds=3600)
+    renting_contract.close_rentals([indexer.token_context(1).to_tuple()], sender=renter)
+    follow()
+    assert indexer.protocol_fees_amount > 0
+
+    renting_contract.claim_fees(sender=owner)
+    follow()
+    assert_in_sync(renting_contract, indexer, token_ids)
+
+
+def test_verify_reports_stale_contexts(renting_contract, nft_contract, nft_owner, owner, indexer, follow):
+    token_ids = [1, 2]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    follow()
+
+    renting_contract.withdraw([TokenContext(2, nft_owner).to_tuple()], sender=nft_owner)
+
+    assert indexer.verify(renting_contract.rental_states, token_ids) == [2]
+    with pytest.raises(IndexerError):
+        indexer.valid_contexts(renting_contract.rental_states, token_ids)
+    assert indexer.valid_contexts(renting_contract.rental_states, [1]) == [TokenContext(1, nft_owner)]
+
+
+def test_verify_states_checks_revocations(renting_contract, nft_contract, nft_owner, owner, indexer, follow):
+    token_ids = [1, 2, 3]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids[:2])
+    follow()
+
+    def token_states():
+        return starmap(TokenState, renting_contract.token_states(token_ids))
+
+    stale = deepcopy(indexer)
+    assert indexer.verify_states(token_ids, token_states()) == []
+
+    renting_contract.revoke_listing([TokenContext(1, nft_owner).to_tuple()], sender=nft_owner)
+    follow()
+    assert indexer.verify_states(token_ids, token_states()) == []
+    assert stale.verify_states(token_ids, token_states()) == [1]
+
+    renting_contract.withdraw([TokenContext(2, nft_owner).to_tuple()], sender=nft_owner)
+    follow()
+    assert indexer.verify_states(token_ids, token_states()) == []
+    assert stale.verify_states(token_ids, token_states()) == [1, 2]
+
+
+def test_apply_rejects_past_blocks(indexer):
+    indexer.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 1, "token_ids": [1]}, 10, 0, 1))
+    with pytest.raises(IndexerError):
+        indexer.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 1, "token_ids": [1]}, 9, 0, 1))
+
+
+def test_apply_rejects_rentals_of_unknown_tokens(indexer, nft_owner, renter):
+    rental = (b"\x01" * 32, ZERO_ADDRESS, nft_owner, 1, 1, 1, 3601, PRICE, PROTOCOL_FEE)
+    args = {"renter": renter, "delegate": renter, "nft_contract": ZERO_ADDRESS, "rentals": [rental]}
+    with pytest.raises(IndexerError, match="token 1 is not deposited"):
+        indexer.apply(EventLog("RentalStarted", args, 10, 0, 1))
+    assert indexer.token_context(1) is None
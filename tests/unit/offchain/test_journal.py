@@ -0,0 +1,127 @@
+import boa
+import pytest
+
+from scripts.offchain.indexer import IndexerError, TokenContextIndexer
+from scripts.offchain.journal import JournaledIndexer
+from scripts.offchain.structs import EventLog
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, Listing, TokenContextAndListing, sign_listing
+
+PRICE = int(1e18)
+
+
+@pytest.fixture
+def indexer():
+    # a shallow journal, so the tests reach its depth
+    return JournaledIndexer(protocol_fee=PROTOCOL_FEE, max_depth=4)
+
+
+@pytest.fixture
+def token_ids(renting_contract, nft_contract, ape_contract, nft_owner, renter, owner, follow):
+    token_ids = [1, 2, 3]
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    follow()
+    return token_ids
+
+
+def start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter, duration):
+    now = boa.eval("block.timestamp")
+    renting_contract.start_rentals(
+        [
+            TokenContextAndListing(
+                indexer.token_context(token_id),
+                sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+                duration,
+            ).to_tuple()
+            for token_id in token_ids
+        ],
+        ZERO_ADDRESS,
+        now,
+        sender=renter,
+    )
+
+
+def assert_matches_replay(renting_contract, indexer, follow, token_ids, wallets):
+    replayed = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    for events in follow.blocks:
+        replayed.apply_all(events)
+
+    assert indexer.contexts == replayed.contexts
+    assert indexer.unclaimed_rewards == replayed.unclaimed_rewards
+    assert indexer.listing_revocations == replayed.listing_revocations
+    assert indexer.verify(renting_contract.rental_states, token_ids) == []
+    for wallet in wallets:
+        assert indexer.unclaimed_rewards.get(wallet, 0) == renting_contract.unclaimed_rewards(wallet)
+    assert indexer.protocol_fees_amount == renting_contract.protocol_fees_amount()
+
+
+def test_rollback_dropped_rentals(renting_contract, nft_owner, nft_owner_key, renter, owner_key, indexer, follow, token_ids):
+    with boa.env.anchor():
+        start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter, 2)
+        follow()
+        boa.env.time_travel(seconds=3600)
+        renting_contract.close_rentals([indexer.token_context(1).to_tuple()], sender=renter)
+        follow()
+
+    assert indexer.verify(renting_contract.rental_states, token_ids) == [2, 3]
+
+    follow.reorg(1)
+    start_rentals(renting_contract, indexer, token_ids[1:], nft_owner_key, owner_key, renter, 1)
+    follow()
+    assert_matches_replay(renting_contract, indexer, follow, token_ids, [nft_owner, renter])
+
+
+def test_rollback_withdrawals_and_claims(
+    renting_contract, nft_owner, nft_owner_key, renter, owner, owner_key, indexer, follow, token_ids
+):
+    start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter, 1)
+    follow()
+    boa.env.time_travel(seconds=2 * 3600)
+
+    with boa.env.anchor():
+        renting_contract.claim([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+        follow()
+        renting_contract.withdraw([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+        follow()
+        renting_contract.set_protocol_fee(100, sender=owner)
+        follow()
+        assert indexer.contexts == {}
+
+    follow.reorg(2)
+    assert indexer.listing_revocations == {}
+    assert indexer.protocol_fee == PROTOCOL_FEE
+
+    renting_contract.withdraw([indexer.token_context(1).to_tuple()], sender=nft_owner)
+    follow()
+    assert_matches_replay(renting_contract, indexer, follow, token_ids, [nft_owner])
+
+
+def test_rollback_partially_applied_block(indexer):
+    indexer.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 1, "token_ids": [1]}, 1, 0, 1))
+    indexer.advance_to(1)
+    indexer.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 2, "token_ids": [1, 2]}, 2, 0, 2))
+
+    indexer.rollback_to(1)
+
+    assert indexer.listing_revocations == {1: 1}
+    indexer.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 3, "token_ids": [2]}, 2, 0, 3))
+    assert indexer.listing_revocations == {1: 1, 2: 3}
+
+
+def test_rollback_is_bounded(indexer):
+    for block_number in range(1, 11):
+        args = {"owner": ZERO_ADDRESS, "timestamp": block_number, "token_ids": [block_number]}
+        indexer.apply(EventLog("ListingsRevoked", args, block_number, 0, block_number))
+        indexer.advance_to(block_number)
+
+    assert len(indexer._journal) == indexer.max_depth
+    with pytest.raises(IndexerError):
+        indexer.rollback_to(5)
+
+    indexer.rollback_to(6)
+    assert indexer.listing_revocations == {token_id: token_id for token_id in range(1, 7)}
+    assert indexer.last_block == 6
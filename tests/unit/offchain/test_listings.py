@@ -0,0 +1,165 @@
+import boa
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.listings import ListingCache, OrderBook
+from scripts.offchain.structs import EventLog, Listing, Signature, SignedListing, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, get_event_logs
+
+PRICE = int(1e18)
+SIGNATURE = Signature(27, 1, 1)
+
+
+def test_cache_follows_revocations(
+    renting_contract, nft_contract, ape_contract, signer, nft_owner, nft_owner_key, owner, owner_key, renter
+):
+    token_ids = [1, 2, 3, 4]
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    cache = OrderBook()
+    events = get_event_logs(renting_contract, 1)
+    indexer.apply_all(events)
+    cache.apply_all(events)
+
+    boa.env.time_travel(seconds=10)
+    now = boa.eval("block.timestamp")
+    listings = [Listing(token_id, PRICE, 0, 0, now) for token_id in token_ids]
+    assert cache.put_all(signer.sign_all(listings, nft_owner_key, owner_key, now)) == 4
+
+    renting_contract.revoke_listing([indexer.token_context(1).to_tuple()], sender=nft_owner)
+    cache.apply_all(events := get_event_logs(renting_contract, 2))
+    indexer.apply_all(events)
+    renting_contract.withdraw([indexer.token_context(2).to_tuple()], sender=nft_owner)
+    cache.apply_all(events := get_event_logs(renting_contract, 3))
+    indexer.apply_all(events)
+
+    assert sorted(cache.listings) == [3, 4]
+    assert cache.listing_revocations == indexer.listing_revocations == {1: now, 2: now}
+    assert [cache.is_usable(listing) for listing in listings] == [False, False, True, True]
+    assert [s.listing_revocation for s in renting_contract.token_states(token_ids)] == [now, now, 0, 0]
+
+    # a listing signed at the revocation time is revoked as well
+    assert not cache.put(signer.sign(listings[0], nft_owner_key, owner_key, now))
+    assert 1 not in cache
+
+    ape_contract.approve(renting_contract, 10 * PRICE, sender=renter)
+    with boa.reverts("listing revoked"):
+        renting_contract.start_rentals(
+            [
+                TokenContextAndListing(
+                    indexer.token_context(1), signer.sign(listings[0], nft_owner_key, owner_key, now), 1
+                ).to_tuple()
+            ],
+            ZERO_ADDRESS,
+            now,
+            sender=renter,
+        )
+    renting_contract.start_rentals(
+        [TokenContextAndListing(indexer.token_context(3), cache.get(3), 1).to_tuple()], ZERO_ADDRESS, now, sender=renter
+    )
+    cache.apply_all(get_event_logs(renting_contract, 4))
+    assert [s.listing.token_id for s in cache.cheapest(10, 1, now=now)] == [4]
+
+    # the listing outlives the rental and is offered again once it expires
+    assert 3 in cache
+    assert [s.listing.token_id for s in cache.cheapest(10, 1, now=now + 3600)] == [3, 4]
+
+
+def test_cache_keeps_latest_listing(signer, nft_owner_key, owner_key):
+    cache = ListingCache({1: 100})
+    older, newer = (signer.sign(Listing(2, PRICE, 0, 0, ts), nft_owner_key, owner_key, ts) for ts in (150, 200))
+
+    assert not cache.put(signer.sign(Listing(1, PRICE, 0, 0, 100), nft_owner_key, owner_key, 100))
+    assert cache.put(signer.sign(Listing(1, PRICE, 0, 0, 101), nft_owner_key, owner_key, 101))
+    assert cache.put(newer)
+    assert not cache.put(older)
+    assert cache.get(2) == newer
+
+    cache.apply(EventLog("ListingsRevoked", {"owner": ZERO_ADDRESS, "timestamp": 150, "token_ids": [1, 2]}, 1, 0, 150))
+    assert len(cache) == 1
+    assert cache.get(2) == newer
+    assert cache.listing_revocations == {1: 150, 2: 150}
+
+    cache.revoke(2, 120)
+    assert cache.listing_revocations[2] == 150
+    assert cache.is_usable(newer.listing)
+
+    cache.apply(EventLog("NftsWithdrawn", {"owner": ZERO_ADDRESS, "withdrawals": [(ZERO_ADDRESS, 2)]}, 2, 0, 200))
+    assert len(cache) == 0
+    assert not cache.is_usable(newer.listing)
+
+
+def listed(token_id, price, min_duration=0, max_duration=0, timestamp=1):
+    return SignedListing(Listing(token_id, price, min_duration, max_duration, timestamp), SIGNATURE, SIGNATURE)
+
+
+def test_order_book_top_n():
+    book = OrderBook()
+    book.put_all(
+        [
+            listed(1, 50),
+            listed(2, 10, 48),
+            listed(3, 30, 0, 12),
+            listed(4, 20, 24, 24),
+            listed(5, 20),
+            listed(6, 0),
+            listed(7, 40, 1, 72),
+        ]
+    )
+
+    def cheapest(n, duration, max_price=None, now=0):
+        return [s.listing.token_id for s in book.cheapest(n, duration, max_price, now=now)]
+
+    assert cheapest(10, 24) == [4, 5, 7, 1]
+    assert cheapest(2, 24) == [4, 5]
+    assert cheapest(10, 48) == [2, 5, 7, 1]
+    assert cheapest(10, 6) == [5, 3, 7, 1]
+    assert cheapest(10, 24, max_price=20) == [4, 5]
+    assert cheapest(10, 100) == [2, 5, 1]
+
+    # a newer listing replaces the token's entry, unlisting it at a zero price
+    assert book.put(listed(1, 5, timestamp=2))
+    assert book.put(listed(5, 0, timestamp=2))
+    assert cheapest(3, 24) == [1, 4, 7]
+
+    book.revoke(4, 1)
+    assert cheapest(10, 24) == [1, 7]
+    assert sorted(book.listings) == [1, 2, 3, 5, 6, 7]
+
+
+def rental_event(name, token_id, expiration, block_number):
+    if name == "RentalExtended":
+        rental = (b"", ZERO_ADDRESS, ZERO_ADDRESS, token_id, 0, 0, expiration, 0, 0, 0)
+    else:
+        rental = (b"", ZERO_ADDRESS, ZERO_ADDRESS, token_id, 0, 0, expiration, 0, 0)
+    args = {"renter": ZERO_ADDRESS, "delegate": ZERO_ADDRESS, "rentals": [rental]}
+    return EventLog(name, args, block_number, 0, 0)
+
+
+def test_order_book_skips_rented_tokens():
+    book = OrderBook()
+    book.put_all([listed(1, 10), listed(2, 20), listed(3, 30)])
+
+    def cheapest(now):
+        return [s.listing.token_id for s in book.cheapest(10, 1, now=now)]
+
+    book.apply(rental_event("RentalStarted", 1, 100, 1))
+    book.apply(rental_event("RentalStarted", 2, 100, 1))
+    assert cheapest(0) == [3]
+    assert sorted(book.listings) == [1, 2, 3]
+    assert book.is_rented(1, 99)
+    assert not book.is_rented(1, 100)
+
+    # an expired rental frees the listing, an extension hides it until the new expiration
+    assert cheapest(100) == [1, 2, 3]
+    book.apply(rental_event("RentalExtended", 1, 200, 2))
+    assert cheapest(100) == [2, 3]
+    assert cheapest(200) == [1, 2, 3]
+
+    # closing a rental early offers the listing again right away
+    book.apply(rental_event("RentalClosed", 2, 50, 3))
+    assert cheapest(0) == [2, 3]
+    assert book.rental_expirations == {1: 200}
@@ -0,0 +1,31 @@
+import pytest
+
+from scripts.offchain.merkle import ListingTree, compute_root
+from scripts.offchain.signing import listing_struct_hash
+from scripts.offchain.structs import Listing
+
+PRICE = int(1e18)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 9])
+def test_tree_roots_match_renting(renting_contract, signer, size):
+    listings = [Listing(token_id, PRICE, 1, 0, 1000) for token_id in range(size)]
+    tree = ListingTree(signer, listings)
+
+    for i, listing in enumerate(listings):
+        proof = tree.proof(i)
+        assert len(proof) <= (size - 1).bit_length()
+        assert compute_root(listing_struct_hash(listing), proof) == tree.root
+        assert renting_contract.internal._compute_listing_root(listing.to_tuple(), list(proof)) == tree.root
+
+
+def test_tree_rejects_empty_batches(signer):
+    with pytest.raises(ValueError, match="listings"):
+        ListingTree(signer, [])
+
+
+def test_batch_admin_signature_of_one_is_the_listing_admin_signature(signer, nft_owner_key, owner_key):
+    signed = signer.sign(Listing(1, PRICE), nft_owner_key, owner_key, 1000)
+
+    assert signer.batch_admin_hash([signed.owner_signature], 1000) == signer.admin_hash(signed.owner_signature, 1000)
+    assert signer.sign_batch_admin([signed.owner_signature], owner_key, 1000) == signed.admin_signature
@@ -0,0 +1,82 @@
+import boa
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.migration import legacy_mismatches, migration_plan
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.state import EMPTY_STATE, state_digest, state_hash
+from scripts.offchain.structs import Listing, Rental, TokenContext, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, deploy_renting, get_event_logs
+
+PRICE = int(1e18)
+
+
+def test_migration_plan(
+    renting_contract_def,
+    renting_contract,
+    vault_contract,
+    ape_contract,
+    nft_contract,
+    delegation_registry_warm_contract,
+    protocol_wallet,
+    nft_owner,
+    nft_owner_key,
+    owner,
+    owner_key,
+    renter,
+):
+    token_ids = [1, 2, 3, 4, 5]
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+
+    now = boa.eval("block.timestamp")
+    signed = ListingSigner(renting_contract.address, boa.eval("chain.id")).sign(
+        Listing(1, PRICE, 0, 0, now), nft_owner_key, owner_key, now
+    )
+    ape_contract.approve(renting_contract, PRICE, sender=renter)
+    renting_contract.start_rentals(
+        [TokenContextAndListing(indexer.token_context(1), signed, 1).to_tuple()], ZERO_ADDRESS, now, sender=renter
+    )
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+
+    plan = migration_plan(indexer, boa.eval("block.timestamp"), batch_size=3)
+
+    assert plan.rented == {1: now + 3600}
+    assert len(plan.owners) == 1
+    assert plan.owners[0].owner == nft_owner
+    assert plan.owners[0].deposits == [[2, 3, 4], [5]]
+
+    new_market = deploy_renting(
+        renting_contract_def,
+        vault_contract,
+        ape_contract,
+        nft_contract,
+        delegation_registry_warm_contract,
+        protocol_wallet,
+        owner,
+    )
+    nft_contract.setApprovalForAll(new_market, True, sender=nft_owner)
+    for withdrawals, deposits in zip(plan.owners[0].withdrawals, plan.owners[0].deposits, strict=True):
+        renting_contract.withdraw([context.to_tuple() for context in withdrawals], sender=nft_owner)
+        new_market.deposit(deposits, ZERO_ADDRESS, sender=nft_owner)
+
+    assert nft_contract.ownerOf(1) == renting_contract.tokenid_to_vault(1)
+    assert all(nft_contract.ownerOf(token_id) == new_market.tokenid_to_vault(token_id) for token_id in token_ids[1:])
+    assert [new_market.rental_states(token_id) for token_id in token_ids] == [
+        EMPTY_STATE,
+        *(state_hash(token_id, nft_owner, Rental()) for token_id in token_ids[1:]),
+    ]
+
+
+def test_legacy_mismatches(nft_owner):
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.contexts = {token_id: TokenContext(token_id, nft_owner, Rental()) for token_id in (1, 2)}
+    legacy_states = {1: state_digest(1, nft_owner, Rental()), 2: state_hash(2, nft_owner, Rental())}
+
+    assert state_hash(1, nft_owner, Rental()) == legacy_states[1][:24] + bytes(8)
+    assert legacy_mismatches(indexer, lambda token_id: legacy_states.get(token_id, EMPTY_STATE)) == [2]
+    assert legacy_mismatches(indexer, lambda token_id: legacy_states.get(token_id, EMPTY_STATE), [3]) == []
@@ -0,0 +1,62 @@
+import pytest
+
+from scripts.offchain.relisting import Relister, relistings
+from scripts.offchain.signing import ListingSigner, SigningPool
+from scripts.offchain.structs import Listing
+
+RENTING = "0x" + "12" * 20
+PRICE = int(1e18)
+
+
+class StoreError(Exception):
+    pass
+
+
+class Store:
+    def __init__(self, fail_after: int | None = None):
+        self.listings = []
+        self.fail_after = fail_after
+
+    def __call__(self, chunk):
+        if self.fail_after is not None and len(self.listings) >= self.fail_after:
+            raise StoreError
+        self.listings.extend(chunk)
+
+
+def policy(token_id):
+    # every third token is left untouched
+    return None if token_id % 3 == 0 else token_id * PRICE
+
+
+def test_relistings():
+    listings = list(
+        relistings(range(1, 7), policy, 1000, min_duration=1, max_duration=24, listing_revocations={2: 999, 4: 1000, 5: 2000})
+    )
+
+    assert listings == [
+        Listing(1, PRICE, 1, 24, 1000),
+        Listing(2, 2 * PRICE, 1, 24, 1000),
+        Listing(4, 4 * PRICE, 1, 24, 1001),
+        Listing(5, 5 * PRICE, 1, 24, 2001),
+    ]
+
+
+def test_relister_resumes(tmp_path, nft_owner_key):
+    signer = ListingSigner(RENTING, 1)
+    token_ids = range(1, 31)
+    checkpoint = tmp_path / "relisting.json"
+    expected = [(listing, signer.sign_owner(listing, nft_owner_key)) for listing in relistings(token_ids, policy, 1000)]
+
+    with SigningPool(workers=2, chunk_size=3) as pool:
+        store = Store(fail_after=9)
+        with pytest.raises(StoreError):
+            Relister(signer, pool, store, checkpoint, max_pending=2).run(token_ids, policy, nft_owner_key, 1000)
+        assert checkpoint.exists()
+
+        # resumed later, keeping the timestamp of the interrupted run
+        store.fail_after = None
+        stored = Relister(signer, pool, store, checkpoint, max_pending=2).run(token_ids, policy, nft_owner_key, 5000)
+
+    assert stored == len(expected) - 9
+    assert store.listings == expected
+    assert not checkpoint.exists()
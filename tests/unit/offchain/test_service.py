@@ -0,0 +1,342 @@
+import asyncio
+import json
+import os
+
+import boa
+import pytest
+
+from scripts.offchain.decoders import LogDecoder
+from scripts.offchain.journal import JournaledIndexer
+from scripts.offchain.service import (
+    IndexingService,
+    LogFetcher,
+    MarketConfig,
+    MarketFollower,
+    RangeTooLargeError,
+    load_market_configs,
+)
+from scripts.offchain.structs import RawLog
+
+from ...conftest_base import (
+    PROTOCOL_FEE,
+    ZERO_ADDRESS,
+    Listing,
+    TokenContextAndListing,
+    deploy_renting,
+    get_raw_logs,
+    sign_listing,
+)
+
+PRICE = int(1e18)
+
+
+class BoaLogSource:
+    # stand-in for a node, one block per mined transaction and refusing ranges longer than `max_range`
+    def __init__(self, max_range: int | None = None):
+        self.logs: list[RawLog] = []
+        self.head = 0
+        self.max_range = max_range
+        self.calls: list[tuple[list[str], int, int]] = []
+        self.failures = 0
+        self.hashes = {0: os.urandom(32)}
+        self.reorg_on_fetch: int | None = None
+
+    def mine(self, contract=None):
+        self.head += 1
+        self.hashes[self.head] = os.urandom(32)
+        if contract is not None:
+            self.logs.extend(get_raw_logs(contract, self.head))
+
+    def reorg(self, block_number):
+        # drops the blocks after `block_number`, the next ones mined get new hashes
+        self.head = block_number
+        self.logs = [log for log in self.logs if log.block_number <= block_number]
+        self.hashes = {n: block_hash for n, block_hash in self.hashes.items() if n <= block_number}
+
+    async def block_number(self) -> int:
+        return self.head
+
+    async def get_logs(self, addresses: list[str], from_block: int, to_block: int) -> list[RawLog]:
+        self.calls.append((addresses, from_block, to_block))
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("node unavailable")
+        if self.max_range and to_block - from_block + 1 > self.max_range:
+            raise RangeTooLargeError("block range is too large")
+        logs = [log for log in self.logs if from_block <= log.block_number <= to_block and log.address.lower() in addresses]
+        if self.reorg_on_fetch is not None:
+            # the chain reorgs once the logs are read, replacing the blocks after `reorg_on_fetch` by an empty one
+            self.reorg(self.reorg_on_fetch)
+            self.mine()
+            self.reorg_on_fetch = None
+        return logs
+
+    async def block_hash(self, block_number: int) -> bytes:
+        return self.hashes[block_number]
+
+
+class FailingIndexer(JournaledIndexer):
+    # raises once on the `fail_at`-th event applied
+    def __init__(self, fail_at: int):
+        super().__init__(PROTOCOL_FEE)
+        self.fail_at = fail_at
+
+    def apply(self, event):
+        self.fail_at -= 1
+        if self.fail_at == 0:
+            raise ConnectionResetError("indexer store unavailable")
+        super().apply(event)
+
+
+@pytest.fixture
+def other_renting_contract(
+    renting_contract_def,
+    vault_contract,
+    ape_contract,
+    nft_contract,
+    delegation_registry_warm_contract,
+    protocol_wallet,
+    owner,
+):
+    return deploy_renting(
+        renting_contract_def,
+        vault_contract,
+        ape_contract,
+        nft_contract,
+        delegation_registry_warm_contract,
+        protocol_wallet,
+        owner,
+    )
+
+
+def test_service_follows_markets(
+    renting_contract,
+    other_renting_contract,
+    nft_contract,
+    ape_contract,
+    nft_owner,
+    nft_owner_key,
+    renter,
+    owner,
+    owner_key,
+):
+    source = BoaLogSource(max_range=3)
+    fetcher = LogFetcher(source, block_range=16, head_ttl=0)
+    contracts = {"bayc_v3": (renting_contract, [1, 2]), "mayc_v3": (other_renting_contract, [3, 4])}
+    markets = [MarketConfig("ethereum", name, contract.address, PROTOCOL_FEE) for name, (contract, _) in contracts.items()]
+    service = IndexingService(markets, {"ethereum": fetcher}, renting_contract.abi, confirmations=0)
+
+    def contexts(name, duration):
+        contract, token_ids = contracts[name]
+        indexer = service.indexer(f"ethereum/{name}")
+        now = boa.eval("block.timestamp")
+        return [
+            TokenContextAndListing(
+                indexer.token_context(token_id),
+                sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, contract.address),
+                duration,
+            ).to_tuple()
+            for token_id in token_ids
+        ]
+
+    def verify():
+        for name, (contract, token_ids) in contracts.items():
+            assert service.indexer(f"ethereum/{name}").verify(contract.rental_states, token_ids) == []
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    ape_contract.approve(other_renting_contract, 100 * PRICE, sender=renter)
+    source.mine()
+    for contract, token_ids in contracts.values():
+        for token_id in token_ids:
+            nft_contract.mint(nft_owner, token_id, sender=owner)
+            nft_contract.approve(contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+        contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+        source.mine(contract)
+    for _ in range(4):
+        source.mine()
+
+    asyncio.run(service.poll())
+    verify()
+    assert fetcher.block_range < 16
+    assert all(len(addresses) == 2 for addresses, _, _ in source.calls)
+    assert {key: m.lag_blocks for key, m in service.metrics().items()} == {"ethereum/bayc_v3": 0, "ethereum/mayc_v3": 0}
+    assert service.metrics()["ethereum/mayc_v3"].events == 1
+
+    renting_contract.start_rentals(contexts("bayc_v3", 2), ZERO_ADDRESS, boa.eval("block.timestamp"), sender=renter)
+    source.mine(renting_contract)
+    other_renting_contract.start_rentals(contexts("mayc_v3", 2), ZERO_ADDRESS, boa.eval("block.timestamp"), sender=renter)
+    source.mine(other_renting_contract)
+    asyncio.run(service.poll())
+    boa.env.time_travel(seconds=3600)
+    renting_contract.extend_rentals(contexts("bayc_v3", 3), boa.eval("block.timestamp"), sender=renter)
+    source.mine(renting_contract)
+
+    asyncio.run(service.poll())
+    verify()
+    assert service.metrics()["ethereum/bayc_v3"].indexed_block == source.head
+    assert service.metrics()["ethereum/bayc_v3"].events == 3
+
+
+def test_fetcher_adapts_block_range():
+    source = BoaLogSource(max_range=8)
+    fetcher = LogFetcher(source, block_range=100, max_block_range=64, target_logs=4)
+    address = "0x" + "ab" * 20
+    block_numbers = [*range(0, 170, 50), *range(170, 180)]
+    source.logs = [RawLog(address, (), b"", block_number, 0) for block_number in block_numbers]
+
+    logs, last_block = asyncio.run(fetcher.get_logs(address, 0, 199))
+    assert (len(logs), last_block, fetcher.block_range) == (1, 5, 6)
+
+    source.max_range = None
+    ranges = []
+    while last_block < 199:
+        logs, block = asyncio.run(fetcher.get_logs(address, last_block + 1, 199))
+        ranges.append(block - last_block)
+        last_block = block
+    assert ranges == [6, 12, 24, 48, 64, 40]
+    assert fetcher.block_range == 20
+
+
+def test_service_keeps_running_after_errors(renting_contract):
+    source = BoaLogSource()
+    market = MarketConfig("ethereum", "bayc_v3", renting_contract.address, PROTOCOL_FEE)
+    fetcher = LogFetcher(source, head_ttl=0)
+    service = IndexingService([market], {"ethereum": fetcher}, renting_contract.abi, confirmations=0, poll_interval=0)
+    metrics = service.metrics()["ethereum/bayc_v3"]
+    source.mine()
+    source.failures = 2
+
+    async def run():
+        task = asyncio.create_task(service.run())
+        while metrics.indexed_block < source.head:  # noqa: ASYNC110
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run())
+    assert metrics.errors == 2
+    assert metrics.lag_blocks == 0
+
+
+def deposit(renting_contract, nft_contract, nft_owner, owner, token_ids):
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+
+
+def start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter):
+    now = boa.eval("block.timestamp")
+    listings = [
+        TokenContextAndListing(
+            indexer.token_context(token_id),
+            sign_listing(Listing(token_id, PRICE, 0, 0, now), nft_owner_key, owner_key, now, renting_contract.address),
+            1,
+        ).to_tuple()
+        for token_id in token_ids
+    ]
+    renting_contract.start_rentals(listings, ZERO_ADDRESS, now, sender=renter)
+
+
+def test_follower_applies_ranges_atomically(renting_contract, nft_contract, nft_owner, owner):
+    source = BoaLogSource()
+    market = MarketConfig("ethereum", "bayc_v3", renting_contract.address, PROTOCOL_FEE)
+    indexer = FailingIndexer(fail_at=2)
+    follower = MarketFollower(market, LogFetcher(source, head_ttl=0), LogDecoder(renting_contract.abi), 0, indexer)
+    deposit(renting_contract, nft_contract, nft_owner, owner, [1, 2])
+    source.mine(renting_contract)
+    deposit(renting_contract, nft_contract, nft_owner, owner, [3])
+    source.mine(renting_contract)
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(follower.poll())
+    assert (indexer.last_block, indexer.contexts) == (-1, {})
+
+    asyncio.run(follower.poll())
+    assert indexer.verify(renting_contract.rental_states, [1, 2, 3]) == []
+    assert set(indexer.contexts) == {1, 2, 3}
+    assert follower.metrics.indexed_block == source.head
+
+
+def test_follower_rolls_back_reorgs(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key
+):
+    source = BoaLogSource()
+    market = MarketConfig("ethereum", "bayc_v3", renting_contract.address, PROTOCOL_FEE)
+    fetcher = LogFetcher(source, head_ttl=0)
+    follower = MarketFollower(market, fetcher, LogDecoder(renting_contract.abi), confirmations=1)
+    indexer = follower.indexer
+    token_ids = [1, 2, 3]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    source.mine(renting_contract)
+    source.mine()
+    asyncio.run(follower.poll())
+    fork_block = source.head
+
+    with boa.env.anchor():
+        start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter)
+        source.mine(renting_contract)
+        source.mine()
+        asyncio.run(follower.poll())
+        assert indexer.verify(renting_contract.rental_states, token_ids) == []
+
+    source.reorg(fork_block)
+    source.mine()
+    asyncio.run(follower.poll())
+    assert indexer.contexts[1].active_rental.renter == ZERO_ADDRESS
+
+    start_rentals(renting_contract, indexer, token_ids[1:], nft_owner_key, owner_key, renter)
+    source.mine(renting_contract)
+    source.mine()
+    asyncio.run(follower.poll())
+
+    assert indexer.verify(renting_contract.rental_states, token_ids) == []
+    assert indexer.unclaimed_rewards.get(nft_owner, 0) == renting_contract.unclaimed_rewards(nft_owner)
+    assert follower.metrics.indexed_block == source.head - 1
+
+
+def test_follower_refetches_ranges_reorged_while_fetching(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key
+):
+    source = BoaLogSource()
+    market = MarketConfig("ethereum", "bayc_v3", renting_contract.address, PROTOCOL_FEE)
+    follower = MarketFollower(market, LogFetcher(source, head_ttl=0), LogDecoder(renting_contract.abi), confirmations=0)
+    indexer = follower.indexer
+    token_ids = [1, 2, 3]
+    deposit(renting_contract, nft_contract, nft_owner, owner, token_ids)
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    source.mine(renting_contract)
+    asyncio.run(follower.poll())
+    fork_block = source.head
+
+    with boa.env.anchor():
+        start_rentals(renting_contract, indexer, token_ids, nft_owner_key, owner_key, renter)
+        source.mine(renting_contract)
+
+    source.reorg_on_fetch = fork_block
+    calls = len(source.calls)
+    asyncio.run(follower.poll())
+
+    assert len(source.calls) == calls + 2
+    assert indexer.verify(renting_contract.rental_states, token_ids) == []
+    assert indexer.contexts[1].active_rental.renter == ZERO_ADDRESS
+    assert follower.metrics.indexed_block == source.head
+
+
+def test_load_market_configs(tmp_path):
+    renting = {
+        "bayc_v3": {"address": "0x" + "12" * 20, "contract": "RentingV3Contract", "properties": {"protocol_fee": 500}},
+        "koda": {"address": "0x" + "34" * 20, "contract": "RentingV3Contract", "properties": {"protocol_fee": 0}},
+        "bayc": {"address": "0x" + "56" * 20, "contract": "RentingV2Contract", "properties": {}},
+    }
+    for chain in ["ethereum", "apechain"]:
+        (tmp_path / chain).mkdir()
+        (tmp_path / chain / "renting.json").write_text(json.dumps({"common": {}, "renting": renting}))
+
+    markets = load_market_configs(
+        [tmp_path / "ethereum" / "renting.json", tmp_path / "apechain" / "renting.json"], {"apechain/koda": 100}
+    )
+
+    assert [m.key for m in markets] == ["ethereum/bayc_v3", "ethereum/koda", "apechain/bayc_v3", "apechain/koda"]
+    assert markets[0] == MarketConfig("ethereum", "bayc_v3", "0x" + "12" * 20, 500)
+    assert markets[3].start_block == 100
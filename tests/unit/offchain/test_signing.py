@@ -0,0 +1,46 @@
+import boa
+import pytest
+
+from scripts.offchain.signing import SigningPool, signature_hash
+from scripts.offchain.structs import Listing
+
+from ...conftest_base import Listing as ListingArgs
+from ...conftest_base import sign_listing
+
+PRICE = int(1e18)
+
+
+@pytest.fixture
+def listings():
+    now = boa.eval("block.timestamp")
+    return [Listing(token_id, PRICE * token_id, token_id % 3, token_id % 5 * 24, now - token_id) for token_id in range(1, 9)]
+
+
+def test_signer_matches_typed_data_signing(renting_contract, signer, listings, nft_owner_key, owner_key):
+    timestamp = boa.eval("block.timestamp")
+    for listing in listings:
+        expected = sign_listing(
+            ListingArgs(*listing.to_tuple()), nft_owner_key, owner_key, timestamp, renting_contract.address
+        )
+        assert signer.sign(listing, nft_owner_key, owner_key, timestamp).to_tuple() == expected.to_tuple()
+
+
+def test_signatures_verified_by_renting(renting_contract, signer, listings, nft_owner, nft_owner_key, owner_key):
+    timestamp = boa.eval("block.timestamp")
+
+    assert signer.domain_separator == renting_contract.eval("listing_sig_domain_separator")
+    for signed in signer.sign_all(listings, nft_owner_key, owner_key, timestamp):
+        assert renting_contract.internal._is_listing_signed_by_owner(signed.to_tuple(), nft_owner)
+        assert renting_contract.internal._is_signed_by_admin(
+            signature_hash(signed.owner_signature), signed.admin_signature.to_tuple(), timestamp
+        )
+        assert not renting_contract.internal._is_signed_by_admin(
+            signature_hash(signed.owner_signature), signed.admin_signature.to_tuple(), timestamp + 1
+        )
+
+
+def test_signing_pool(signer, listings, nft_owner_key, owner_key):
+    with SigningPool(workers=2, chunk_size=3) as pool:
+        signed = pool.sign_all(signer, listings, nft_owner_key, owner_key, 1)
+
+    assert signed == signer.sign_all(listings, nft_owner_key, owner_key, 1)
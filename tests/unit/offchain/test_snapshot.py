@@ -0,0 +1,116 @@
+import boa
+import pytest
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.snapshot import Checkpointer, SnapshotStore, dump_state, load_state, resume
+
+from ...conftest_base import ZERO_ADDRESS, Listing, TokenContextAndListing, get_event_logs, sign_listing
+
+PROTOCOL_FEE = 500
+PRICE = int(1e18)
+
+
+@pytest.fixture
+def blocks(renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, renter, owner, owner_key):
+    # events of each block of a short market history: deposits, rentals, a close and a claim
+    token_ids = list(range(1, 9))
+    blocks = []
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+
+    def mine():
+        events = get_event_logs(renting_contract, len(blocks) + 1)
+        indexer.apply_all(events)
+        blocks.append(events)
+
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    mine()
+
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    for token_id in token_ids:
+        now = boa.eval("block.timestamp")
+        listing = Listing(token_id, PRICE, 0, 0, now)
+        signed_listing = sign_listing(listing, nft_owner_key, owner_key, now, renting_contract.address)
+        renting_contract.start_rentals(
+            [TokenContextAndListing(indexer.token_context(token_id), signed_listing, 2).to_tuple()],
+            ZERO_ADDRESS,
+            now,
+            sender=renter,
+        )
+        mine()
+        boa.env.time_travel(seconds=1800)
+
+    renting_contract.close_rentals([indexer.token_context(8).to_tuple()], sender=renter)
+    mine()
+    renting_contract.claim([indexer.token_context(token_id).to_tuple() for token_id in token_ids], sender=nft_owner)
+    mine()
+
+    return blocks
+
+
+def replay(blocks, indexer, first_block=1, checkpointer=None):
+    for block_number, events in enumerate(blocks[first_block - 1 :], start=first_block):
+        indexer.apply_all(events)
+        if checkpointer:
+            checkpointer.advance_to(block_number)
+        else:
+            indexer.advance_to(block_number)
+    return indexer
+
+
+def test_dump_and_load_state(renting_contract, blocks):
+    indexer = replay(blocks, TokenContextIndexer(protocol_fee=PROTOCOL_FEE))
+    restored = load_state(dump_state(indexer))
+
+    assert restored.contexts == indexer.contexts
+    assert restored.unclaimed_rewards == indexer.unclaimed_rewards
+    assert restored.protocol_fees_amount == indexer.protocol_fees_amount
+    assert restored.protocol_fee == indexer.protocol_fee
+    assert restored.listing_revocations == indexer.listing_revocations
+    assert restored.last_block == indexer.last_block
+    assert restored.verify(renting_contract.rental_states) == []
+
+
+def test_resume_from_snapshot_and_tail(renting_contract, blocks, tmp_path):
+    store = SnapshotStore(tmp_path)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    replay(blocks[:5], indexer, checkpointer=Checkpointer(indexer, store, interval=2))
+    assert store.blocks() == [2, 4]
+
+    resumed = resume(store, PROTOCOL_FEE)
+    assert resumed.last_block == 4
+    replay(blocks, resumed, first_block=resumed.last_block + 1)
+
+    full = replay(blocks, TokenContextIndexer(protocol_fee=PROTOCOL_FEE))
+    assert resumed.contexts == full.contexts
+    assert resumed.unclaimed_rewards == full.unclaimed_rewards
+    assert resumed.protocol_fees_amount == full.protocol_fees_amount == renting_contract.protocol_fees_amount()
+    assert resumed.verify(renting_contract.rental_states) == []
+
+
+def test_resume_without_snapshots(tmp_path):
+    indexer = resume(SnapshotStore(tmp_path), protocol_fee=PROTOCOL_FEE, start_block=100)
+
+    assert indexer.contexts == {}
+    assert indexer.protocol_fee == PROTOCOL_FEE
+    assert indexer.last_block == 99
+
+
+def test_store_keeps_latest_snapshots(blocks, tmp_path):
+    store = SnapshotStore(tmp_path, keep=2)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    replay(blocks, indexer, checkpointer=Checkpointer(indexer, store, interval=1))
+
+    assert store.blocks() == [len(blocks) - 1, len(blocks)]
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_store_skips_unreadable_snapshots(blocks, tmp_path):
+    store = SnapshotStore(tmp_path)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    replay(blocks[:4], indexer, checkpointer=Checkpointer(indexer, store, interval=2))
+    store.path(4).write_text('{"version": 1, "last_b')
+
+    assert store.latest().last_block == 2
@@ -0,0 +1,130 @@
+from dataclasses import replace
+from itertools import starmap
+
+import boa
+import pytest
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.structs import Listing, Signature, TokenContext, TokenContextAndListing, TokenState
+from scripts.offchain.validation import LISTINGS_SIGNATURE_VALID_PERIOD, ListingValidator, ecrecover
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, get_event_logs
+
+PRICE = int(1e18)
+
+
+@pytest.fixture
+def validator(renting_contract, signer):
+    return ListingValidator(signer, renting_contract.protocol_admin())
+
+
+def token_states(renting_contract, contexts):
+    return list(starmap(TokenState, renting_contract.token_states([c.token_context.token_id for c in contexts])))
+
+
+def assert_matches_contract(submit, contexts, verdicts):
+    # the valid items go through together, each invalid one reverts with its verdict after the valid ones before it
+    valid = [c.to_tuple() for c, verdict in zip(contexts, verdicts, strict=True) if verdict is None]
+    with boa.env.anchor():
+        submit(valid)
+    for i, verdict in enumerate(verdicts):
+        if verdict is not None:
+            previous = [c.to_tuple() for c, v in zip(contexts[:i], verdicts[:i], strict=True) if v is None]
+            with boa.env.anchor(), boa.reverts(verdict):
+                submit([*previous, contexts[i].to_tuple()])
+
+
+def test_ecrecover_rejects_invalid_signatures(signer, nft_owner, nft_owner_key):
+    digest = signer.listing_hash(Listing(1, PRICE))
+    signature = signer.sign_owner(Listing(1, PRICE), nft_owner_key)
+
+    assert ecrecover(digest, *signature.to_tuple()) == nft_owner
+    assert ecrecover(digest, 0, signature.r, signature.s) == ZERO_ADDRESS
+    assert ecrecover(digest, signature.v, 0, signature.s) == ZERO_ADDRESS
+    assert ecrecover(digest, signature.v, signature.r, 2**256 - 1) == ZERO_ADDRESS
+
+
+def test_validate_start_rentals(
+    renting_contract, signer, validator, deposited, nft_owner, nft_owner_key, owner, owner_key, renter
+):
+    now = boa.eval("block.timestamp")
+
+    def context(token_id, listing=None, duration=2, signer_key=nft_owner_key, admin_timestamp=now, token_owner=nft_owner):
+        listing = listing or Listing(token_id, PRICE, 1, 0, now)
+        signed = signer.sign(listing, signer_key, owner_key, admin_timestamp)
+        return TokenContextAndListing(TokenContext(token_id, token_owner), signed, duration)
+
+    renting_contract.revoke_listing([TokenContext(4, nft_owner).to_tuple()], sender=nft_owner)
+    bad_signature = context(8)
+    contexts = [
+        context(1),
+        context(2, signer_key=owner_key),
+        context(3, admin_timestamp=now - 1),
+        context(4),
+        context(5, duration=0),
+        context(6, Listing(6, 0, 0, 0, now)),
+        context(7, Listing(8, PRICE, 0, 0, now)),
+        replace(
+            bad_signature,
+            signed_listing=replace(bad_signature.signed_listing, owner_signature=Signature(0, 1, 2)),
+        ),
+        context(5, token_owner=owner),
+        context(9),
+        context(1),
+        context(5, Listing(5, PRICE, 1, 3, now), duration=4),
+    ]
+    states = token_states(renting_contract, contexts)
+
+    verdicts = validator.validate_start(contexts, states, now, now)
+
+    assert verdicts == [
+        None,
+        "invalid owner signature",
+        "invalid admin signature",
+        "listing revoked",
+        "duration not respected",
+        "listing not active",
+        "invalid token_id",
+        "invalid owner signature",
+        "invalid context",
+        "invalid context",
+        "invalid context",
+        "duration not respected",
+    ]
+    assert_matches_contract(
+        lambda batch: renting_contract.start_rentals(batch, ZERO_ADDRESS, now, sender=renter), contexts, verdicts
+    )
+
+    expired = now - LISTINGS_SIGNATURE_VALID_PERIOD
+    contexts = [context(1, admin_timestamp=expired), context(2, admin_timestamp=expired)]
+    verdicts = validator.validate_start(contexts, token_states(renting_contract, contexts), expired, now)
+    assert verdicts == ["listing expired"] * 2
+    assert_matches_contract(
+        lambda batch: renting_contract.start_rentals(batch, ZERO_ADDRESS, expired, sender=renter), contexts, verdicts
+    )
+
+
+def test_validate_extend_rentals(renting_contract, signer, validator, deposited, nft_owner, nft_owner_key, owner_key, renter):
+    now = boa.eval("block.timestamp")
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+
+    def context(token_id, duration=2):
+        signed = signer.sign(Listing(token_id, PRICE, 1, 0, now), nft_owner_key, owner_key, now)
+        return TokenContextAndListing(indexer.token_context(token_id), signed, duration)
+
+    renting_contract.start_rentals([context(1).to_tuple(), context(2).to_tuple()], ZERO_ADDRESS, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+    boa.env.time_travel(seconds=3600)
+    now = boa.eval("block.timestamp")
+
+    contexts = [context(1, duration=3), context(3), context(2, duration=0)]
+    states = token_states(renting_contract, contexts)
+    verdicts = validator.validate_extend(contexts, states, now, now, renter)
+    assert verdicts == [None, "no active rental", "duration not respected"]
+    assert_matches_contract(lambda batch: renting_contract.extend_rentals(batch, now, sender=renter), contexts, verdicts)
+
+    other = boa.env.generate_address("other")
+    verdicts = validator.validate_extend(contexts, states, now, now, other)
+    assert verdicts == ["not renter of active rental", "no active rental", "not renter of active rental"]
+    assert_matches_contract(lambda batch: renting_contract.extend_rentals(batch, now, sender=other), contexts, verdicts)
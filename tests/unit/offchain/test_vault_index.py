@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from scripts.offchain.vault_index import Market, VaultIndex, load_markets
+
+TOKEN_IDS = range(100)
+OTHER_RENTING = "0x" + "12" * 20
+OTHER_VAULT_IMPL = "0x" + "34" * 20
+
+
+def write_config(path, markets):
+    renting = {
+        name: {
+            "address": renting,
+            "contract": contract,
+            "properties": {},
+            "properties_addresses": {"vault_impl": vault_impl},
+        }
+        for name, (contract, renting, vault_impl) in markets.items()
+    }
+    path.write_text(json.dumps({"common": {}, "renting": renting}))
+
+
+def test_index_matches_renting(renting_contract, vault_contract, tmp_path):
+    config_file = tmp_path / "renting.json"
+    write_config(
+        config_file,
+        {
+            "bayc_v3": ("RentingV3Contract", renting_contract.address, vault_contract.address),
+            "mayc_v3": ("RentingV3Contract", OTHER_RENTING, OTHER_VAULT_IMPL),
+            "koda_v2": ("RentingV2Contract", OTHER_RENTING, vault_contract.address),
+        },
+    )
+    markets = load_markets(config_file, {"bayc_v3": TOKEN_IDS, "mayc_v3": TOKEN_IDS})
+    assert list(markets) == ["bayc_v3", "mayc_v3"]
+    assert markets["mayc_v3"].token_ids == TOKEN_IDS
+    with pytest.raises(ValueError, match="mayc_v3"):
+        load_markets(config_file, {"bayc_v3": TOKEN_IDS})
+
+    index = VaultIndex(tmp_path / "vaults.npz")
+    assert index.sync(markets) == ["bayc_v3", "mayc_v3"]
+
+    assert len(index) == 2 * len(TOKEN_IDS)
+    for token_id in TOKEN_IDS:
+        assert index.lookup(renting_contract.tokenid_to_vault(token_id)) == ("bayc_v3", token_id)
+    assert index.lookup(vault_contract.address) is None
+
+
+def test_index_updates_incrementally(tmp_path):
+    path = tmp_path / "vaults.npz"
+    index = VaultIndex(path)
+    index.sync({"bayc_v3": Market(OTHER_RENTING, OTHER_VAULT_IMPL, TOKEN_IDS)})
+    vault = next(v for v, entry in index._vaults.items() if entry == ("bayc_v3", 7))
+
+    new_impl = "0x" + "56" * 20
+    markets = {
+        "bayc_v3": Market(OTHER_RENTING, OTHER_VAULT_IMPL, TOKEN_IDS),
+        "mayc_v3": Market(OTHER_RENTING, new_impl, range(50)),
+    }
+    assert index.sync(markets) == ["mayc_v3"]
+    assert len(index) == 150
+
+    markets["bayc_v3"] = Market(OTHER_RENTING, new_impl, range(100, 110))
+    del markets["mayc_v3"]
+    assert index.sync(markets) == ["mayc_v3", "bayc_v3"]
+    assert len(index) == 10
+    assert index.lookup("0x" + vault.hex()) is None
+
+    reloaded = VaultIndex(path)
+    assert reloaded.markets == index.markets
+    assert reloaded._vaults == index._vaults
+    assert reloaded.sync(markets) == []
@@ -0,0 +1,23 @@
+import random
+
+from scripts.offchain.vaults import init_code_hash, tokenid_to_vault, vault_table
+
+
+def test_vault_addresses_match_renting(renting_contract, vault_contract):
+    rng = random.Random(0)
+    token_ids = [0, 1, 2, 9999, 2**256 - 1, *(rng.randrange(2**256) for _ in range(50)), *rng.sample(range(10000), 50)]
+
+    table = vault_table(renting_contract.address, vault_contract.address, token_ids)
+
+    for token_id in token_ids:
+        expected = renting_contract.tokenid_to_vault(token_id)
+        assert tokenid_to_vault(renting_contract.address, vault_contract.address, token_id) == expected
+        assert table[token_id] == expected
+
+
+def test_init_code_hash_is_cached(vault_contract):
+    init_code_hash.cache_clear()
+    init_code_hash(vault_contract.address)
+    init_code_hash(vault_contract.address)
+
+    assert init_code_hash.cache_info().hits == 1
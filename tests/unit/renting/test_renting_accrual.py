@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+
+import boa
+import pytest
+from eth_account import Account
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, ArtifactDeployer, deploy_renting, get_event_logs
+
+MAX_PROTOCOL_FEE = 1000
+PRICE = int(1e18) // 7
+# owner index of tokens 1 to 12, mixing runs of one owner and interleaved owners
+TOKEN_OWNERS = [0, 0, 1, 1, 1, 0, 2, 0, 1, 2, 2, 0]
+TOKEN_IDS = list(range(1, len(TOKEN_OWNERS) + 1))
+
+
+@dataclass
+class Market:
+    renting: object
+    nft: object
+    indexer: TokenContextIndexer = field(default_factory=lambda: TokenContextIndexer(protocol_fee=PROTOCOL_FEE))
+    block: int = 0
+
+    def apply(self):
+        self.block += 1
+        self.indexer.apply_all(get_event_logs(self.renting, self.block))
+
+    def accounting(self, owners: list[str]) -> tuple:
+        return [self.renting.unclaimed_rewards(owner) for owner in owners], self.renting.protocol_fees_amount()
+
+
+@pytest.fixture(scope="module")
+def per_token_renting_contract_def():
+    return ArtifactDeployer("tests/stubs/RentingV3PerToken.json")
+
+
+def deploy_market(renting_contract_def, vault_contract_def, ape_contract, owner, protocol_wallet):
+    with boa.env.prank(owner):
+        nft_contract = boa.load("contracts/auxiliary/ERC721.vy")
+    delegation_contract = boa.load("contracts/auxiliary/HotWalletMock.vy")
+    renting_contract = deploy_renting(
+        renting_contract_def,
+        vault_contract_def.deploy(ape_contract, nft_contract, delegation_contract),
+        ape_contract,
+        nft_contract,
+        delegation_contract,
+        protocol_wallet,
+        owner,
+        max_protocol_fee=MAX_PROTOCOL_FEE,
+    )
+    return Market(renting_contract, nft_contract)
+
+
+def owner_tokens(owner_index: int) -> list[int]:
+    return [token_id for token_id, owner in zip(TOKEN_IDS, TOKEN_OWNERS, strict=True) if owner == owner_index]
+
+
+def listings(market: Market, token_ids: list[int], duration: int, owner_keys: list[bytes], admin_key: str) -> tuple:
+    now = boa.eval("block.timestamp")
+    signer = ListingSigner(market.renting.address, boa.eval("chain.id"))
+    batch = []
+    for token_id in token_ids:
+        # prices and minimum durations vary per token, so the protocol fees don't divide evenly
+        listing = Listing(token_id, PRICE * token_id + token_id, token_id % 2, 0, now)
+        signed = signer.sign(listing, owner_keys[TOKEN_OWNERS[token_id - 1]], admin_key, now)
+        batch.append(TokenContextAndListing(market.indexer.token_context(token_id), signed, duration).to_tuple())
+    return batch, now
+
+
+def token_contexts(market: Market, token_ids: list[int]) -> list[tuple]:
+    return [market.indexer.token_context(token_id).to_tuple() for token_id in token_ids]
+
+
+def test_batched_accrual_matches_per_token_accrual(
+    renting_contract_def,
+    per_token_renting_contract_def,
+    vault_contract_def,
+    ape_contract,
+    owner,
+    owner_key,
+    protocol_wallet,
+    renter,
+):
+    nft_owners = [Account.create() for _ in range(3)]
+    owners = [nft_owner.address for nft_owner in nft_owners]
+    owner_keys = [nft_owner.key for nft_owner in nft_owners]
+    markets = [
+        deploy_market(contract_def, vault_contract_def, ape_contract, owner, protocol_wallet)
+        for contract_def in (renting_contract_def, per_token_renting_contract_def)
+    ]
+    for market in markets:
+        for token_id, owner_index in zip(TOKEN_IDS, TOKEN_OWNERS, strict=True):
+            market.nft.mint(owners[owner_index], token_id, sender=owner)
+        for owner_index, nft_owner in enumerate(owners):
+            market.nft.setApprovalForAll(market.renting, True, sender=nft_owner)
+            market.renting.deposit(owner_tokens(owner_index), ZERO_ADDRESS, sender=nft_owner)
+            market.apply()
+        ape_contract.approve(market.renting, 2**256 - 1, sender=renter)
+
+    def step(call):
+        for market in markets:
+            call(market)
+            market.apply()
+        assert markets[0].accounting(owners) == markets[1].accounting(owners)
+        assert markets[0].indexer.unclaimed_rewards == markets[1].indexer.unclaimed_rewards
+        assert markets[0].indexer.protocol_fees_amount == markets[1].indexer.protocol_fees_amount
+        assert all(market.indexer.verify(market.renting.rental_states) == [] for market in markets)
+
+    def start(market, token_ids, duration):
+        batch, now = listings(market, token_ids, duration, owner_keys, owner_key)
+        market.renting.start_rentals(batch, ZERO_ADDRESS, now, sender=renter)
+
+    def extend(market, token_ids, duration):
+        batch, now = listings(market, token_ids, duration, owner_keys, owner_key)
+        market.renting.extend_rentals(batch, now, sender=renter)
+
+    step(lambda market: start(market, TOKEN_IDS, 2))
+    step(lambda market: market.renting.set_protocol_fee(730, sender=owner))
+
+    boa.env.time_travel(seconds=1800)
+    step(lambda market: extend(market, [2, 1, 3, 7, 4, 9, 10], 3))
+
+    boa.env.time_travel(seconds=1800)
+    step(lambda market: market.renting.close_rentals(token_contexts(market, [5, 6, 11, 8, 3]), sender=renter))
+    assert markets[0].accounting(owners)[1] > 0
+
+    # every rental expired, the new rentals consolidate the rewards of the previous ones
+    boa.env.time_travel(seconds=4 * 3600)
+    step(lambda market: start(market, TOKEN_IDS, 1))
+
+    boa.env.time_travel(seconds=2 * 3600)
+    step(lambda market: market.renting.claim(token_contexts(market, owner_tokens(0)), sender=owners[0]))
+    step(lambda market: market.renting.withdraw(token_contexts(market, owner_tokens(1)), sender=owners[1]))
+    step(lambda market: market.renting.claim(token_contexts(market, owner_tokens(2)), sender=owners[2]))
+    assert markets[0].accounting(owners)[0] == [0, 0, 0]
@@ -0,0 +1,63 @@
+import boa
+
+from scripts.offchain.compact import compact_rental, encode_compact
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, get_event_logs
+
+PRICE = int(1e18)
+TOKEN_IDS = [1, 2, 3]
+
+
+def rental_batch(renting_contract, nft_owner_key, owner_key, contexts, duration):
+    now = boa.eval("block.timestamp")
+    signer = ListingSigner(renting_contract.address, boa.eval("chain.id"))
+    listings = [Listing(context.token_id, PRICE, 1, 0, now) for context in contexts]
+    signed = signer.sign_all(listings, nft_owner_key, owner_key, now)
+    return [TokenContextAndListing(c, s, duration) for c, s in zip(contexts, signed, strict=True)], now
+
+
+def test_compact_rentals(renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, owner, owner_key, renter):
+    for token_id in TOKEN_IDS[1:]:  # token 1 is minted by the `mint` fixture
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    renting_contract.deposit(TOKEN_IDS, ZERO_ADDRESS, sender=nft_owner)
+    ape_contract.approve(renting_contract, 100 * PRICE, sender=renter)
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+
+    batch, now = rental_batch(renting_contract, nft_owner_key, owner_key, [indexer.token_context(t) for t in TOKEN_IDS], 2)
+    with boa.env.anchor():
+        renting_contract.start_rentals([context.to_tuple() for context in batch], ZERO_ADDRESS, now, sender=renter)
+        expected = [renting_contract.rental_states(token_id) for token_id in TOKEN_IDS]
+
+    token_contexts, rentals = encode_compact(batch)
+    assert rentals == []
+    renting_contract.start_rentals_compact(token_contexts, rentals, ZERO_ADDRESS, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+    assert [renting_contract.rental_states(token_id) for token_id in TOKEN_IDS] == expected
+    assert [indexer.state_hash(token_id) for token_id in TOKEN_IDS] == expected
+
+    # extensions carry the active rentals
+    boa.env.time_travel(seconds=3600)
+    batch, now = rental_batch(renting_contract, nft_owner_key, owner_key, [indexer.token_context(t) for t in TOKEN_IDS[:2]], 3)
+    token_contexts, rentals = encode_compact(batch)
+    assert rentals == [compact_rental(indexer.token_context(token_id).active_rental) for token_id in TOKEN_IDS[:2]]
+    with boa.reverts("invalid context"):
+        renting_contract.extend_rentals_compact(token_contexts, rentals[::-1], now, sender=renter)
+    unflagged = [(*context[:2], context[2] & ~0xFF, *context[3:]) for context in token_contexts]
+    with boa.reverts("invalid context"):
+        renting_contract.extend_rentals_compact(unflagged, rentals, now, sender=renter)
+    # as when starting rentals, only the flagged contexts take a rental
+    with boa.reverts("invalid context"):
+        renting_contract.extend_rentals_compact([unflagged[0], token_contexts[1]], rentals[1:], now, sender=renter)
+    renting_contract.extend_rentals_compact(token_contexts, rentals, now, sender=renter)
+    indexer.apply_all(get_event_logs(renting_contract, 3))
+    assert [indexer.token_context(token_id).active_rental.expiration for token_id in TOKEN_IDS] == [
+        now + 3 * 3600,
+        now + 3 * 3600,
+        now + 3600,
+    ]
+    assert indexer.verify(renting_contract.rental_states) == []
@@ -462,3 +462,61 @@ def test_mint_reverts_if_not_deposited(renting_contract, nft_owner, nft_contract
 
     with boa.reverts("invalid context"):
         renting_contract.mint([TokenContext(token_id, nft_owner, Rental()).to_tuple()], sender=nft_owner)
+
+
+def test_state_and_revocation_share_a_slot(renting_contract, nft_contract, nft_owner):
+    token_id = 1
+    nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit([token_id], ZERO_ADDRESS, sender=nft_owner)
+    token_context = TokenContext(token_id, nft_owner, Rental()).to_tuple()
+
+    boa.env.time_travel(seconds=10)
+    renting_contract.revoke_listing([token_context], sender=nft_owner)
+    revoked_at = boa.eval("block.timestamp")
+    assert renting_contract.rental_states(token_id) == compute_state_hash(token_id, nft_owner, Rental())
+    assert renting_contract.listing_revocations(token_id) == revoked_at
+
+    boa.env.time_travel(seconds=10)
+    renting_contract.withdraw([token_context], sender=nft_owner)
+    withdrawn_at = boa.eval("block.timestamp")
+    assert renting_contract.rental_states(token_id) == ZERO_BYTES32
+    assert renting_contract.listing_revocations(token_id) == withdrawn_at
+
+    # a new deposit stores the state and keeps the revocation time
+    boa.env.time_travel(seconds=10)
+    nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit([token_id], ZERO_ADDRESS, sender=nft_owner)
+    assert renting_contract.rental_states(token_id) == compute_state_hash(token_id, nft_owner, Rental())
+    assert renting_contract.listing_revocations(token_id) == withdrawn_at
+
+
+def test_deposit_approved_for_all(renting_contract, nft_contract, nft_owner, delegation_registry_warm_contract, owner):
+    token_ids = [10 + i for i in range(32)]
+    delegate = boa.env.generate_address("delegate")
+    for token_id in token_ids:
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+
+    # a single approval of the renting contract instead of one per vault
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    renting_contract.deposit(token_ids, delegate, sender=nft_owner)
+    event = get_last_event(renting_contract, "NftsDeposited")
+
+    for token_id, vault_log in zip(token_ids, event.vaults, strict=True):
+        vault_addr = renting_contract.tokenid_to_vault(token_id)
+        assert VaultLog(*vault_log) == VaultLog(vault_addr, token_id)
+        assert renting_contract.rental_states(token_id) == compute_state_hash(token_id, nft_owner, Rental())
+        assert nft_contract.ownerOf(token_id) == vault_addr
+        assert delegation_registry_warm_contract.getHotWallet(vault_addr) == delegate
+    assert event.owner == nft_owner
+    assert event.delegate == delegate
+
+
+def test_deposit_approved_for_all_only_owned_tokens(renting_contract, nft_contract, nft_owner, renter):
+    nft_contract.setApprovalForAll(renting_contract, True, sender=nft_owner)
+    nft_contract.setApprovalForAll(renting_contract, True, sender=renter)
+
+    with boa.reverts():
+        renting_contract.deposit([1], ZERO_ADDRESS, sender=renter)
+
+    renting_contract.deposit([1], ZERO_ADDRESS, sender=nft_owner)
+    assert nft_contract.ownerOf(1) == renting_contract.tokenid_to_vault(1)
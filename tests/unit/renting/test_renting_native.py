@@ -0,0 +1,220 @@
+import boa
+import pytest
+
+from scripts.offchain.merkle import single_listing_roots
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Permit
+
+from ...conftest_base import (
+    PROTOCOL_FEE,
+    ZERO_ADDRESS,
+    Listing,
+    Rental,
+    RentalLog,
+    Signature,
+    TokenContext,
+    TokenContextAndAmount,
+    TokenContextAndListing,
+    deploy_renting,
+    get_last_event,
+    sign_listing,
+)
+
+PRICE = int(1e18)
+
+
+@pytest.fixture(scope="module")
+def native_renting_contract(
+    renting_contract_def,
+    vault_contract,
+    nft_contract,
+    delegation_registry_warm_contract,
+    protocol_wallet,
+    owner,
+):
+    # a zero payment token settles the market in the native currency
+    return deploy_renting(
+        renting_contract_def,
+        vault_contract,
+        ZERO_ADDRESS,
+        nft_contract,
+        delegation_registry_warm_contract,
+        protocol_wallet,
+        owner,
+    )
+
+
+def deposit(contract, nft_contract, nft_owner):
+    nft_contract.approve(contract.tokenid_to_vault(1), 1, sender=nft_owner)
+    contract.deposit([1], nft_owner, sender=nft_owner)
+
+
+def start_rental(contract, nft_owner, nft_owner_key, owner_key, renter, duration, value):
+    token_id = 1
+    start_time = boa.eval("block.timestamp")
+    signed_listing = sign_listing(
+        Listing(token_id, PRICE, 0, 0, start_time), nft_owner_key, owner_key, start_time, contract.address
+    )
+    token_context = TokenContext(token_id, nft_owner, Rental())
+    contract.start_rentals(
+        [TokenContextAndListing(token_context, signed_listing, duration).to_tuple()],
+        ZERO_ADDRESS,
+        start_time,
+        value=value,
+        sender=renter,
+    )
+    return RentalLog(*get_last_event(contract, "RentalStarted").rentals[0]).to_rental(renter=renter)
+
+
+def test_native_rental_lifecycle(
+    native_renting_contract, nft_contract, nft_owner, nft_owner_key, owner_key, renter, owner, protocol_wallet
+):
+    contract = native_renting_contract
+    boa.env.set_balance(renter, 100 * PRICE)
+    deposit(contract, nft_contract, nft_owner)
+    assert contract.payment_token() == ZERO_ADDRESS
+
+    with boa.reverts("invalid payment amount"):
+        start_rental(contract, nft_owner, nft_owner_key, owner_key, renter, 10, 10 * PRICE - 1)
+
+    rental = start_rental(contract, nft_owner, nft_owner_key, owner_key, renter, 10, 10 * PRICE)
+    assert boa.env.get_balance(contract.address) == 10 * PRICE
+    assert boa.env.get_balance(renter) == 90 * PRICE
+
+    boa.env.time_travel(seconds=4 * 3600)
+    contract.close_rentals([TokenContext(1, nft_owner, rental).to_tuple()], sender=renter)
+    rewards = 4 * PRICE - 4 * PRICE * PROTOCOL_FEE // 10000
+    assert boa.env.get_balance(renter) == 96 * PRICE
+    assert contract.unclaimed_rewards(nft_owner) == rewards
+
+    owner_balance, wallet_balance = boa.env.get_balance(nft_owner), boa.env.get_balance(protocol_wallet)
+    contract.claim([TokenContext(1, nft_owner, Rental()).to_tuple()], sender=nft_owner)
+    assert boa.env.get_balance(nft_owner) == owner_balance + rewards
+
+    contract.claim_fees(sender=owner)
+    assert boa.env.get_balance(protocol_wallet) == wallet_balance + 4 * PRICE - rewards
+    assert boa.env.get_balance(contract.address) == 0
+
+
+def test_native_extend_rentals(native_renting_contract, nft_contract, nft_owner, nft_owner_key, owner_key, renter):
+    contract = native_renting_contract
+    boa.env.set_balance(renter, 100 * PRICE)
+    deposit(contract, nft_contract, nft_owner)
+    rental = start_rental(contract, nft_owner, nft_owner_key, owner_key, renter, 2, 2 * PRICE)
+
+    boa.env.time_travel(seconds=3600)
+    now = boa.eval("block.timestamp")
+    signed_listing = sign_listing(Listing(1, PRICE, 0, 0, now), nft_owner_key, owner_key, now, contract.address)
+    contexts = [TokenContextAndListing(TokenContext(1, nft_owner, rental), signed_listing, 5).to_tuple()]
+
+    # 1 hour settled, 1 paid back and 5 paid for the extension
+    with boa.reverts("invalid payment amount"):
+        contract.extend_rentals(contexts, now, value=5 * PRICE, sender=renter)
+    contract.extend_rentals(contexts, now, value=4 * PRICE, sender=renter)
+    assert boa.env.get_balance(renter) == 94 * PRICE
+    assert boa.env.get_balance(contract.address) == 6 * PRICE
+
+
+def test_native_rejects_staking(
+    native_renting_contract,
+    renting_contract_def,
+    vault_contract,
+    nft_contract,
+    delegation_registry_warm_contract,
+    nft_owner,
+    protocol_wallet,
+    owner,
+):
+    staking_addr = boa.env.generate_address("staking")
+    with boa.reverts("staking not supported"):
+        deploy_renting(
+            renting_contract_def,
+            vault_contract,
+            ZERO_ADDRESS,
+            nft_contract,
+            delegation_registry_warm_contract,
+            protocol_wallet,
+            owner,
+            staking_pool=staking_addr,
+        )
+
+    contract = native_renting_contract
+    with boa.reverts("staking not supported"):
+        contract.set_staking_addr(staking_addr, sender=owner)
+    contract.set_staking_addr(ZERO_ADDRESS, sender=owner)
+
+    deposit(contract, nft_contract, nft_owner)
+    contexts = [TokenContextAndAmount(TokenContext(1, nft_owner, Rental()), PRICE).to_tuple()]
+    with boa.reverts("staking not supported"):
+        contract.stake_deposit(contexts, b"\x00" * 4, sender=nft_owner)
+    with boa.reverts("staking not supported"):
+        contract.stake_withdraw(contexts, nft_owner, b"\x00" * 4, sender=nft_owner)
+    with boa.reverts("staking not supported"):
+        contract.stake_claim(contexts, nft_owner, b"\x00" * 4, sender=nft_owner)
+    with boa.reverts("staking not supported"):
+        contract.stake_compound(contexts, b"\x00" * 4, b"\x00" * 4, sender=nft_owner)
+
+
+def test_native_ignores_permits(native_renting_contract, nft_contract, nft_owner, nft_owner_key, owner_key, renter):
+    contract = native_renting_contract
+    boa.env.set_balance(renter, 10 * PRICE)
+    deposit(contract, nft_contract, nft_owner)
+
+    now = boa.eval("block.timestamp")
+    signed_listing = sign_listing(Listing(1, PRICE, 0, 0, now), nft_owner_key, owner_key, now, contract.address)
+    root_contexts, owner_signatures = single_listing_roots(
+        [TokenContextAndListing(TokenContext(1, nft_owner, Rental()), signed_listing, 2)]
+    )
+    signer = ListingSigner(contract.address, boa.eval("chain.id"))
+    contract.start_rentals_from_roots(
+        [c.to_tuple() for c in root_contexts],
+        [s.to_tuple() for s in owner_signatures],
+        signer.sign_batch_admin(owner_signatures, owner_key, now).to_tuple(),
+        ZERO_ADDRESS,
+        now,
+        Permit(2 * PRICE, now + 600, Signature(27, 1, 1)).to_tuple(),
+        value=2 * PRICE,
+        sender=renter,
+    )
+    assert boa.env.get_balance(contract.address) == 2 * PRICE
+
+
+def test_native_payouts_are_not_reentrant(
+    native_renting_contract, nft_contract, nft_owner, nft_owner_key, owner_key, owner, protocol_wallet
+):
+    contract = native_renting_contract
+    wallet = boa.load("tests/stubs/ReentrantReceiver.vy")
+    boa.env.set_balance(wallet.address, 10 * PRICE)
+    deposit(contract, nft_contract, nft_owner)
+
+    now = boa.eval("block.timestamp")
+    signed_listing = sign_listing(Listing(1, PRICE, 0, 0, now), nft_owner_key, owner_key, now, contract.address)
+    contexts = [TokenContextAndListing(TokenContext(1, nft_owner, Rental()), signed_listing, 10).to_tuple()]
+    wallet.execute(contract, contract.start_rentals.prepare_calldata(contexts, ZERO_ADDRESS, now), 10 * PRICE)
+    rental = RentalLog(*get_last_event(wallet, "RentalStarted").rentals[0]).to_rental(renter=wallet.address)
+
+    # the payback of the closed rental calls back into close_rentals, which would otherwise accept an empty batch
+    wallet.set_callback(contract, contract.close_rentals.prepare_calldata([]))
+    boa.env.time_travel(seconds=3600)
+    close_data = contract.close_rentals.prepare_calldata([TokenContext(1, nft_owner, rental).to_tuple()])
+    wallet.execute(contract, close_data, 0)
+    assert (wallet.payments(), wallet.reentered()) == (1, False)
+    assert boa.env.get_balance(wallet.address) == 9 * PRICE
+
+    # nothing is sent when there is nothing to pay out
+    contract.claim_fees(sender=owner)
+    contract.change_protocol_wallet(wallet, sender=owner)
+    contract.claim_fees(sender=owner)
+    assert wallet.payments() == 1
+
+
+def test_erc20_rentals_reject_native_payments(
+    renting_contract, nft_contract, ape_contract, nft_owner, nft_owner_key, owner_key, renter
+):
+    boa.env.set_balance(renter, PRICE)
+    ape_contract.approve(renting_contract, PRICE, sender=renter)
+    deposit(renting_contract, nft_contract, nft_owner)
+
+    with boa.reverts("invalid payment amount"):
+        start_rental(renting_contract, nft_owner, nft_owner_key, owner_key, renter, 1, PRICE)
+    start_rental(renting_contract, nft_owner, nft_owner_key, owner_key, renter, 1, 0)
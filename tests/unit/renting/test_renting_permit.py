@@ -0,0 +1,133 @@
+import boa
+import pytest
+from eth_account import Account
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.merkle import single_listing_roots
+from scripts.offchain.signing import ListingSigner, sign_permit
+from scripts.offchain.structs import Listing, Permit, TokenContext, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, deploy_renting, get_event_logs
+
+PRICE = int(1e18)
+TOKEN_IDS = [1, 2, 3]
+
+
+@pytest.fixture(scope="module")
+def permit_token(owner):
+    with boa.env.prank(owner):
+        return boa.load("contracts/auxiliary/ERC20Permit.vy", "PAY", "PAY", 18, 0)
+
+
+@pytest.fixture(scope="module")
+def renting(
+    renting_contract_def,
+    vault_contract_def,
+    permit_token,
+    nft_contract,
+    delegation_registry_warm_contract,
+    renting721_contract,
+    protocol_wallet,
+    owner,
+):
+    vault = vault_contract_def.deploy(permit_token, nft_contract, delegation_registry_warm_contract)
+    return deploy_renting(
+        renting_contract_def,
+        vault,
+        permit_token,
+        nft_contract,
+        delegation_registry_warm_contract,
+        protocol_wallet,
+        owner,
+        renting721=renting721_contract,
+    )
+
+
+@pytest.fixture
+def renter_account(renting, permit_token, nft_contract, nft_owner, owner):
+    for token_id in TOKEN_IDS[1:]:  # token 1 is minted by the `mint` fixture
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    for token_id in TOKEN_IDS:
+        nft_contract.approve(renting.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting.deposit(TOKEN_IDS, ZERO_ADDRESS, sender=nft_owner)
+    account = Account.create()
+    permit_token.mint(account.address, 1000 * PRICE, sender=owner)
+    return account
+
+
+def rental_batch(renting, nft_owner, nft_owner_key, owner_key, contexts, duration):
+    signer = ListingSigner(renting.address, boa.eval("chain.id"))
+    now = boa.eval("block.timestamp")
+    per_listing = [
+        TokenContextAndListing(
+            context, signer.sign(Listing(context.token_id, PRICE, 1, 0, now), nft_owner_key, owner_key, now), duration
+        )
+        for context in contexts
+    ]
+    root_contexts, owner_signatures = single_listing_roots(per_listing)
+    return (
+        [c.to_tuple() for c in root_contexts],
+        [s.to_tuple() for s in owner_signatures],
+        signer.sign_batch_admin(owner_signatures, owner_key, now).to_tuple(),
+    )
+
+
+def permit(permit_token, renter_account, spender, value):
+    return sign_permit(
+        permit_token.DOMAIN_SEPARATOR(),
+        renter_account.key,
+        spender.address,
+        value,
+        nonce=permit_token.nonces(renter_account.address),
+        deadline=boa.eval("block.timestamp") + 600,
+    )
+
+
+def test_start_and_extend_rentals_with_permit(renting, permit_token, renter_account, nft_owner, nft_owner_key, owner_key):
+    renter = renter_account.address
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting, 1))
+    now = boa.eval("block.timestamp")
+    batch = rental_batch(renting, nft_owner, nft_owner_key, owner_key, [TokenContext(t, nft_owner) for t in TOKEN_IDS], 2)
+    rental_amount = 3 * 2 * PRICE
+
+    with boa.env.anchor():
+        permit_token.approve(renting, rental_amount, sender=renter)
+        renting.start_rentals_from_roots(*batch, ZERO_ADDRESS, now, Permit().to_tuple(), sender=renter)
+        expected_logs = get_event_logs(renting, 2)
+
+    # no approval transaction, the permit approves the rental amounts
+    renting.start_rentals_from_roots(
+        *batch, ZERO_ADDRESS, now, permit(permit_token, renter_account, renting, rental_amount).to_tuple(), sender=renter
+    )
+    assert get_event_logs(renting, 2) == expected_logs
+    assert permit_token.balanceOf(renter) == 1000 * PRICE - rental_amount
+    assert permit_token.allowance(renter, renting) == 0
+    assert permit_token.nonces(renter) == 1
+
+    indexer.apply_all(expected_logs)
+    boa.env.time_travel(seconds=3600)
+    now = boa.eval("block.timestamp")
+    batch = rental_batch(renting, nft_owner, nft_owner_key, owner_key, [indexer.token_context(t) for t in TOKEN_IDS], 4)
+    renting.extend_rentals_from_roots(
+        *batch, now, permit(permit_token, renter_account, renting, 4 * 3 * PRICE).to_tuple(), sender=renter
+    )
+    assert permit_token.balanceOf(renter) == 1000 * PRICE - 3 * PRICE - 3 * 4 * PRICE
+    assert permit_token.nonces(renter) == 2
+
+
+def test_start_rentals_with_used_permit(renting, permit_token, renter_account, nft_owner, nft_owner_key, owner_key):
+    renter = renter_account.address
+    now = boa.eval("block.timestamp")
+    batch = rental_batch(renting, nft_owner, nft_owner_key, owner_key, [TokenContext(1, nft_owner)], 1)
+    signed_permit = permit(permit_token, renter_account, renting, PRICE)
+    invalid_permit = permit(permit_token, Account.create(), renting, PRICE)
+
+    with boa.reverts("permit failed"):
+        renting.start_rentals_from_roots(*batch, ZERO_ADDRESS, now, invalid_permit.to_tuple(), sender=renter)
+
+    # a permit submitted by someone else first still leaves the allowance for the rental
+    v, r, s = signed_permit.signature.to_tuple()
+    permit_token.permit(renter, renting, PRICE, signed_permit.deadline, v, r.to_bytes(32), s.to_bytes(32))
+    renting.start_rentals_from_roots(*batch, ZERO_ADDRESS, now, signed_permit.to_tuple(), sender=renter)
+    assert permit_token.balanceOf(renter) == 1000 * PRICE - PRICE
@@ -0,0 +1,169 @@
+from dataclasses import replace
+
+import boa
+import pytest
+
+from scripts.offchain.indexer import TokenContextIndexer
+from scripts.offchain.merkle import ListingTree, single_listing_roots
+from scripts.offchain.signing import ListingSigner
+from scripts.offchain.structs import Listing, Permit, TokenContext, TokenContextAndListing
+
+from ...conftest_base import PROTOCOL_FEE, ZERO_ADDRESS, get_event_logs
+
+PRICE = int(1e18)
+NO_PERMIT = Permit().to_tuple()
+
+
+@pytest.fixture
+def signer(renting_contract):
+    return ListingSigner(renting_contract.address, boa.eval("chain.id"))
+
+
+@pytest.fixture
+def deposited(renting_contract, nft_contract, ape_contract, nft_owner, owner, renter):
+    token_ids = list(range(1, 7))
+    for token_id in token_ids[1:]:  # token 1 is minted by the `mint` fixture
+        nft_contract.mint(nft_owner, token_id, sender=owner)
+    for token_id in token_ids:
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    ape_contract.approve(renting_contract, 1000 * PRICE, sender=renter)
+    return token_ids
+
+
+def test_start_rentals_from_roots(renting_contract, signer, deposited, nft_owner, nft_owner_key, owner_key, renter):
+    now = boa.eval("block.timestamp")
+    listings = [Listing(token_id, PRICE, 1, 0, now) for token_id in deposited]
+    trees = [ListingTree(signer, listings[:4]), ListingTree(signer, listings[4:5]), ListingTree(signer, listings[5:])]
+    owner_signatures = [tree.sign(nft_owner_key) for tree in trees]
+    admin_signature = signer.sign_batch_admin(owner_signatures, owner_key, now)
+
+    # interleaved between the roots, the last two being single listings
+    contexts = [
+        trees[signature_index].token_context(i, TokenContext(token_id, nft_owner), 2, signature_index).to_tuple()
+        for i, token_id, signature_index in [(0, 1, 0), (0, 5, 1), (2, 3, 0), (0, 6, 2), (1, 2, 0)]
+    ]
+    per_listing = [
+        TokenContextAndListing(
+            TokenContext(token_id, nft_owner), signer.sign(listings[token_id - 1], nft_owner_key, owner_key, now), 2
+        )
+        for token_id in [1, 5, 3, 6, 2]
+    ]
+
+    with boa.env.anchor():
+        renting_contract.start_rentals([c.to_tuple() for c in per_listing], ZERO_ADDRESS, now, sender=renter)
+        expected_logs = get_event_logs(renting_contract, 1)
+        expected_states = renting_contract.token_states(deposited)
+
+    with boa.env.anchor():
+        root_contexts, single_signatures = single_listing_roots(per_listing)
+        renting_contract.start_rentals_from_roots(
+            [c.to_tuple() for c in root_contexts],
+            [s.to_tuple() for s in single_signatures],
+            signer.sign_batch_admin(single_signatures, owner_key, now).to_tuple(),
+            ZERO_ADDRESS,
+            now,
+            NO_PERMIT,
+            sender=renter,
+        )
+        assert get_event_logs(renting_contract, 1) == expected_logs
+        assert renting_contract.token_states(deposited) == expected_states
+
+    renting_contract.start_rentals_from_roots(
+        contexts,
+        [s.to_tuple() for s in owner_signatures],
+        admin_signature.to_tuple(),
+        ZERO_ADDRESS,
+        now,
+        NO_PERMIT,
+        sender=renter,
+    )
+
+    assert get_event_logs(renting_contract, 1) == expected_logs
+    assert renting_contract.token_states(deposited) == expected_states
+
+
+def test_start_rentals_from_roots_reverts(renting_contract, signer, deposited, nft_owner, nft_owner_key, owner_key, renter):
+    now = boa.eval("block.timestamp")
+    tree = ListingTree(signer, [Listing(token_id, PRICE, 1, 0, now) for token_id in deposited])
+    owner_signature = tree.sign(nft_owner_key)
+
+    def start(context, owner_signatures=(owner_signature,), admin_key=owner_key, timestamp=now):
+        admin_signature = signer.sign_batch_admin(owner_signatures, admin_key, timestamp)
+        renting_contract.start_rentals_from_roots(
+            [context.to_tuple()],
+            [s.to_tuple() for s in owner_signatures],
+            admin_signature.to_tuple(),
+            ZERO_ADDRESS,
+            now,
+            NO_PERMIT,
+            sender=renter,
+        )
+
+    context = tree.token_context(2, TokenContext(3, nft_owner), 2)
+    other_tree = ListingTree(signer, [Listing(3, 1, 0, 0, now), Listing(4, 1, 0, 0, now)])
+
+    with boa.reverts("invalid owner signature"):
+        start(replace(context, proof=tree.proof(3)))
+    with boa.reverts("invalid owner signature"):
+        start(replace(context, listing=Listing(3, 1, 0, 0, now)))
+    with boa.reverts("invalid owner signature"):
+        start(context, [other_tree.sign(owner_key)])
+    with boa.reverts("invalid owner signature"):
+        # a single listing signature doesn't sign a tree of one listing and vice versa
+        start(replace(context, proof=()), [signer.sign_root(signer.listing_hash(context.listing), nft_owner_key)])
+    with boa.reverts("invalid admin signature"):
+        start(context, admin_key=nft_owner_key)
+    with boa.reverts("invalid admin signature"):
+        start(context, timestamp=now - 1)
+    with boa.reverts("invalid token_id"):
+        start(tree.token_context(2, TokenContext(4, nft_owner), 2))
+    with boa.reverts():
+        # an out of bounds signature index, the array bounds check reverts without a reason
+        start(replace(context, signature_index=1))
+
+    start(context)
+
+
+def test_extend_rentals_from_roots(renting_contract, signer, deposited, nft_owner, nft_owner_key, owner_key, renter):
+    now = boa.eval("block.timestamp")
+    indexer = TokenContextIndexer(protocol_fee=PROTOCOL_FEE)
+    indexer.apply_all(get_event_logs(renting_contract, 1))
+    listings = [Listing(token_id, PRICE, 1, 0, now) for token_id in deposited]
+    signed_listings = signer.sign_all(listings, nft_owner_key, owner_key, now)
+    renting_contract.start_rentals(
+        [TokenContextAndListing(TokenContext(s.listing.token_id, nft_owner), s, 2).to_tuple() for s in signed_listings],
+        ZERO_ADDRESS,
+        now,
+        sender=renter,
+    )
+    indexer.apply_all(get_event_logs(renting_contract, 2))
+    boa.env.time_travel(seconds=3600)
+    now = boa.eval("block.timestamp")
+
+    listings = [Listing(token_id, PRICE * 2, 1, 0, now) for token_id in deposited]
+    tree = ListingTree(signer, listings)
+    contexts = [tree.token_context(i, indexer.token_context(listing.token_id), 3) for i, listing in enumerate(listings)]
+    per_listing = [
+        TokenContextAndListing(indexer.token_context(s.listing.token_id), s, 3)
+        for s in signer.sign_all(listings, nft_owner_key, owner_key, now)
+    ]
+
+    with boa.env.anchor():
+        renting_contract.extend_rentals([c.to_tuple() for c in per_listing], now, sender=renter)
+        expected_logs = get_event_logs(renting_contract, 1)
+        expected_states = renting_contract.token_states(deposited)
+
+    owner_signature = tree.sign(nft_owner_key)
+    renting_contract.extend_rentals_from_roots(
+        [c.to_tuple() for c in contexts],
+        [owner_signature.to_tuple()],
+        signer.sign_batch_admin([owner_signature], owner_key, now).to_tuple(),
+        now,
+        NO_PERMIT,
+        sender=renter,
+    )
+
+    assert get_event_logs(renting_contract, 1) == expected_logs
+    assert renting_contract.token_states(deposited) == expected_states
+    assert renting_contract.unclaimed_rewards(nft_owner) > 0
@@ -0,0 +1,27 @@
+import boa
+
+from ...conftest_base import ZERO_ADDRESS, ZERO_BYTES32, Rental, TokenContext, compute_state_hash
+
+
+def test_token_states(renting_contract, nft_contract, nft_owner, owner):
+    token_ids = [1, 2]
+    nft_contract.mint(nft_owner, 2, sender=owner)
+    for token_id in token_ids:
+        nft_contract.approve(renting_contract.tokenid_to_vault(token_id), token_id, sender=nft_owner)
+    renting_contract.deposit(token_ids, ZERO_ADDRESS, sender=nft_owner)
+    renting_contract.withdraw([TokenContext(2, nft_owner, Rental()).to_tuple()], sender=nft_owner)
+
+    states = renting_contract.token_states([1, 2, 3])
+
+    assert states == [
+        (
+            renting_contract.rental_states(token_id),
+            renting_contract.listing_revocations(token_id),
+            renting_contract.tokenid_to_vault(token_id),
+            token_id in token_ids,
+        )
+        for token_id in [1, 2, 3]
+    ]
+    assert states[0][0] == compute_state_hash(1, nft_owner, Rental())
+    assert states[1][:2] == (ZERO_BYTES32, boa.eval("block.timestamp"))
+    assert renting_contract.token_states([]) == []
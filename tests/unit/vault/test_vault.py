@@ -144,6 +144,19 @@ def test_deposit_no_delegate(vault_contract, renting_contract, nft_contract, nft
     assert delegation_registry_warm_contract.getHotWallet(vault_contract) == ZERO_ADDRESS
 
 
+def test_deposit_already_transferred(
+    vault_contract, renting_contract, nft_contract, nft_owner, delegation_registry_warm_contract
+):
+    token_id = 1
+    delegate = boa.env.generate_address("delegate")
+
+    nft_contract.transferFrom(nft_owner, vault_contract, token_id, sender=nft_owner)
+    vault_contract.deposit(token_id, vault_contract, delegate, sender=renting_contract.address)
+
+    assert nft_contract.ownerOf(token_id) == vault_contract.address
+    assert delegation_registry_warm_contract.getHotWallet(vault_contract) == delegate
+
+
 def test_deposit_not_caller(vault_contract, nft_owner):
     with boa.reverts("not caller"):
         vault_contract.deposit(1, nft_owner, ZERO_ADDRESS, sender=nft_owner)